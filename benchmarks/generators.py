@@ -0,0 +1,137 @@
+import json
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, TextIO
+
+# Synthetic configurations in the shape of sample_data/realistic_examples.json,
+# so generated files go through the same load_json_file/parse_* path as the
+# bundled sample. Generation is deterministic for a given seed and streams
+# records, so multi-million resource files never need to fit in memory.
+
+ENVIRONMENTS = ("prod", "staging", "dev", "sandbox")
+CLASSIFICATIONS = ("pii", "financial", "logs", "backups", "public", "internal")
+SAFE_ACTIONS = (
+    "s3:GetObject",
+    "s3:ListBucket",
+    "ec2:DescribeInstances",
+    "logs:PutLogEvents",
+    "dynamodb:Query",
+    "kms:Decrypt",
+    "sqs:SendMessage",
+    "iam:PassRole",
+    "sts:AssumeRole",
+)
+OPEN_PORTS = (22, 3389)
+SAFE_PORTS = (80, 443, 8080, 5432)
+
+
+@dataclass(frozen=True)
+class DatasetProfile:
+    # Fractions of resources that carry each misconfiguration.
+    wildcard_ratio: float = 0.05
+    public_ratio: float = 0.1
+    unencrypted_ratio: float = 0.2
+    open_port_ratio: float = 0.1
+    rules_per_group: int = 3
+    statements_per_policy: int = 2
+    seed: int = 1337
+
+
+def iam_policy(index: int, rng: random.Random, profile: DatasetProfile) -> Dict[str, Any]:
+    statements = []
+    for sid in range(profile.statements_per_policy):
+        actions = rng.sample(SAFE_ACTIONS, 2)
+        statements.append({
+            "Sid": f"Stmt{sid}",
+            "Effect": "Allow",
+            "Action": actions,
+            "Resource": f"arn:aws:s3:::bucket-{rng.randrange(1 << 20)}/*",
+        })
+    if rng.random() < profile.wildcard_ratio:
+        statements[0] = {"Sid": "AdminAccess", "Effect": "Allow", "Action": "*", "Resource": "*"}
+    return {"policy_name": f"policy-{index:08d}", "document": {"Statement": statements}}
+
+
+def s3_config(index: int, rng: random.Random, profile: DatasetProfile) -> Dict[str, Any]:
+    encrypted = rng.random() >= profile.unencrypted_ratio
+    logging_enabled = rng.random() < 0.7
+    return {
+        "bucket_name": f"bucket-{index:08d}",
+        "environment": rng.choice(ENVIRONMENTS),
+        "public_access": {"read": rng.random() < profile.public_ratio, "write": False},
+        "encryption": {"enabled": encrypted, "algorithm": rng.choice(("AES256", "aws:kms")) if encrypted else "none"},
+        "logging": {"enabled": logging_enabled, "target": "log-archive"} if logging_enabled else {"enabled": False},
+        "data_classification": rng.choice(CLASSIFICATIONS),
+    }
+
+
+def security_group(index: int, rng: random.Random, profile: DatasetProfile) -> Dict[str, Any]:
+    rules = []
+    for _ in range(profile.rules_per_group):
+        port = rng.choice(SAFE_PORTS)
+        rules.append({
+            "direction": "ingress",
+            "protocol": "tcp",
+            "from_port": port,
+            "to_port": port,
+            "cidr": f"10.{rng.randrange(256)}.0.0/16",
+            "description": "Internal traffic",
+        })
+    if rng.random() < profile.open_port_ratio:
+        port = rng.choice(OPEN_PORTS)
+        rules[0] = {
+            "direction": "ingress",
+            "protocol": "tcp",
+            "from_port": port,
+            "to_port": port,
+            "cidr": "0.0.0.0/0",
+            "description": "Open to the internet",
+        }
+    return {
+        "group_id": f"sg-{index:08x}",
+        "group_name": f"group-{index:08d}",
+        "environment": rng.choice(ENVIRONMENTS),
+        "vpc_id": f"vpc-{index % 64:04x}",
+        "vpc_cidr": f"10.{index % 64}.0.0/16",
+        "rules": rules,
+    }
+
+
+GENERATORS = (
+    ("iam_policies", iam_policy),
+    ("s3_configs", s3_config),
+    ("security_groups", security_group),
+)
+
+
+def split_counts(total: int) -> Dict[str, int]:
+    # Spreads `total` resources evenly across the three resource types.
+    base, extra = divmod(total, len(GENERATORS))
+    return {key: base + (1 if i < extra else 0) for i, (key, _) in enumerate(GENERATORS)}
+
+
+def iter_records(key: str, count: int, profile: DatasetProfile) -> Iterator[Dict[str, Any]]:
+    generator = dict(GENERATORS)[key]
+    # Each resource type gets its own stream so counts do not shift the others.
+    rng = random.Random(f"{profile.seed}:{key}")
+    for index in range(count):
+        yield generator(index, rng, profile)
+
+
+def generate_dataset(total: int, profile: DatasetProfile = DatasetProfile()) -> Dict[str, Any]:
+    counts = split_counts(total)
+    return {key: list(iter_records(key, counts[key], profile)) for key, _ in GENERATORS}
+
+
+def write_dataset(f: TextIO, total: int, profile: DatasetProfile = DatasetProfile()) -> Dict[str, int]:
+    # Writes a realistic_examples.json-shaped document record by record and
+    # returns the number of resources written per type.
+    counts = split_counts(total)
+    f.write("{")
+    for position, (key, _) in enumerate(GENERATORS):
+        f.write(f'{"," if position else ""}\n"{key}": [')
+        for index, record in enumerate(iter_records(key, counts[key], profile)):
+            f.write(("," if index else "") + "\n" + json.dumps(record, separators=(",", ":")))
+        f.write("\n]")
+    f.write("\n}\n")
+    return counts
@@ -0,0 +1,224 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from benchmarks.generators import DatasetProfile, write_dataset
+from engine.risk_engine import overall_posture, prioritize
+from engine.rule_engine import run_all_rules
+from parser import json_backend
+from parser.config_parser import load_json_file, parse_iam_policies, parse_s3_configs, parse_security_groups
+from reports.report_generator import generate_report
+
+# Bump when the result layout changes so compare() can refuse to diff
+# incompatible files.
+RESULT_VERSION = 1
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+# A stage counts as a regression when its throughput drops by more than this
+# fraction against the baseline.
+DEFAULT_TOLERANCE = 0.2
+
+
+def _measure(fn: Callable[[], Any], track_memory: bool, repeat: int = 1) -> Tuple[Any, float, Optional[int]]:
+    # Best of `repeat` timed runs. Peak memory is traced in a separate run:
+    # tracemalloc slows allocation-heavy stages several times over, which
+    # would skew the timing.
+    elapsed = float("inf")
+    for _ in range(max(1, repeat)):
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    peak = None
+    if track_memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _load_stdlib(path: str) -> Any:
+    # The decoding load_json_file did before pluggable backends, as the
+    # reference its speedup is measured against.
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _stage(name: str, records: int, elapsed: float, peak: Optional[int]) -> Dict[str, Any]:
+    return {
+        "stage": name,
+        "records": records,
+        "seconds": round(elapsed, 6),
+        "records_per_sec": round(records / elapsed, 1) if elapsed > 0 else None,
+        "peak_bytes": peak,
+    }
+
+
+def run_size(
+    total: int, profile: DatasetProfile, workdir: str, track_memory: bool = True, repeat: int = 1
+) -> Dict[str, Any]:
+    path = os.path.join(workdir, f"dataset-{total}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        counts = write_dataset(f, total, profile)
+    stages: List[Dict[str, Any]] = []
+
+    (data, errors), elapsed, peak = _measure(lambda: load_json_file(path), track_memory, repeat)
+    if errors:
+        raise RuntimeError(f"Generated dataset failed to load: {errors}")
+    stages.append(_stage("load_json_file", total, elapsed, peak))
+    _, elapsed, peak = _measure(lambda: _load_stdlib(path), track_memory, repeat)
+    stages.append(_stage("load_json_stdlib", total, elapsed, peak))
+
+    parsed: Dict[str, List[Dict[str, Any]]] = {}
+    for key, parse in (
+        ("iam_policies", parse_iam_policies),
+        ("s3_configs", parse_s3_configs),
+        ("security_groups", parse_security_groups),
+    ):
+        (resources, _), elapsed, peak = _measure(lambda: parse(data.get(key)), track_memory, repeat)
+        parsed[key] = resources
+        stages.append(_stage(parse.__name__, counts[key], elapsed, peak))
+    del data
+
+    findings, elapsed, peak = _measure(lambda: run_all_rules(dict(parsed)), track_memory, repeat)
+    stages.append(_stage("run_all_rules", total, elapsed, peak))
+    del parsed
+
+    # prioritize() annotates findings in place, so every run gets fresh copies.
+    prioritized, elapsed, peak = _measure(lambda: prioritize([f.copy() for f in findings]), track_memory, repeat)
+    stages.append(_stage("prioritize", len(findings), elapsed, peak))
+
+    posture = overall_posture(prioritized)
+    report, elapsed, peak = _measure(lambda: generate_report(prioritized, posture), track_memory, repeat)
+    stages.append(_stage("generate_report", len(prioritized), elapsed, peak))
+
+    result = {
+        "size": total,
+        "resources": counts,
+        "findings": len(findings),
+        "input_bytes": os.path.getsize(path),
+        "report_bytes": len(report),
+        "stages": stages,
+    }
+    os.remove(path)
+    return result
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    sizes: List[int], profile: DatasetProfile = DatasetProfile(), track_memory: bool = True, repeat: int = 1
+) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="scanner-bench-") as workdir:
+        results = [run_size(total, profile, workdir, track_memory, repeat) for total in sizes]
+    return {
+        "version": RESULT_VERSION,
+        "created_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "json_backend": json_backend.backend_name(),
+        "platform": platform.platform(),
+        "profile": profile.__dict__,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    # Throughput regressions beyond `tolerance`, matched by size and stage.
+    if baseline.get("version") != current.get("version"):
+        return [f"Result version {current.get('version')} cannot be compared with {baseline.get('version')}"]
+    before = {
+        (run["size"], stage["stage"]): stage["records_per_sec"]
+        for run in baseline["results"]
+        for stage in run["stages"]
+    }
+    regressions = []
+    for run in current["results"]:
+        for stage in run["stages"]:
+            old = before.get((run["size"], stage["stage"]))
+            new = stage["records_per_sec"]
+            if old and new and new < old * (1 - tolerance):
+                regressions.append(
+                    f"{stage['stage']} @ {run['size']}: {new:,.0f} rec/s vs {old:,.0f} rec/s ({new / old - 1:+.0%})"
+                )
+    return regressions
+
+
+def _print_results(results: Dict[str, Any]) -> None:
+    for run in results["results"]:
+        print(f"== {run['size']:,} resources, {run['findings']:,} findings, {results.get('json_backend')} ==")
+        for stage in run["stages"]:
+            peak = stage["peak_bytes"]
+            peak_text = f"{peak / (1024 * 1024):9.1f} MB" if peak is not None else "        n/a"
+            rate = stage["records_per_sec"] or 0
+            print(f"  {stage['stage']:<22} {stage['seconds']:9.3f}s {rate:14,.0f} rec/s {peak_text}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the scan pipeline on synthetic configurations.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma-separated total resource counts, e.g. 1000,100000,10000000")
+    parser.add_argument("--wildcard-ratio", type=float, default=DatasetProfile.wildcard_ratio)
+    parser.add_argument("--public-ratio", type=float, default=DatasetProfile.public_ratio)
+    parser.add_argument("--unencrypted-ratio", type=float, default=DatasetProfile.unencrypted_ratio)
+    parser.add_argument("--open-port-ratio", type=float, default=DatasetProfile.open_port_ratio)
+    parser.add_argument("--seed", type=int, default=DatasetProfile.seed)
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage; the fastest is reported")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced run used for peak memory")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against an earlier results file; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    # Nothing else runs in this process, so bulk parsing may pause the GC.
+    json_backend.PAUSE_GC = True
+    profile = DatasetProfile(
+        wildcard_ratio=args.wildcard_ratio,
+        public_ratio=args.public_ratio,
+        unencrypted_ratio=args.unencrypted_ratio,
+        open_port_ratio=args.open_port_ratio,
+        seed=args.seed,
+    )
+    sizes = [int(size.replace("_", "")) for size in args.sizes.split(",") if size]
+    results = run_benchmarks(sizes, profile, track_memory=not args.no_memory, repeat=args.repeat)
+    _print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.tolerance)
+        for line in regressions:
+            print("REGRESSION:", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,475 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import traceback
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from engine.risk_engine import DEFAULT_PROFILE, PriorityStream, ScoringProfile, load_profile
+from engine.rule_engine import iter_all_rules
+from rules.registry import ruleset_version
+from parser.config_parser import stream_iam_policies, stream_s3_configs, stream_security_groups
+from reports.exporters import EXPORT_FORMATS, export_findings, parse_formats
+from reports.report_generator import write_report
+from storage.result_cache import ResultCache
+
+# Headless scans of many accounts and regions. Any directory holding one or
+# more of the resource directories below is a scan unit, e.g.
+#
+#   <root>/<account>/<region>/{iam_policies,s3_configs,security_groups}/*.json
+#
+# The first path component below the root names the account and the rest the
+# region ("global" when there is none). Each unit is scanned as a whole (rules
+# such as segmentation and privilege escalation look across its resources) on
+# a bounded pool of worker processes. Completed units are appended to a
+# manifest together with the size and mtime of their files and the ruleset
+# version, so an interrupted or repeated run only scans units that are new,
+# changed or failed, or all of them once the rules change.
+#
+# Accounts can be scored with their own scoring profiles (tenants): given a
+# directory of profiles, <account>.json applies to that account and
+# default.json to the others.
+
+RESOURCE_DIRS = {
+    "iam_policies": stream_iam_policies,
+    "s3_configs": stream_s3_configs,
+    "security_groups": stream_security_groups,
+}
+INPUT_SUFFIXES = (".json", ".jsonl")
+MANIFEST_NAME = "manifest.jsonl"
+SUMMARY_NAME = "summary.json"
+UNIT_SUMMARY_NAME = "scan.json"
+ACCOUNT_SUMMARY_NAME = "account.json"
+ACCOUNTS_DIR = "accounts"
+DEFAULT_PROFILE_NAME = "default.json"
+DEFAULT_REGION = "global"
+# Units submitted ahead of the pool per worker; bounds the queued work so a
+# large tree is not turned into thousands of pending futures at once.
+IN_FLIGHT_PER_WORKER = 2
+
+_CATEGORIES = ("Critical", "High", "Medium", "Low")
+
+Signature = Dict[str, List[int]]
+
+
+@dataclass(frozen=True)
+class ScanUnit:
+    unit_id: str
+    account: str
+    region: str
+    # (resource directory, path relative to the root), sorted.
+    files: Tuple[Tuple[str, str], ...]
+
+
+def discover_units(root: str) -> List[ScanUnit]:
+    units: List[ScanUnit] = []
+    root = os.path.abspath(root)
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames.sort()
+        kinds = [name for name in dirnames if name in RESOURCE_DIRS]
+        if not kinds:
+            continue
+        files: List[Tuple[str, str]] = []
+        for kind in kinds:
+            for kind_path, kind_dirs, filenames in os.walk(os.path.join(dirpath, kind)):
+                kind_dirs.sort()
+                files.extend(
+                    (kind, os.path.relpath(os.path.join(kind_path, name), root))
+                    for name in sorted(filenames)
+                    if name.endswith(INPUT_SUFFIXES)
+                )
+        # Resource directories belong to this unit and are not units themselves.
+        dirnames[:] = [name for name in dirnames if name not in RESOURCE_DIRS]
+        if not files:
+            continue
+        relative = os.path.relpath(dirpath, root)
+        parts = [] if relative == os.curdir else relative.split(os.sep)
+        account = parts[0] if parts else os.path.basename(root)
+        units.append(ScanUnit(
+            unit_id="/".join(parts) or account,
+            account=account,
+            region="/".join(parts[1:]) or DEFAULT_REGION,
+            files=tuple(files),
+        ))
+    return units
+
+
+def unit_signature(unit: ScanUnit, root: str) -> Signature:
+    signature: Signature = {}
+    for _, path in unit.files:
+        stat = os.stat(os.path.join(root, path))
+        signature[path.replace(os.sep, "/")] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+class Manifest:
+    # Append-only JSON Lines log of completed units. Each line is written and
+    # fsynced as its unit completes, so an interrupted run loses at most the
+    # units in flight; a torn last line is ignored when the log is read.
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if restart and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._entries[entry["unit"]] = entry
+
+    def completed(
+        self, unit_id: str, signature: Signature, profile: Optional[ScoringProfile] = None
+    ) -> Optional[Dict[str, Any]]:
+        # The stored summary if the unit completed with identical files, rules
+        # and scoring profile.
+        entry = self._entries.get(unit_id)
+        if entry is None or entry["files"] != signature or entry.get("ruleset") != ruleset_version():
+            return None
+        if entry.get("profile") != _profile_key(profile):
+            return None
+        return entry["summary"]
+
+    def record(
+        self, unit_id: str, signature: Signature, summary: Dict[str, Any], profile: Optional[ScoringProfile] = None
+    ) -> None:
+        entry = {"unit": unit_id, "ruleset": ruleset_version(), "files": signature, "summary": summary}
+        if _profile_key(profile) is not None:
+            entry["profile"] = _profile_key(profile)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._entries[unit_id] = entry
+
+
+def _profile_key(profile: Optional[ScoringProfile]) -> Optional[str]:
+    # None for the built-in weights, so manifests written before scoring
+    # profiles stay valid.
+    if profile is None or profile.fingerprint() == DEFAULT_PROFILE.fingerprint():
+        return None
+    return profile.fingerprint()
+
+
+def load_profiles(path: Optional[str], accounts: Iterable[str]) -> Dict[str, ScoringProfile]:
+    # Scoring profile per account from a profile file (every account) or a
+    # directory of <account>.json and default.json; accounts without one are
+    # left out and use the built-in weights.
+    if not path:
+        return {}
+    if not os.path.isdir(path):
+        profile = load_profile(path)
+        return {account: profile for account in accounts}
+    loaded: Dict[str, ScoringProfile] = {}
+    fallback_path = os.path.join(path, DEFAULT_PROFILE_NAME)
+    fallback = load_profile(fallback_path) if os.path.exists(fallback_path) else None
+    for account in accounts:
+        account_path = os.path.join(path, account + ".json")
+        if os.path.exists(account_path):
+            loaded[account] = load_profile(account_path)
+        elif fallback is not None:
+            loaded[account] = fallback
+    return loaded
+
+
+def _write_json(path: str, value: Any) -> None:
+    part = path + ".part"
+    with open(part, "w", encoding="utf-8") as f:
+        json.dump(value, f, indent=2)
+    os.replace(part, path)
+
+
+def _stream_files(
+    stream: Callable[[str, List[str]], Iterator[Any]], root: str, unit: ScanUnit, kind: str, errors: List[str]
+) -> Iterator[Any]:
+    paths = [os.path.join(root, path) for k, path in unit.files if k == kind]
+    return chain.from_iterable(stream(path, errors) for path in paths)
+
+
+def _count(resources: Iterable[Any], counts: Counter, key: str) -> Iterator[Any]:
+    for resource in resources:
+        counts[key] += 1
+        yield resource
+
+
+def unit_dir(output_dir: str, unit: ScanUnit) -> str:
+    return os.path.join(output_dir, ACCOUNTS_DIR, *unit.unit_id.split("/"))
+
+
+def scan_unit(
+    unit: ScanUnit,
+    root: str,
+    output_dir: str,
+    formats: Tuple[str, ...],
+    report: bool,
+    cache_path: Optional[str],
+    top: int = 0,
+    profile: Optional[ScoringProfile] = None,
+) -> Dict[str, Any]:
+    # Scans one unit and writes its findings exports, optional HTML report,
+    # top-`top` findings (top.jsonl) and scan.json; returns the summary
+    # recorded in the manifest. Without exports or a report only the top
+    # findings are kept, so findings are never fully sorted or held in memory.
+    errors: List[str] = []
+    resources: Counter = Counter()
+    inputs = {
+        kind: _count(_stream_files(stream, root, unit, kind, errors), resources, kind)
+        for kind, stream in RESOURCE_DIRS.items()
+    }
+    cache = ResultCache(cache_path) if cache_path else None
+    profile = profile or DEFAULT_PROFILE
+    stream = PriorityStream(top, profile, full_order=bool(formats or report))
+    rules: Counter = Counter()
+    for findings in iter_all_rules(inputs, cache=cache):
+        rules.update(finding["id"] for finding in findings)
+        stream.extend(findings)
+    posture = stream.posture()
+    counts = stream.counts()
+
+    directory = unit_dir(output_dir, unit)
+    os.makedirs(directory, exist_ok=True)
+    outputs: Dict[str, str] = {}
+    if stream.full_order:
+        prioritized = stream.ordered()
+        stem = os.path.join(directory, "findings")
+        outputs.update((fmt, os.path.basename(export_findings(prioritized, fmt, stem))) for fmt in formats)
+        if report:
+            write_report(prioritized, posture, os.path.join(directory, "report.html"), counts=counts)
+            outputs["report"] = "report.html"
+    if top:
+        outputs["top"] = os.path.basename(export_findings(stream.top(), "jsonl", os.path.join(directory, "top")))
+    summary = {
+        "unit": unit.unit_id,
+        "account": unit.account,
+        "region": unit.region,
+        "scanned_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "posture": list(posture),
+        "scoring_profile": profile.name,
+        "finding_count": stream.count,
+        "counts": counts,
+        "rules": dict(sorted(rules.items())),
+        "resources": {kind: resources[kind] for kind in RESOURCE_DIRS},
+        "files": len(unit.files),
+        "errors": errors,
+        "outputs": outputs,
+    }
+    _write_json(os.path.join(directory, UNIT_SUMMARY_NAME), summary)
+    return summary
+
+
+def _create_executor(workers: int) -> Executor:
+    try:
+        return ProcessPoolExecutor(max_workers=workers)
+    except (ImportError, NotImplementedError, OSError):
+        # As in the rule engine: keep going on threads where processes
+        # cannot be started.
+        return ThreadPoolExecutor(max_workers=workers)
+
+
+def _scan_all(
+    pending: List[Tuple[ScanUnit, Signature]],
+    workers: int,
+    scan_args: Tuple[Any, ...],
+    profiles: Dict[str, ScoringProfile],
+) -> Iterator[Tuple[ScanUnit, Signature, Optional[Dict[str, Any]], Optional[str]]]:
+    # Yields (unit, signature, summary, error) as units complete, with at
+    # most workers * IN_FLIGHT_PER_WORKER units submitted at a time. Only the
+    # unit's own scoring profile is sent along with it.
+    if workers <= 1:
+        for unit, signature in pending:
+            try:
+                yield unit, signature, scan_unit(unit, *scan_args, profiles.get(unit.account)), None
+            except Exception:
+                yield unit, signature, None, traceback.format_exc(limit=3)
+        return
+    todo = iter(pending)
+    in_flight: Dict[Any, Tuple[ScanUnit, Signature]] = {}
+    with _create_executor(workers) as executor:
+        try:
+            while True:
+                while len(in_flight) < workers * IN_FLIGHT_PER_WORKER:
+                    item = next(todo, None)
+                    if item is None:
+                        break
+                    unit = item[0]
+                    in_flight[executor.submit(scan_unit, unit, *scan_args, profiles.get(unit.account))] = item
+                if not in_flight:
+                    return
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit, signature = in_flight.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        yield unit, signature, future.result(), None
+                    else:
+                        yield unit, signature, None, "".join(traceback.format_exception_only(type(error), error))
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def aggregate(summaries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    # Totals across units, overall and per account. Postures are the highest
+    # scored unit's, as overall_posture() is the highest scored finding's.
+    def empty() -> Dict[str, Any]:
+        return {
+            "posture": ["Low", 0], "units": 0, "finding_count": 0,
+            "counts": dict.fromkeys(_CATEGORIES, 0), "rules": Counter(), "resources": Counter(), "errors": 0,
+        }
+
+    def add(total: Dict[str, Any], summary: Dict[str, Any]) -> None:
+        if summary["posture"][1] > total["posture"][1]:
+            total["posture"] = list(summary["posture"])
+        total["units"] += 1
+        total["finding_count"] += summary["finding_count"]
+        for category, count in summary["counts"].items():
+            total["counts"][category] = total["counts"].get(category, 0) + count
+        total["rules"].update(summary["rules"])
+        total["resources"].update(summary["resources"])
+        total["errors"] += len(summary["errors"])
+
+    overall = empty()
+    accounts: Dict[str, Dict[str, Any]] = {}
+    for summary in summaries:
+        add(overall, summary)
+        account = accounts.get(summary["account"])
+        if account is None:
+            account = accounts[summary["account"]] = dict(empty(), regions={})
+        add(account, summary)
+        account["regions"][summary["region"]] = {
+            "unit": summary["unit"],
+            "posture": summary["posture"],
+            "finding_count": summary["finding_count"],
+        }
+    for total in [overall] + list(accounts.values()):
+        total["rules"] = dict(sorted(total["rules"].items()))
+        total["resources"] = dict(sorted(total["resources"].items()))
+    overall["accounts"] = {name: accounts[name] for name in sorted(accounts)}
+    return overall
+
+
+def run_batch(
+    root: str,
+    output_dir: str,
+    workers: int = 1,
+    formats: Iterable[str] = ("jsonl",),
+    report: bool = False,
+    cache_path: Optional[str] = None,
+    top: int = 0,
+    restart: bool = False,
+    progress: Optional[Callable[[int, int, ScanUnit, Optional[Dict[str, Any]], Optional[str]], None]] = None,
+    scoring_profiles: Optional[str] = None,
+) -> Dict[str, Any]:
+    # Scans every unit under `root` that the manifest in `output_dir` does not
+    # already record as completed with the same files, then writes per-account
+    # account.json files and the aggregated summary.json, which is returned.
+    # `scoring_profiles` is a profile file or directory (see load_profiles).
+    root = os.path.abspath(root)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = Manifest(os.path.join(output_dir, MANIFEST_NAME), restart=restart)
+    units = discover_units(root)
+    profiles = load_profiles(scoring_profiles, sorted({unit.account for unit in units}))
+    summaries: Dict[str, Dict[str, Any]] = {}
+    pending: List[Tuple[ScanUnit, Signature]] = []
+    for unit in units:
+        signature = unit_signature(unit, root)
+        summary = manifest.completed(unit.unit_id, signature, profiles.get(unit.account))
+        if summary is None:
+            pending.append((unit, signature))
+        else:
+            summaries[unit.unit_id] = summary
+
+    skipped = len(summaries)
+    failed: Dict[str, str] = {}
+    scan_args = (root, output_dir, tuple(parse_formats(formats)), report, cache_path, top)
+    for done, (unit, signature, summary, error) in enumerate(_scan_all(pending, workers, scan_args, profiles), 1):
+        if summary is not None:
+            manifest.record(unit.unit_id, signature, summary, profiles.get(unit.account))
+            summaries[unit.unit_id] = summary
+        else:
+            failed[unit.unit_id] = error or "failed"
+        if progress is not None:
+            progress(done, len(pending), unit, summary, error)
+
+    ordered = [summaries[unit.unit_id] for unit in units if unit.unit_id in summaries]
+    result = aggregate(ordered)
+    for name, account in result["accounts"].items():
+        directory = os.path.join(output_dir, ACCOUNTS_DIR, name)
+        os.makedirs(directory, exist_ok=True)
+        _write_json(os.path.join(directory, ACCOUNT_SUMMARY_NAME), dict(account, account=name))
+    result.update({
+        "root": root,
+        "completed_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "scanned": len(summaries) - skipped,
+        "skipped": skipped,
+        "failed": failed,
+    })
+    _write_json(os.path.join(output_dir, SUMMARY_NAME), result)
+    return result
+
+
+def _print_progress(
+    done: int, total: int, unit: ScanUnit, summary: Optional[Dict[str, Any]], error: Optional[str]
+) -> None:
+    if summary is None:
+        reason = (error or "failed").strip().splitlines()[-1]
+        print(f"[{done}/{total}] {unit.unit_id}: FAILED {reason}", flush=True)
+        return
+    category, score = summary["posture"]
+    print(f"[{done}/{total}] {unit.unit_id}: {category} (Score {score}), {summary['finding_count']} findings", flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scan a directory tree of account/region configurations.")
+    parser.add_argument("root", help="directory containing <account>/<region>/{iam_policies,s3_configs,security_groups}")
+    parser.add_argument("--output", default="batch-results", help="results directory (also holds the manifest)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="units scanned in parallel")
+    parser.add_argument("--exports", default="jsonl",
+                        help=f"comma-separated findings exports per unit: {', '.join(EXPORT_FORMATS)}")
+    parser.add_argument("--report", action="store_true", help="also write an HTML report per unit")
+    parser.add_argument("--cache", help="findings cache (SQLite) shared by the workers and across runs")
+    parser.add_argument("--top", type=int, default=0,
+                        help="also write the N highest-priority findings per unit to top.jsonl"
+                             " (with --exports '' only those are kept)")
+    parser.add_argument("--restart", action="store_true", help="ignore the manifest and scan every unit")
+    parser.add_argument("--scoring-profiles",
+                        help="scoring profile JSON for every account, or a directory of <account>.json files"
+                             " (default.json for the rest)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        parser.error(f"{args.root} is not a directory")
+    result = run_batch(
+        args.root,
+        args.output,
+        workers=max(1, args.workers),
+        formats=[fmt.strip() for fmt in args.exports.split(",") if fmt.strip()],
+        report=args.report,
+        cache_path=args.cache,
+        top=max(0, args.top),
+        restart=args.restart,
+        progress=_print_progress,
+        scoring_profiles=args.scoring_profiles,
+    )
+    category, score = result["posture"]
+    print(
+        f"{result['units']} units in {len(result['accounts'])} accounts: {category} (Score {score}), "
+        f"{result['finding_count']} findings; scanned {result['scanned']}, resumed {result['skipped']}, "
+        f"failed {len(result['failed'])}"
+    )
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
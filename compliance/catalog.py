@@ -0,0 +1,45 @@
+from typing import Any, Dict, List, Tuple
+
+from compliance.cis_mapping import CIS_MAPPING
+from compliance.mitre_mapping import MITRE_MAPPING
+from compliance.owasp_cloud import OWASP_CLOUD_MAPPING
+
+# Compliance references keyed by rule id. Like the rule metadata findings
+# share through their RuleInfo (see rules.registry.get_rule_info), the CIS,
+# OWASP and MITRE lists are the same for every finding of a rule, so
+# renderers join them in per rule id from here instead of looking them up,
+# or joining them into text, once per finding.
+
+COMPLIANCE_FIELDS = ("cis", "owasp", "mitre")
+
+_COMPLIANCE: Dict[Any, Dict[str, List[str]]] = {}
+_JOINED: Dict[Tuple[Any, str], Tuple[str, str, str]] = {}
+
+
+def compliance(rule_id: Any) -> Dict[str, List[str]]:
+    # {"cis": [...], "owasp": [...], "mitre": [...]}, built once per rule id
+    # and shared by every caller, so treat it as read-only.
+    entry = _COMPLIANCE.get(rule_id)
+    if entry is None:
+        entry = _COMPLIANCE[rule_id] = {
+            "cis": CIS_MAPPING.get(rule_id, []),
+            "owasp": OWASP_CLOUD_MAPPING.get(rule_id, []),
+            "mitre": MITRE_MAPPING.get(rule_id, []),
+        }
+    return entry
+
+
+def compliance_text(rule_id: Any, separator: str = ", ") -> Tuple[str, str, str]:
+    # The CIS, OWASP and MITRE references joined into one string each.
+    key = (rule_id, separator)
+    joined = _JOINED.get(key)
+    if joined is None:
+        entry = compliance(rule_id)
+        joined = _JOINED[key] = tuple(separator.join(entry[name]) for name in COMPLIANCE_FIELDS)  # type: ignore[assignment]
+    return joined
+
+
+def clear() -> None:
+    # Drops the cached entries, e.g. after changing a compliance mapping.
+    _COMPLIANCE.clear()
+    _JOINED.clear()
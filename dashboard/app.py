@@ -1,23 +1,58 @@
 import datetime
-import json
+import logging
 import os
 import sys
-from typing import Any, Dict, List, Tuple
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if BASE_DIR not in sys.path:
     sys.path.append(BASE_DIR)
 
-from flask import Flask, redirect, render_template, request, send_from_directory, url_for
+from flask import (
+    Flask,
+    Response,
+    abort,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    send_from_directory,
+    stream_with_context,
+    url_for,
+)
+from werkzeug.http import dump_options_header
+from werkzeug.security import safe_join
 
-from compliance.cis_mapping import CIS_MAPPING
-from compliance.mitre_mapping import MITRE_MAPPING
-from compliance.owasp_cloud import OWASP_CLOUD_MAPPING
+from compliance.catalog import compliance
+from dashboard.jobs import DONE, FAILED, JobQueue, QueueFull, ScanJob
+from engine import instrumentation
 from engine.rule_engine import run_all_rules
-from engine.risk_engine import overall_posture, prioritize
-from parser.config_parser import parse_iam_policies, parse_s3_configs, parse_security_groups
-from reports.report_generator import generate_report
+from engine.risk_engine import DEFAULT_PROFILE, PriorityStream, load_profile
+from engine.scan_diff import ScanDiff, diff_indexes, drift_summary, index_findings
+from parser import json_backend
+from parser.config_parser import (
+    parse_iam_policies,
+    parse_s3_configs,
+    parse_security_groups,
+    stream_iam_policies,
+    stream_s3_configs,
+    stream_security_groups,
+)
+from reports.exporters import EXPORT_FORMATS, export_extension, export_findings, parse_formats
+from reports.report_generator import DRIFT_ROWS, iter_report, report_digest
+from storage.report_store import ReportStore, decode, read_chunks
+from storage.result_cache import ResultCache
+from storage.scan_index import ScanIndex
+from storage.scan_store import SORT_COLUMNS, ScanStore
+
 
+logger = logging.getLogger(__name__)
 
 app = Flask(
     __name__,
@@ -25,57 +60,96 @@ app = Flask(
     static_folder=os.path.join(os.path.dirname(__file__), "static"),
 )
 
-REPORTS_DIR = os.path.join(BASE_DIR, "reports")
+REPORTS_DIR = os.environ.get("SCANNER_REPORTS_DIR", os.path.join(BASE_DIR, "reports"))
 SAMPLE_PATH = os.path.join(BASE_DIR, "sample_data", "realistic_examples.json")
-INDEX_PATH = os.path.join(REPORTS_DIR, "scan_index.json")
-
-LAST_SCAN: Dict[str, Any] = {}
+# Written by older versions; imported into the scan index on first start.
+LEGACY_INDEX_PATH = os.path.join(REPORTS_DIR, "scan_index.json")
+RULE_WORKERS = int(os.environ.get("SCANNER_RULE_WORKERS", "1"))
+CACHE_PATH = os.environ.get("SCANNER_CACHE_PATH", os.path.join(BASE_DIR, "cache", "findings_cache.sqlite3"))
+CACHE_MAX_BYTES = int(os.environ.get("SCANNER_CACHE_MAX_MB", "256")) * 1024 * 1024
+DATA_DIR = os.environ.get("SCANNER_DATA_DIR", os.path.join(BASE_DIR, "data"))
+SCAN_STORE_PATH = os.path.join(DATA_DIR, "scans.sqlite3")
+INDEX_PATH = os.path.join(DATA_DIR, "scan_index.sqlite3")
+# Scan history retention; 0 keeps every scan.
+INDEX_MAX_ENTRIES = int(os.environ.get("SCANNER_INDEX_MAX_ENTRIES", "0"))
+INDEX_MAX_AGE_DAYS = int(os.environ.get("SCANNER_INDEX_MAX_AGE_DAYS", "0"))
+REPORTS_PAGE_SIZE = 50
+# Compressed, content-addressed scan reports; reports/ keeps exports and the
+# plain HTML reports of older versions. Retention limits of 0 are off.
+REPORT_STORE_DIR = os.path.join(DATA_DIR, "reports")
+REPORT_MAX_AGE_DAYS = float(os.environ.get("SCANNER_REPORT_MAX_AGE_DAYS", "0"))
+REPORT_MAX_BYTES = int(os.environ.get("SCANNER_REPORT_MAX_MB", "0")) * 1024 * 1024
+RESULTS_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "cloud-scanner-uploads")
+JOB_WORKERS = int(os.environ.get("SCANNER_JOB_WORKERS", "2"))
+# Scans queued or running at once; /scan answers 503 beyond this.
+MAX_PENDING_JOBS = int(os.environ.get("SCANNER_MAX_PENDING_JOBS", "20"))
+# JSON scoring profile (custom factor weights and category thresholds) for
+# this deployment; the built-in weights when unset.
+SCORING_PROFILE_PATH = os.environ.get("SCANNER_SCORING_PROFILE")
+DIFF_CACHE_SIZE = 4
+DIFF_CHANGES = ("new", "resolved", "unchanged")
+
+RESULT_CACHE = ResultCache(CACHE_PATH, max_bytes=CACHE_MAX_BYTES)
+SCORING_PROFILE = load_profile(SCORING_PROFILE_PATH) if SCORING_PROFILE_PATH else DEFAULT_PROFILE
+SCAN_JOBS = JobQueue(workers=JOB_WORKERS, max_pending=MAX_PENDING_JOBS)
+SCAN_STORE = ScanStore(SCAN_STORE_PATH)
+SCAN_INDEX = ScanIndex(INDEX_PATH, INDEX_MAX_ENTRIES, INDEX_MAX_AGE_DAYS, legacy_path=LEGACY_INDEX_PATH)
+REPORT_STORE = ReportStore(REPORT_STORE_DIR, max_age_days=REPORT_MAX_AGE_DAYS, max_bytes=REPORT_MAX_BYTES)
+if REPORT_MAX_AGE_DAYS > 0 or REPORT_MAX_BYTES > 0:
+    REPORT_STORE.start_sweeper()
+
+# Recent diffs by (base scan, head scan), so paging through one does not
+# reload both scans' keys for every page. Stored scans do not change.
+_DIFFS: "OrderedDict[Tuple[str, str], ScanDiff]" = OrderedDict()
+_DIFFS_LOCK = threading.Lock()
+
+UPLOAD_FIELDS = (
+    ("iam_policies", "iam_file", stream_iam_policies),
+    ("s3_configs", "s3_file", stream_s3_configs),
+    ("security_groups", "sg_file", stream_security_groups),
+)
 
 
-def _load_json_from_upload(file_storage):
+def _spool_upload(file_storage) -> Optional[str]:
+    # The request body is gone once the handler returns, so uploads are copied
+    # to disk (in chunks) for the background job to stream from.
     if not file_storage:
-        return None, ["No file uploaded"]
-    try:
-        return json.loads(file_storage.read().decode("utf-8")), []
-    except Exception as exc:
-        return None, [f"Invalid JSON: {exc}"]
+        return None
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=".json", dir=UPLOAD_DIR)
+    with os.fdopen(fd, "wb") as f:
+        file_storage.save(f)
+    return path
 
 
-def _load_sample():
-    with open(SAMPLE_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+def _stream_from_upload(path: Optional[str], stream_fn, errors: List[str]) -> Iterator[Dict[str, Any]]:
+    # Uploads are decoded record by record instead of being read into memory
+    # as one document.
+    if not path:
+        errors.append("No file uploaded")
+        return iter(())
+    return stream_fn(path, errors)
 
 
-def _load_index() -> List[Dict[str, Any]]:
-    if not os.path.exists(INDEX_PATH):
-        return []
-    try:
-        with open(INDEX_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return []
+def _load_sample():
+    return json_backend.load_path(SAMPLE_PATH)
 
 
-def _save_index(index_entries: List[Dict[str, Any]]) -> None:
-    os.makedirs(REPORTS_DIR, exist_ok=True)
-    with open(INDEX_PATH, "w", encoding="utf-8") as f:
-        json.dump(index_entries, f, indent=2)
+SERVICE_LABELS = {
+    "iam_policy": "IAM",
+    "s3_bucket": "Storage",
+    "security_group": "Network",
+}
 
 
 def _service_label(resource_type: str) -> str:
-    mapping = {
-        "iam_policy": "IAM",
-        "s3_bucket": "Storage",
-        "security_group": "Network",
-    }
-    return mapping.get(resource_type, "Unknown")
+    return SERVICE_LABELS.get(resource_type, "Unknown")
 
 
-def _count_by_category(findings: List[Dict[str, Any]]) -> Dict[str, int]:
-    counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
-    for f in findings:
-        counts[f.get("risk_category", "Low")] += 1
-    return counts
+def _service_resource_types(service: str) -> List[str]:
+    return [resource_type for resource_type, label in SERVICE_LABELS.items() if label == service]
 
 
 def _level(score: int) -> Tuple[str, int]:
@@ -86,7 +160,7 @@ def _level(score: int) -> Tuple[str, int]:
     return "Low", 1
 
 
-def _heatmap(findings: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _heatmap(findings: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     grid = {}
     labels = ["Low", "Medium", "High"]
     for impact in labels:
@@ -125,131 +199,528 @@ def _heatmap(findings: List[Dict[str, Any]]) -> Dict[str, Any]:
     }
 
 
-def _summarize(findings: List[Dict[str, Any]]) -> Dict[str, Any]:
-    counts = _count_by_category(findings)
+def _summarize(scan_id: str) -> Dict[str, Any]:
+    counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
+    counts.update(SCAN_STORE.count_by(scan_id, "risk_category"))
     by_service = {"IAM": 0, "Storage": 0, "Network": 0}
-    for f in findings:
-        by_service[_service_label(f.get("resource_type", ""))] = (
-            by_service.get(_service_label(f.get("resource_type", "")), 0) + 1
-        )
+    for resource_type, count in SCAN_STORE.count_by(scan_id, "resource_type").items():
+        label = _service_label(resource_type or "")
+        by_service[label] = by_service.get(label, 0) + count
     return {"counts": counts, "by_service": by_service}
 
 
+def _scan_views(scan_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # Summary counts and heatmap are computed once per scan and cached in the
+    # store rather than on every page load.
+    summary = SCAN_STORE.get_view(scan_id, "summary")
+    heatmap = SCAN_STORE.get_view(scan_id, "heatmap")
+    if summary is None:
+        summary = _summarize(scan_id)
+        SCAN_STORE.put_view(scan_id, "summary", summary)
+    if heatmap is None:
+        heatmap = _heatmap(SCAN_STORE.iter_findings(scan_id))
+        SCAN_STORE.put_view(scan_id, "heatmap", heatmap)
+    return summary, heatmap
+
+
+def _remember_diff(base_id: str, head_id: str, diff: ScanDiff) -> None:
+    with _DIFFS_LOCK:
+        _DIFFS[(base_id, head_id)] = diff
+        _DIFFS.move_to_end((base_id, head_id))
+        while len(_DIFFS) > DIFF_CACHE_SIZE:
+            _DIFFS.popitem(last=False)
+
+
+def _scan_diff(base_id: str, head_id: str) -> ScanDiff:
+    with _DIFFS_LOCK:
+        diff = _DIFFS.get((base_id, head_id))
+    if diff is None:
+        diff = diff_indexes(SCAN_STORE.finding_keys(base_id), SCAN_STORE.finding_keys(head_id))
+        _remember_diff(base_id, head_id, diff)
+    return diff
+
+
+def _drift_view(scan_id: str) -> Optional[Dict[str, Any]]:
+    # Drift against the previous scan, cached in the store like the summary.
+    # None for the first scan.
+    drift = SCAN_STORE.get_view(scan_id, "drift")
+    if drift is None:
+        base = SCAN_STORE.previous_scan(scan_id)
+        if base is None:
+            return None
+        diff = _scan_diff(base["scan_id"], scan_id)
+        drift = drift_summary(
+            diff, SCAN_STORE.labels_at(scan_id, diff.new), SCAN_STORE.labels_at(base["scan_id"], diff.resolved)
+        )
+        drift.update(base_scan=base["scan_id"], base_timestamp=base["timestamp"])
+        SCAN_STORE.put_view(scan_id, "drift", drift)
+    return drift
+
+
+def _scan_drift(base: Dict[str, Any], findings: List[Any]) -> Tuple[ScanDiff, Dict[str, Any]]:
+    # Drift of a scan still in memory against a stored one, for its report.
+    diff = diff_indexes(SCAN_STORE.finding_keys(base["scan_id"]), index_findings(findings))
+    drift = drift_summary(
+        diff,
+        ((findings[position].get("id"), findings[position].get("risk_category")) for position in diff.new),
+        SCAN_STORE.labels_at(base["scan_id"], diff.resolved),
+    )
+    drift.update(base_scan=base["scan_id"], base_timestamp=base["timestamp"])
+    return diff, drift
+
+
+def _with_compliance(finding: Dict[str, Any]) -> Dict[str, Any]:
+    finding["service"] = _service_label(finding.get("resource_type", ""))
+    finding.update(compliance(finding.get("id")))
+    return finding
+
+
+def _finding_query(scan_id: str, total_findings: int) -> Dict[str, Any]:
+    # Filtering, sorting and paging parameters shared by /results and the API.
+    args = request.args
+    per_page = min(max(args.get("per_page", RESULTS_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    service = args.get("service") or None
+    sort = args.get("sort") or "priority"
+    if sort not in SORT_COLUMNS:
+        abort(400, f"Unsupported sort: {sort}")
+    filters = {
+        "resource_types": _service_resource_types(service) if service else None,
+        "risk_category": args.get("category") or None,
+        "rule_id": args.get("rule_id") or None,
+        "resource_contains": args.get("q") or None,
+        "sort": sort,
+        "descending": args.get("order") == "desc",
+    }
+    page = max(args.get("page", 1, type=int), 1)
+    findings, total = SCAN_STORE.query_findings(scan_id, (page - 1) * per_page, per_page, **filters)
+    page_count = max(1, -(-total // per_page))
+    if page > page_count:
+        page = page_count
+        findings, total = SCAN_STORE.query_findings(scan_id, (page - 1) * per_page, per_page, **filters)
+    return {
+        "findings": [_with_compliance(f) for f in findings],
+        "total": total,
+        "total_findings": total_findings,
+        "page": page,
+        "per_page": per_page,
+        "page_count": page_count,
+        "filters": {
+            "service": service or "",
+            "category": filters["risk_category"] or "",
+            "rule_id": filters["rule_id"] or "",
+            "q": filters["resource_contains"] or "",
+            "sort": sort,
+            "order": "desc" if filters["descending"] else "asc",
+        },
+    }
+
+
+def _last_scan_timestamp() -> Optional[str]:
+    latest = SCAN_STORE.latest_scan()
+    return latest["timestamp"] if latest else None
+
+
 @app.route("/", methods=["GET"])
 def index():
-    last_scan = LAST_SCAN.get("timestamp")
-    return render_template("scan.html", active_page="scan", last_scan=last_scan)
+    return render_template("scan.html", active_page="scan", last_scan=_last_scan_timestamp())
+
+
+def _run_scan_job(
+    job: ScanJob,
+    use_sample: bool,
+    upload_paths: Dict[str, Optional[str]],
+    export_formats: List[str],
+) -> Dict[str, Any]:
+    with instrumentation.profiling() as profile:
+        try:
+            result = _execute_scan(job, use_sample, upload_paths, export_formats)
+        except Exception:
+            instrumentation.count("scanner_scans_total", state=FAILED)
+            raise
+        instrumentation.count("scanner_scans_total", state=DONE)
+    if instrumentation.enabled():
+        SCAN_STORE.put_view(job.id, "profile", profile.to_dict())
+    return result
+
+
+def _execute_scan(
+    job: ScanJob,
+    use_sample: bool,
+    upload_paths: Dict[str, Optional[str]],
+    export_formats: List[str],
+) -> Dict[str, Any]:
+    errors: List[str] = []
+    try:
+        job.start_phase("parse")
+        if use_sample:
+            with instrumentation.stage("parse"):
+                data = _load_sample()
+                iam_policies, iam_parse_errors = parse_iam_policies(data.get("iam_policies"))
+                s3_configs, s3_parse_errors = parse_s3_configs(data.get("s3_configs"))
+                security_groups, sg_parse_errors = parse_security_groups(data.get("security_groups"))
+            errors.extend(iam_parse_errors + s3_parse_errors + sg_parse_errors)
+            inputs = {
+                "iam_policies": iam_policies,
+                "s3_configs": s3_configs,
+                "security_groups": security_groups,
+            }
+        else:
+            inputs = {
+                key: instrumentation.timed_iter("parse", _stream_from_upload(upload_paths.get(key), stream_fn, errors))
+                for key, _, stream_fn in UPLOAD_FIELDS
+            }
+
+        # Streamed uploads are parsed lazily while the rules consume them, so
+        # parse progress and errors are only complete once the rules finish,
+        # and the "rules" stage time includes the "parse" time of uploads.
+        job.start_phase("rules")
+        with instrumentation.stage("rules"):
+            findings = run_all_rules(
+                {key: job.count("parse", resources) for key, resources in inputs.items()},
+                workers=RULE_WORKERS,
+                cache=RESULT_CACHE,
+            )
+        job.finish_phase("parse")
+        job.finish_phase("rules", len(findings))
+        if errors:
+            logger.warning("Scan %s parse errors: %s", job.id, errors)
+    finally:
+        for path in upload_paths.values():
+            if path:
+                os.remove(path)
+
+    job.start_phase("score")
+    with instrumentation.stage("score"):
+        # Every finding is stored and exported, so they are fully ordered;
+        # the category counts and posture come from the same pass.
+        stream = PriorityStream(profile=SCORING_PROFILE, full_order=True)
+        stream.extend(findings)
+        prioritized = stream.ordered()
+        posture = stream.posture()
+        counts = stream.counts()
+    job.finish_phase("score", len(prioritized))
+
+    job.start_phase("report")
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    # The job id suffix keeps names unique when scans finish in the same second.
+    report_name = f"report-{datetime.datetime.utcnow().strftime('%Y%m%d-%H%M%S')}-{job.id[:8]}.html"
+    job.report_name = report_name
+    base = SCAN_STORE.latest_scan()
+    diff = drift = report_drift = None
+    if base is not None:
+        with instrumentation.stage("diff"):
+            diff, drift = _scan_drift(base, prioritized)
+            report_drift = dict(
+                drift,
+                new_findings=[prioritized[position] for position in diff.new[:DRIFT_ROWS]],
+                resolved_findings=SCAN_STORE.findings_at(base["scan_id"], diff.resolved[:DRIFT_ROWS]),
+            )
+    with instrumentation.stage("report"):
+        # Keyed by what the report shows, so a rescan that finds the same
+        # things reuses the stored report instead of rendering it again.
+        REPORT_STORE.write(
+            report_name,
+            iter_report(prioritized, posture, counts, drift=report_drift),
+            digest=report_digest(prioritized, posture, counts, report_drift),
+        )
+    stem = os.path.join(REPORTS_DIR, os.path.splitext(report_name)[0])
+    with instrumentation.stage("export"):
+        exports = {fmt: os.path.basename(export_findings(prioritized, fmt, stem)) for fmt in export_formats}
+
+    now = datetime.datetime.utcnow()
+    timestamp = now.strftime("%Y-%m-%d %H:%M UTC")
+    with instrumentation.stage("store"):
+        SCAN_STORE.save_scan(job.id, prioritized, posture, report_name, now.isoformat(), timestamp, errors)
+        _scan_views(job.id)
+        if drift is not None:
+            SCAN_STORE.put_view(job.id, "drift", drift)
+            _remember_diff(drift["base_scan"], job.id, diff)
+
+    pruned = SCAN_INDEX.append(job.id, now.isoformat(), timestamp, posture, report_name, counts, exports)
+    if pruned:
+        _delete_scans(pruned)
+    job.finish_phase("report", 1 + len(exports))
+    return {"scan_id": job.id, "exports": exports}
+
+
+def _delete_scans(scan_ids: List[str]) -> None:
+    # Scans pruned from the history by retention: their findings, views and
+    # report names go too, and report content no other scan shares.
+    report_names = []
+    for scan_id in scan_ids:
+        scan_meta = SCAN_STORE.get_scan(scan_id)
+        if scan_meta is None:
+            continue
+        if scan_meta["report_name"]:
+            report_names.append(scan_meta["report_name"])
+        SCAN_STORE.delete_scan(scan_id)
+    REPORT_STORE.delete(report_names)
+
+
+def _wants_json() -> bool:
+    return request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json"
 
 
 @app.route("/scan", methods=["POST"])
 def scan():
-    errors = []
-    if request.form.get("use_sample"):
-        data = _load_sample()
-        iam_raw = data.get("iam_policies")
-        s3_raw = data.get("s3_configs")
-        sg_raw = data.get("security_groups")
-    else:
-        iam_raw, iam_errors = _load_json_from_upload(request.files.get("iam_file"))
-        s3_raw, s3_errors = _load_json_from_upload(request.files.get("s3_file"))
-        sg_raw, sg_errors = _load_json_from_upload(request.files.get("sg_file"))
-        errors.extend(iam_errors + s3_errors + sg_errors)
-
-    # Debug: raw upload checks
-    print("IAM RAW:", isinstance(iam_raw, (dict, list)), iam_raw if isinstance(iam_raw, (dict, list)) else str(iam_raw))
-    print("S3 RAW:", isinstance(s3_raw, (dict, list)), s3_raw if isinstance(s3_raw, (dict, list)) else str(s3_raw))
-    print("SG RAW:", isinstance(sg_raw, (dict, list)), sg_raw if isinstance(sg_raw, (dict, list)) else str(sg_raw))
-
-    iam_policies, iam_parse_errors = parse_iam_policies(iam_raw)
-    s3_configs, s3_parse_errors = parse_s3_configs(s3_raw)
-    security_groups, sg_parse_errors = parse_security_groups(sg_raw)
-    errors.extend(iam_parse_errors + s3_parse_errors + sg_parse_errors)
-
-    # Debug: parser output counts
-    print("IAM PARSED COUNT:", len(iam_policies))
-    print("S3 PARSED COUNT:", len(s3_configs))
-    print("SG PARSED COUNT:", len(security_groups))
-    print("PARSER ERRORS:", iam_parse_errors + s3_parse_errors + sg_parse_errors)
-
-    findings = run_all_rules({
-        "iam_policies": iam_policies,
-        "s3_configs": s3_configs,
-        "security_groups": security_groups,
-    })
+    use_sample = bool(request.form.get("use_sample"))
+    upload_paths: Dict[str, Optional[str]] = {}
+    if not use_sample:
+        for key, field, _ in UPLOAD_FIELDS:
+            upload_paths[key] = _spool_upload(request.files.get(field))
 
-    prioritized = prioritize(findings)
-    posture = overall_posture(prioritized)
-    report_html = generate_report(prioritized, posture)
-
-    os.makedirs(REPORTS_DIR, exist_ok=True)
-    report_name = f"report-{datetime.datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.html"
-    report_path = os.path.join(REPORTS_DIR, report_name)
-    with open(report_path, "w", encoding="utf-8") as f:
-        f.write(report_html)
-
-    summary = f"{posture[0]} (Score {posture[1]})"
-    timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
-    index_entries = _load_index()
-    index_entries.insert(
-        0,
-        {
-            "report_name": report_name,
-            "created_at": timestamp,
-            "summary": summary,
-            "counts": _count_by_category(prioritized),
-        },
-    )
-    _save_index(index_entries[:50])
-
-    LAST_SCAN.update(
-        {
-            "timestamp": timestamp,
-            "summary": summary,
-            "posture": posture,
-            "report_name": report_name,
-            "errors": errors,
-            "findings": prioritized,
-        }
-    )
-
-    return redirect(url_for("results"))
+    export_formats = parse_formats(request.form.getlist("exports"))
+    try:
+        job = SCAN_JOBS.submit(_run_scan_job, use_sample, upload_paths, export_formats)
+    except QueueFull:
+        for path in upload_paths.values():
+            if path:
+                os.remove(path)
+        abort(503, "Too many scans are queued; try again later.")
+    status_url = url_for("scan_status", job_id=job.id)
+    results_url = url_for("results", job=job.id)
+    if _wants_json():
+        return jsonify({"job_id": job.id, "status_url": status_url, "results_url": results_url}), 202
+    return redirect(results_url)
+
+
+@app.route("/scan/<job_id>", methods=["GET"])
+def scan_status(job_id):
+    job = SCAN_JOBS.get(job_id)
+    if job is None:
+        abort(404)
+    status = job.snapshot()
+    status["results_url"] = url_for("results", job=job.id) if status["state"] == DONE else None
+    status["report_url"] = url_for("report", filename=job.report_name) if job.report_name else None
+    return jsonify(status)
 
 
 @app.route("/results", methods=["GET"])
 def results():
-    if not LAST_SCAN:
+    scan_id = request.args.get("scan")
+    job_id = request.args.get("job")
+    if job_id:
+        job = SCAN_JOBS.get(job_id)
+        status = job.snapshot() if job is not None else None
+        if status is not None and status["state"] != DONE:
+            return render_template(
+                "results.html",
+                active_page="results",
+                empty_state=False,
+                pending_job=status,
+                failed=status["state"] == FAILED,
+                status_url=url_for("scan_status", job_id=job.id),
+            )
+        # Jobs store their results under the job id.
+        scan_id = job_id
+
+    scan_meta = SCAN_STORE.get_scan(scan_id) if scan_id else SCAN_STORE.latest_scan()
+    if scan_meta is None:
+        if scan_id:
+            abort(404)
         return render_template("results.html", active_page="results", empty_state=True)
 
-    findings = LAST_SCAN.get("findings", [])
-    for finding in findings:
-        finding["service"] = _service_label(finding.get("resource_type", ""))
-        finding["cis"] = CIS_MAPPING.get(finding.get("id"), [])
-        finding["owasp"] = OWASP_CLOUD_MAPPING.get(finding.get("id"), [])
-        finding["mitre"] = MITRE_MAPPING.get(finding.get("id"), [])
-    summary = _summarize(findings)
-    heatmap = _heatmap(findings)
+    scan_id = scan_meta["scan_id"]
+    query = _finding_query(scan_id, scan_meta["finding_count"])
+    summary, heatmap = _scan_views(scan_id)
     return render_template(
         "results.html",
         active_page="results",
         empty_state=False,
-        findings=findings,
+        scan_id=scan_id,
         summary=summary,
         heatmap=heatmap,
-        report_name=LAST_SCAN.get("report_name"),
-        posture=LAST_SCAN.get("posture"),
-        timestamp=LAST_SCAN.get("timestamp"),
-        errors=LAST_SCAN.get("errors", []),
+        drift=_drift_view(scan_id),
+        report_name=scan_meta.get("report_name"),
+        posture=scan_meta.get("posture"),
+        timestamp=scan_meta.get("timestamp"),
+        errors=scan_meta.get("errors", []),
+        services=sorted(set(SERVICE_LABELS.values())),
+        categories=["Critical", "High", "Medium", "Low"],
+        rule_ids=sorted(key for key in SCAN_STORE.count_by(scan_id, "rule_id") if key),
+        **query,
     )
 
 
+@app.route("/api/scans/<scan_id>/findings", methods=["GET"])
+def api_scan_findings(scan_id):
+    scan_meta = SCAN_STORE.get_scan(scan_id)
+    if scan_meta is None:
+        abort(404)
+    return jsonify(_finding_query(scan_id, scan_meta["finding_count"]))
+
+
+@app.route("/api/scans/<scan_id>/summary", methods=["GET"])
+def api_scan_summary(scan_id):
+    scan_meta = SCAN_STORE.get_scan(scan_id)
+    if scan_meta is None:
+        abort(404)
+    summary, heatmap = _scan_views(scan_id)
+    return jsonify({
+        "scan_id": scan_id,
+        "timestamp": scan_meta["timestamp"],
+        "posture": list(scan_meta["posture"]),
+        "finding_count": scan_meta["finding_count"],
+        "summary": summary,
+        "heatmap": heatmap,
+        "drift": _drift_view(scan_id),
+    })
+
+
+@app.route("/api/scans/<scan_id>/diff", methods=["GET"])
+def api_scan_diff(scan_id):
+    # One page of the findings new in scan_id, resolved since the base scan
+    # (the previous one unless ?base= is given) or unchanged between them.
+    if SCAN_STORE.get_scan(scan_id) is None:
+        abort(404)
+    base_id = request.args.get("base")
+    base = SCAN_STORE.get_scan(base_id) if base_id else SCAN_STORE.previous_scan(scan_id)
+    if base is None:
+        abort(404)
+    change = request.args.get("change", "new")
+    if change not in DIFF_CHANGES:
+        abort(400, f"Unsupported change: {change}")
+    args = request.args
+    per_page = min(max(args.get("per_page", RESULTS_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    diff = _scan_diff(base["scan_id"], scan_id)
+    positions = getattr(diff, change)
+    page_count = max(1, -(-len(positions) // per_page))
+    page = min(max(args.get("page", 1, type=int), 1), page_count)
+    source = base["scan_id"] if change == "resolved" else scan_id
+    findings = SCAN_STORE.findings_at(source, positions[(page - 1) * per_page : page * per_page])
+    return jsonify({
+        "scan_id": scan_id,
+        "base_scan": base["scan_id"],
+        "change": change,
+        "counts": diff.counts(),
+        "findings": [_with_compliance(f) for f in findings],
+        "total": len(positions),
+        "page": page,
+        "per_page": per_page,
+        "page_count": page_count,
+    })
+
+
+@app.route("/api/scans/<scan_id>/export/<fmt>", methods=["GET"])
+def api_scan_export(scan_id, fmt):
+    # Exports a stored scan on demand; the file is written once and reused.
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    if SCAN_STORE.get_scan(scan_id) is None:
+        abort(404)
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    stem = os.path.join(REPORTS_DIR, f"export-{scan_id}")
+    path = stem + export_extension(fmt)
+    if not os.path.exists(path):
+        path = export_findings(SCAN_STORE.iter_findings(scan_id), fmt, stem)
+    return send_from_directory(REPORTS_DIR, os.path.basename(path), as_attachment=True)
+
+
+@app.route("/api/scans/<scan_id>/profile", methods=["GET"])
+def api_scan_profile(scan_id):
+    if SCAN_STORE.get_scan(scan_id) is None:
+        abort(404)
+    return jsonify({"scan_id": scan_id, "profile": SCAN_STORE.get_view(scan_id, "profile")})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(instrumentation.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _next_day(date: str) -> str:
+    try:
+        return (datetime.date.fromisoformat(date) + datetime.timedelta(days=1)).isoformat()
+    except ValueError:
+        abort(400, f"Invalid date: {date}")
+
+
 @app.route("/reports", methods=["GET"])
 def reports():
-    entries = _load_index()
-    return render_template("reports.html", active_page="reports", reports=entries, last_scan=LAST_SCAN.get("timestamp"))
+    # Pages through the scan history, newest first. since/until are dates
+    # (until inclusive), posture a risk category, min_score a posture score.
+    args = request.args
+    per_page = min(max(args.get("per_page", REPORTS_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    filters = {
+        "since": args.get("since") or "",
+        "until": args.get("until") or "",
+        "posture": args.get("posture") or "",
+        "min_score": args.get("min_score") or "",
+    }
+    query = {
+        "since": filters["since"] or None,
+        "until": _next_day(filters["until"]) if filters["until"] else None,
+        "postures": [filters["posture"]] if filters["posture"] else None,
+        "min_score": args.get("min_score", type=int),
+    }
+    page = max(args.get("page", 1, type=int), 1)
+    entries, total = SCAN_INDEX.query((page - 1) * per_page, per_page, **query)
+    page_count = max(1, -(-total // per_page))
+    if page > page_count:
+        page = page_count
+        entries, total = SCAN_INDEX.query((page - 1) * per_page, per_page, **query)
+    return render_template(
+        "reports.html",
+        active_page="reports",
+        reports=entries,
+        total=total,
+        page=page,
+        per_page=per_page,
+        page_count=page_count,
+        filters=filters,
+        categories=["Critical", "High", "Medium", "Low"],
+        last_scan=_last_scan_timestamp(),
+    )
+
+
+def _content_disposition(filename: str) -> str:
+    # Quoted the way send_file() does it: non-ASCII names get an ASCII
+    # fallback plus the RFC 5987 filename*.
+    try:
+        filename.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode("ascii")
+        names = {"filename": simple, "filename*": f"UTF-8''{quote(filename, safe='!#$&+-.^_`|~')}"}
+    else:
+        names = {"filename": filename}
+    return dump_options_header("attachment", names)
+
+
+def _encoded_report(chunks: Iterator[bytes], encoding: str, filename: str) -> Response:
+    # Compressed bytes pass through with Content-Encoding; they are only
+    # decompressed for clients that do not accept the encoding.
+    headers = {"Content-Disposition": _content_disposition(filename), "Vary": "Accept-Encoding"}
+    if request.accept_encodings[encoding]:
+        headers["Content-Encoding"] = encoding
+    else:
+        chunks = decode(chunks, encoding)
+    return Response(stream_with_context(chunks), mimetype="text/html", headers=headers)
 
 
 @app.route("/report/<path:filename>", methods=["GET"])
 def report(filename):
+    # Checked before the lookup: a report that finishes in between is then
+    # found by the lookup, or served whole by the follower.
+    if REPORT_STORE.writing(filename):
+        # Still being written by a scan job: stream what exists and follow the
+        # file until the writer finishes.
+        chunks = REPORT_STORE.follow(filename)
+        if chunks is not None:
+            return _encoded_report(chunks, REPORT_STORE.codec, filename)
+    stored = REPORT_STORE.lookup(filename)
+    if stored is not None:
+        if not request.accept_encodings[stored.encoding]:
+            return _encoded_report(read_chunks(stored.path), stored.encoding, filename)
+        response = send_file(
+            stored.path, mimetype="text/html", as_attachment=True, download_name=filename, etag=stored.digest
+        )
+        response.headers["Content-Encoding"] = stored.encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+    # Exports, and reports written before the report store.
+    path = safe_join(REPORTS_DIR, filename)
+    if path is None:
+        abort(404)
     return send_from_directory(REPORTS_DIR, filename, as_attachment=True)
 
 
@@ -0,0 +1,136 @@
+import datetime
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("parse", "rules", "score", "report")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ScanJob:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.state = PENDING
+        self.created_at = datetime.datetime.utcnow()
+        self.finished_at: Optional[datetime.datetime] = None
+        self.error: Optional[str] = None
+        self.result: Dict[str, Any] = {}
+        # Set once the report phase starts so the report can be followed while
+        # it is still being written.
+        self.report_name: Optional[str] = None
+        self.phases = OrderedDict((name, {"state": PENDING, "items": 0}) for name in PHASES)
+        self._lock = threading.Lock()
+
+    def set_state(self, state: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        # Finished states also record the result or error and the finish time.
+        with self._lock:
+            self.state = state
+            if state in (DONE, FAILED):
+                self.result = result or {}
+                self.error = error
+                self.finished_at = datetime.datetime.utcnow()
+
+    def finished(self) -> bool:
+        with self._lock:
+            return self.state in (DONE, FAILED)
+
+    def start_phase(self, name: str) -> None:
+        with self._lock:
+            self.phases[name]["state"] = RUNNING
+
+    def advance(self, name: str, items: int) -> None:
+        with self._lock:
+            self.phases[name]["items"] += items
+
+    def finish_phase(self, name: str, items: Optional[int] = None) -> None:
+        with self._lock:
+            self.phases[name]["state"] = DONE
+            if items is not None:
+                self.phases[name]["items"] = items
+
+    def count(self, name: str, records: Iterable[Any], every: int = 1000) -> Iterator[Any]:
+        # Passes records through while reporting progress on phase `name`.
+        pending = 0
+        for record in records:
+            yield record
+            pending += 1
+            if pending >= every:
+                self.advance(name, pending)
+                pending = 0
+        if pending:
+            self.advance(name, pending)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "state": self.state,
+                "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S UTC"),
+                "finished_at": self.finished_at.strftime("%Y-%m-%d %H:%M:%S UTC") if self.finished_at else None,
+                "phases": {name: dict(phase) for name, phase in self.phases.items()},
+                "error": self.error,
+                "report_name": self.report_name,
+            }
+
+
+class JobQueue:
+    # Runs scan jobs on a bounded thread pool so the request that submits a scan
+    # returns immediately. At most `max_pending` jobs wait or run at once;
+    # finished jobs are retained up to `max_jobs`, oldest evicted first.
+    def __init__(self, workers: int = 2, max_jobs: int = 100, max_pending: int = 20):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan-job")
+        self._jobs: "OrderedDict[str, ScanJob]" = OrderedDict()
+        self._max_jobs = max_jobs
+        self._max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Dict[str, Any]], *args: Any) -> ScanJob:
+        # Raises QueueFull instead of queueing past max_pending jobs.
+        job = ScanJob(uuid.uuid4().hex)
+        with self._lock:
+            if self._pending >= self._max_pending:
+                raise QueueFull(f"{self._pending} scan jobs are already pending")
+            self._pending += 1
+            self._jobs[job.id] = job
+            excess = len(self._jobs) - self._max_jobs
+            if excess > 0:
+                # Jobs still pending or running are never evicted.
+                for old in [old for old in self._jobs.values() if old.finished()][:excess]:
+                    del self._jobs[old.id]
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job: ScanJob, fn: Callable[..., Dict[str, Any]], args: tuple) -> None:
+        job.set_state(RUNNING)
+        try:
+            result = fn(job, *args) or {}
+        except Exception as exc:
+            logger.exception("Scan job %s failed", job.id)
+            job.set_state(FAILED, error=f"{type(exc).__name__}: {exc}")
+        else:
+            job.set_state(DONE, result=result)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[ScanJob]:
+        with self._lock:
+            return list(self._jobs.values())
@@ -9,6 +9,39 @@
         setTimeout(() => toast.classList.add("hidden"), 3000);
     };
 
+    const pollJob = (statusUrl, onProgress) => new Promise((resolve, reject) => {
+        const tick = () => {
+            fetch(statusUrl, { headers: { Accept: "application/json" } })
+                .then((response) => {
+                    if (!response.ok) throw new Error(`Scan status unavailable (${response.status})`);
+                    return response.json();
+                })
+                .then((snapshot) => {
+                    if (onProgress) onProgress(snapshot);
+                    if (snapshot.state === "done") return resolve(snapshot);
+                    if (snapshot.state === "failed") return reject(new Error(snapshot.error || "Scan failed"));
+                    setTimeout(tick, 1000);
+                })
+                .catch(reject);
+        };
+        tick();
+    });
+
+    const initJobStatus = () => {
+        const panel = document.getElementById("job-status");
+        if (!panel || !panel.dataset.statusUrl) return;
+        pollJob(panel.dataset.statusUrl, (snapshot) => {
+            Object.entries(snapshot.phases).forEach(([name, phase]) => {
+                const cell = panel.querySelector(`[data-phase="${name}"]`);
+                if (!cell) return;
+                cell.querySelector(".phase-state").textContent = phase.state;
+                cell.querySelector(".phase-items").textContent = phase.items;
+            });
+        })
+            .then(() => window.location.reload())
+            .catch((error) => showToast(error.message));
+    };
+
     const initUploadCards = () => {
         const cards = document.querySelectorAll("[data-upload-card]");
         cards.forEach((card) => {
@@ -51,13 +84,47 @@
         const runButton = document.getElementById("run-scan");
         const status = document.getElementById("scan-status");
         if (!form || !runButton || !status) return;
+        const statusText = status.querySelector(".scan-status-text") || status;
 
-        form.addEventListener("submit", () => {
+        const resetButton = () => {
+            runButton.disabled = false;
+            runButton.classList.remove("opacity-60", "cursor-not-allowed");
+            status.classList.add("hidden");
+            status.classList.remove("flex");
+        };
+
+        form.addEventListener("submit", (event) => {
+            if (!window.fetch || !window.FormData) return;
+            // Scans run as background jobs: submit, then poll the job status.
+            event.preventDefault();
             runButton.disabled = true;
             runButton.classList.add("opacity-60", "cursor-not-allowed");
             status.classList.remove("hidden");
             status.classList.add("flex");
             showToast("Scan initiated. Analyzing configurations.");
+
+            fetch(form.action, {
+                method: "POST",
+                body: new FormData(form),
+                headers: { Accept: "application/json" }
+            })
+                .then((response) => {
+                    if (!response.ok) throw new Error(`Scan request failed (${response.status})`);
+                    return response.json();
+                })
+                .then((job) => pollJob(job.status_url, (snapshot) => {
+                    const running = Object.entries(snapshot.phases).find(([, phase]) => phase.state === "running");
+                    if (running) {
+                        statusText.textContent = `Running ${running[0]} phase (${running[1].items} processed).`;
+                    }
+                }))
+                .then((snapshot) => {
+                    window.location.href = snapshot.results_url;
+                })
+                .catch((error) => {
+                    resetButton();
+                    showToast(error.message);
+                });
         });
 
         form.addEventListener("reset", () => {
@@ -141,14 +208,115 @@
     };
 
     const initExpandableRows = () => {
-        const buttons = document.querySelectorAll(".toggle-row");
-        buttons.forEach((button) => {
-            button.addEventListener("click", () => {
-                const target = document.getElementById(button.dataset.target);
-                if (!target) return;
-                target.classList.toggle("hidden");
-                button.textContent = target.classList.contains("hidden") ? "View" : "Hide";
-            });
+        // Delegated so rows rendered from the findings API toggle as well.
+        document.addEventListener("click", (event) => {
+            const button = event.target.closest(".toggle-row");
+            if (!button) return;
+            const target = document.getElementById(button.dataset.target);
+            if (!target) return;
+            target.classList.toggle("hidden");
+            button.textContent = target.classList.contains("hidden") ? "View" : "Hide";
+        });
+    };
+
+    const escapeHtml = (value) => String(value ?? "").replace(/[&<>"']/g, (ch) => ({
+        "&": "&amp;", "<": "&lt;", ">": "&gt;", "\"": "&quot;", "'": "&#39;"
+    })[ch]);
+
+    const riskBadgeClass = {
+        Critical: "bg-critical text-white",
+        High: "bg-high text-white",
+        Medium: "bg-medium text-black",
+        Low: "bg-low text-black"
+    };
+
+    const renderFindingRows = (findings, offset) => findings.map((f, index) => {
+        const rowId = `detail-${offset + index + 1}`;
+        const likelihood = f.likelihood_factors || {};
+        const pattern = likelihood.common_attack_pattern || "medium";
+        return `
+            <tr class="border-b border-border">
+                <td class="p-3 mono">${escapeHtml(f.fix_priority)}</td>
+                <td class="p-3">
+                    <div class="font-semibold">${escapeHtml(f.title)}</div>
+                    <div class="text-xs text-muted mono">${escapeHtml(f.resource_type)}::${escapeHtml(f.resource_id)}</div>
+                </td>
+                <td class="p-3"><span class="px-2.5 py-1 rounded-full text-xs font-semibold tracking-wide ${riskBadgeClass[f.risk_category] || "bg-slate-600 text-white"}">${escapeHtml(f.risk_category)}</span></td>
+                <td class="p-3"><span class="px-2 py-1 rounded-md text-[11px] border border-border bg-[#0b1220] mono text-muted uppercase">${escapeHtml(f.service)}</span></td>
+                <td class="p-3 mono">${escapeHtml(f.risk_score)}</td>
+                <td class="p-3">
+                    <button class="text-xs underline text-muted mono toggle-row" data-target="${rowId}">View</button>
+                </td>
+            </tr>
+            <tr id="${rowId}" class="hidden bg-[#0b1220] border-b border-border">
+                <td colspan="6" class="p-4">
+                    <div class="grid grid-cols-1 lg:grid-cols-3 gap-4 text-sm">
+                        <div>
+                            <div class="text-xs text-muted uppercase tracking-widest">Why this matters</div>
+                            <p class="mt-2 text-sm text-muted">${escapeHtml(f.description)}</p>
+                        </div>
+                        <div>
+                            <div class="text-xs text-muted uppercase tracking-widest">Attack scenario</div>
+                            <p class="mt-2 text-sm text-muted">Exploit path aligns with ${escapeHtml(pattern.charAt(0).toUpperCase() + pattern.slice(1).toLowerCase())}-frequency attacker behavior and ${escapeHtml(likelihood.ease_of_exploit || "moderate")} exploitation effort.</p>
+                        </div>
+                        <div>
+                            <div class="text-xs text-muted uppercase tracking-widest">Recommended fix</div>
+                            <p class="mt-2 text-sm text-muted">${escapeHtml(f.remediation)}</p>
+                        </div>
+                    </div>
+                    <div class="mt-3 grid grid-cols-1 lg:grid-cols-3 gap-3 text-xs">
+                        <div class="text-muted mono">Impact: ${escapeHtml(JSON.stringify(f.impact_factors || {}))}</div>
+                        <div class="text-muted mono">Likelihood: ${escapeHtml(JSON.stringify(likelihood))}</div>
+                        <div class="text-muted mono">Compliance: CIS ${escapeHtml((f.cis || []).join(", "))} | OWASP ${escapeHtml((f.owasp || []).join(", "))} | MITRE ${escapeHtml((f.mitre || []).join(", "))}</div>
+                    </div>
+                </td>
+            </tr>`;
+    }).join("");
+
+    const initFindingsTable = () => {
+        const panel = document.getElementById("findings-panel");
+        const form = document.getElementById("findings-filters");
+        const rows = document.getElementById("findings-rows");
+        const pager = document.getElementById("findings-pager");
+        if (!panel || !form || !rows || !pager || !window.fetch) return;
+
+        // Filtering, sorting and paging fetch one page from the findings API
+        // instead of reloading the dashboard.
+        const load = (page) => {
+            const params = new URLSearchParams(new FormData(form));
+            params.delete("scan");
+            params.set("page", page);
+            fetch(`${panel.dataset.apiUrl}?${params}`, { headers: { Accept: "application/json" } })
+                .then((response) => {
+                    if (!response.ok) throw new Error(`Findings unavailable (${response.status})`);
+                    return response.json();
+                })
+                .then((data) => {
+                    rows.innerHTML = renderFindingRows(data.findings, (data.page - 1) * data.per_page);
+                    pager.querySelector(".pager-label").textContent =
+                        `Page ${data.page} of ${data.page_count} · ${data.total} findings`;
+                    const links = pager.querySelector("div");
+                    links.innerHTML = [
+                        data.page > 1 ? `<a class="underline pager-link" data-page="${data.page - 1}" href="#">Previous</a>` : "",
+                        data.page < data.page_count ? `<a class="underline pager-link" data-page="${data.page + 1}" href="#">Next</a>` : ""
+                    ].join("");
+                    const browserParams = new URLSearchParams(new FormData(form));
+                    browserParams.set("page", data.page);
+                    window.history.replaceState(null, "", `${form.action}?${browserParams}`);
+                })
+                .catch((error) => showToast(error.message));
+        };
+
+        form.addEventListener("submit", (event) => {
+            event.preventDefault();
+            load(1);
+        });
+        form.querySelectorAll("select").forEach((select) => select.addEventListener("change", () => load(1)));
+        pager.addEventListener("click", (event) => {
+            const link = event.target.closest(".pager-link");
+            if (!link) return;
+            event.preventDefault();
+            load(parseInt(link.dataset.page, 10));
         });
     };
 
@@ -158,8 +326,10 @@
         initRiskChart();
         initHeatmap();
         initExpandableRows();
+        initFindingsTable();
+        initJobStatus();
 
-        if (document.body.dataset.page === "results") {
+        if (document.body.dataset.page === "results" && !document.getElementById("job-status")) {
             showToast("Scan completed. Review prioritized findings.");
         }
     };
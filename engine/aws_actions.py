@@ -0,0 +1,101 @@
+# Known AWS IAM actions, grouped by service prefix. This is the universe the
+# action index expands wildcard patterns against; it covers the services the
+# scanner reasons about rather than the full AWS catalog. Add actions here
+# when a rule needs to recognize them.
+
+KNOWN_ACTIONS = {
+    "iam": (
+        "AddRoleToInstanceProfile", "AddUserToGroup", "AttachGroupPolicy", "AttachRolePolicy",
+        "AttachUserPolicy", "ChangePassword", "CreateAccessKey", "CreateGroup", "CreateInstanceProfile",
+        "CreateLoginProfile", "CreatePolicy", "CreatePolicyVersion", "CreateRole", "CreateServiceLinkedRole",
+        "CreateUser", "DeleteAccessKey", "DeleteGroup", "DeleteGroupPolicy", "DeleteInstanceProfile",
+        "DeleteLoginProfile", "DeletePolicy", "DeletePolicyVersion", "DeleteRole", "DeleteRolePermissionsBoundary",
+        "DeleteRolePolicy", "DeleteUser", "DeleteUserPermissionsBoundary", "DeleteUserPolicy", "DetachGroupPolicy",
+        "DetachRolePolicy", "DetachUserPolicy", "GetAccountAuthorizationDetails", "GetGroup", "GetGroupPolicy",
+        "GetInstanceProfile", "GetLoginProfile", "GetPolicy", "GetPolicyVersion", "GetRole", "GetRolePolicy",
+        "GetUser", "GetUserPolicy", "ListAccessKeys", "ListAttachedGroupPolicies", "ListAttachedRolePolicies",
+        "ListAttachedUserPolicies", "ListGroups", "ListInstanceProfiles", "ListPolicies", "ListPolicyVersions",
+        "ListRolePolicies", "ListRoles", "ListUserPolicies", "ListUsers", "PassRole", "PutGroupPolicy",
+        "PutRolePermissionsBoundary", "PutRolePolicy", "PutUserPermissionsBoundary", "PutUserPolicy",
+        "RemoveRoleFromInstanceProfile", "RemoveUserFromGroup", "SetDefaultPolicyVersion", "TagRole", "TagUser",
+        "UpdateAccessKey", "UpdateAssumeRolePolicy", "UpdateLoginProfile", "UpdateRole", "UpdateUser",
+    ),
+    "sts": (
+        "AssumeRole", "AssumeRoleWithSAML", "AssumeRoleWithWebIdentity", "DecodeAuthorizationMessage",
+        "GetCallerIdentity", "GetFederationToken", "GetSessionToken", "TagSession",
+    ),
+    "s3": (
+        "AbortMultipartUpload", "CreateBucket", "DeleteBucket", "DeleteBucketPolicy", "DeleteObject",
+        "DeleteObjectVersion", "GetBucketAcl", "GetBucketLocation", "GetBucketLogging", "GetBucketPolicy",
+        "GetBucketPublicAccessBlock", "GetBucketVersioning", "GetEncryptionConfiguration", "GetObject",
+        "GetObjectAcl", "GetObjectTagging", "GetObjectVersion", "ListAllMyBuckets", "ListBucket",
+        "ListBucketVersions", "ListMultipartUploadParts", "PutBucketAcl", "PutBucketLogging", "PutBucketPolicy",
+        "PutBucketPublicAccessBlock", "PutBucketVersioning", "PutEncryptionConfiguration", "PutObject",
+        "PutObjectAcl", "PutObjectTagging", "ReplicateObject", "RestoreObject",
+    ),
+    "ec2": (
+        "AssociateIamInstanceProfile", "AttachVolume", "AuthorizeSecurityGroupEgress",
+        "AuthorizeSecurityGroupIngress", "CreateSecurityGroup", "CreateSnapshot", "CreateTags", "CreateVolume",
+        "DeleteSecurityGroup", "DeleteSnapshot", "DeleteVolume", "DescribeInstances", "DescribeSecurityGroups",
+        "DescribeSnapshots", "DescribeVolumes", "DescribeVpcs", "GetPasswordData", "ModifyInstanceAttribute",
+        "ModifySnapshotAttribute", "ReplaceIamInstanceProfileAssociation", "RevokeSecurityGroupEgress",
+        "RevokeSecurityGroupIngress", "RunInstances", "StartInstances", "StopInstances", "TerminateInstances",
+    ),
+    "lambda": (
+        "AddPermission", "CreateEventSourceMapping", "CreateFunction", "DeleteFunction", "GetFunction",
+        "GetFunctionConfiguration", "InvokeFunction", "ListFunctions", "PublishVersion", "RemovePermission",
+        "UpdateFunctionCode", "UpdateFunctionConfiguration",
+    ),
+    "kms": (
+        "CreateGrant", "CreateKey", "Decrypt", "DescribeKey", "DisableKey", "Encrypt", "GenerateDataKey",
+        "GenerateDataKeyWithoutPlaintext", "GetKeyPolicy", "ListKeys", "PutKeyPolicy", "ReEncryptFrom",
+        "ReEncryptTo", "RetireGrant", "RevokeGrant", "ScheduleKeyDeletion",
+    ),
+    "secretsmanager": (
+        "CreateSecret", "DeleteSecret", "DescribeSecret", "GetSecretValue", "ListSecrets", "PutResourcePolicy",
+        "PutSecretValue", "RotateSecret", "UpdateSecret",
+    ),
+    "ssm": (
+        "DescribeParameters", "GetParameter", "GetParameters", "GetParametersByPath", "PutParameter",
+        "SendCommand", "StartSession",
+    ),
+    "dynamodb": (
+        "BatchGetItem", "BatchWriteItem", "CreateTable", "DeleteItem", "DeleteTable", "DescribeTable",
+        "GetItem", "ListTables", "PutItem", "Query", "Scan", "UpdateItem",
+    ),
+    "cloudformation": (
+        "CreateChangeSet", "CreateStack", "DeleteStack", "DescribeStacks", "ExecuteChangeSet",
+        "SetStackPolicy", "UpdateStack",
+    ),
+    "glue": (
+        "CreateDevEndpoint", "CreateJob", "GetDevEndpoint", "StartJobRun", "UpdateDevEndpoint", "UpdateJob",
+    ),
+    "datapipeline": (
+        "ActivatePipeline", "CreatePipeline", "PutPipelineDefinition",
+    ),
+    "codebuild": (
+        "CreateProject", "StartBuild", "UpdateProject",
+    ),
+    "sagemaker": (
+        "CreateNotebookInstance", "CreatePresignedNotebookInstanceUrl", "CreateProcessingJob",
+        "CreateTrainingJob",
+    ),
+    "logs": (
+        "CreateLogGroup", "CreateLogStream", "DeleteLogGroup", "DescribeLogGroups", "FilterLogEvents",
+        "GetLogEvents", "PutLogEvents", "PutRetentionPolicy",
+    ),
+    "cloudtrail": (
+        "DeleteTrail", "DescribeTrails", "LookupEvents", "PutEventSelectors", "StopLogging", "UpdateTrail",
+    ),
+    "sqs": (
+        "DeleteMessage", "DeleteQueue", "GetQueueAttributes", "ReceiveMessage", "SendMessage",
+        "SetQueueAttributes",
+    ),
+    "sns": (
+        "CreateTopic", "DeleteTopic", "Publish", "SetTopicAttributes", "Subscribe",
+    ),
+    "rds": (
+        "CreateDBSnapshot", "DeleteDBInstance", "DescribeDBInstances", "ModifyDBInstance",
+        "RestoreDBInstanceFromDBSnapshot",
+    ),
+}
@@ -0,0 +1,175 @@
+import fnmatch
+import re
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from engine.aws_actions import KNOWN_ACTIONS
+
+# Action index for IAM privilege analysis. Known actions are interned to
+# integer ids sorted by (service, action), so every service, and every
+# "service:Prefix*" pattern, covers a contiguous id range. A pattern compiles
+# once to a bitmask over those ids (Python int), and asking which sensitive
+# actions a statement grants is a mask intersection instead of a scan over
+# action strings. IAM action names are case-insensitive; everything is
+# compared lowercased.
+
+# Compiled patterns are cached; the cache is dropped when it reaches this size.
+PATTERN_CACHE_SIZE = 65536
+
+ALL = "all"            # "*"
+SERVICE = "service"    # "s3:*"
+PREFIX = "prefix"      # "s3:Get*"
+GLOB = "glob"          # any other wildcard use, e.g. "s3:*Object" or "s?:Get*"
+LITERAL = "literal"    # "s3:GetObject"
+
+
+class CompiledPattern(NamedTuple):
+    text: str
+    kind: str
+    mask: int
+    # Literal actions missing from the catalog still match themselves by
+    # name (see ActionIndex.matches), but have no bit in the index.
+    known: bool
+
+
+class ActionIndex:
+    def __init__(self, actions: Dict[str, Iterable[str]]):
+        names = sorted({f"{service}:{action}".lower() for service, items in actions.items() for action in items})
+        self._names: List[str] = names
+        self._ids: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self._display: Dict[str, str] = {
+            f"{service}:{action}".lower(): f"{service}:{action}"
+            for service, items in actions.items()
+            for action in items
+        }
+        # service -> (first id, end id)
+        self._services: Dict[str, Tuple[int, int]] = {}
+        for i, name in enumerate(names):
+            service = name.split(":", 1)[0]
+            start, _ = self._services.get(service, (i, i))
+            self._services[service] = (start, i + 1)
+        self.all_mask = (1 << len(names)) - 1
+        self._cache: Dict[str, CompiledPattern] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @staticmethod
+    def _range_mask(start: int, end: int) -> int:
+        return ((1 << (end - start)) - 1) << start
+
+    def _compile(self, text: str) -> CompiledPattern:
+        if text == "*":
+            return CompiledPattern(text, ALL, self.all_mask, True)
+        service, sep, action = text.partition(":")
+        if not sep:
+            # Not a service:action pair; can only match itself.
+            return CompiledPattern(text, LITERAL, 0, False)
+        if action == "*" and not any(c in service for c in "*?"):
+            start, end = self._services.get(service, (0, 0))
+            return CompiledPattern(text, SERVICE, self._range_mask(start, end), True)
+        if "*" not in text and "?" not in text:
+            action_id = self._ids.get(text)
+            if action_id is None:
+                return CompiledPattern(text, LITERAL, 0, False)
+            return CompiledPattern(text, LITERAL, 1 << action_id, True)
+        if action == "*":
+            kind = SERVICE
+        elif action.endswith("*") and not any(c in action[:-1] for c in "*?") and not any(c in service for c in "*?"):
+            # Sorted names make "service:prefix*" one bisected range.
+            kind = PREFIX
+            lo, hi = self._services.get(service, (0, 0))
+            prefix = f"{service}:{action[:-1]}"
+            start = bisect_left(self._names, prefix, lo, hi)
+            end = bisect_left(self._names, prefix + "\U0010ffff", start, hi)
+            return CompiledPattern(text, kind, self._range_mask(start, end), True)
+        else:
+            kind = GLOB
+        regex = re.compile(fnmatch.translate(text))
+        mask = 0
+        for i, name in enumerate(self._names):
+            if regex.match(name):
+                mask |= 1 << i
+        return CompiledPattern(text, kind, mask, True)
+
+    def compile(self, pattern: str) -> CompiledPattern:
+        text = pattern.lower()
+        compiled = self._cache.get(text)
+        if compiled is None:
+            if len(self._cache) >= PATTERN_CACHE_SIZE:
+                self._cache.clear()
+            compiled = self._cache[text] = self._compile(text)
+        return compiled
+
+    def expand(self, patterns: Iterable[str]) -> int:
+        # Bitmask of known actions matched by any of the patterns.
+        mask = 0
+        for pattern in patterns:
+            mask |= self.compile(pattern).mask
+        return mask
+
+    def mask(self, actions: Iterable[str]) -> int:
+        # Bitmask of exact action names, e.g. a sensitive action set. Raises
+        # KeyError for actions missing from the catalog so typos surface.
+        mask = 0
+        for action in actions:
+            mask |= 1 << self._ids[action.lower()]
+        return mask
+
+    def actions(self, mask: int) -> List[str]:
+        # Action names (catalog spelling) for the bits set in `mask`.
+        found = []
+        while mask:
+            low = mask & -mask
+            name = self._names[low.bit_length() - 1]
+            found.append(self._display.get(name, name))
+            mask ^= low
+        return found
+
+    def grants(self, patterns: Iterable[str], wanted: int, not_patterns: Optional[Iterable[str]] = None) -> int:
+        # The subset of `wanted` granted by a statement's Action patterns, or
+        # by everything except its NotAction patterns when those are given.
+        if not_patterns is not None:
+            return wanted & ~self.expand(not_patterns)
+        return wanted & self.expand(patterns)
+
+    def matches(self, pattern: str, action: str) -> bool:
+        # Whether an IAM pattern matches a single action, known or not.
+        compiled = self.compile(pattern)
+        action_id = self._ids.get(action.lower())
+        if action_id is not None:
+            return bool(compiled.mask >> action_id & 1)
+        if compiled.kind == LITERAL:
+            return compiled.text == action.lower()
+        return fnmatch.fnmatchcase(action.lower(), compiled.text)
+
+    def is_service_wildcard(self, pattern: str) -> bool:
+        # "*" or "<service>:*".
+        text = self.compile(pattern).text
+        return text == "*" or text.endswith(":*")
+
+
+_DEFAULT: Dict[str, ActionIndex] = {}
+
+
+def default_index() -> ActionIndex:
+    # Shared index over KNOWN_ACTIONS, built on first use.
+    index = _DEFAULT.get("index")
+    if index is None:
+        index = _DEFAULT["index"] = ActionIndex(KNOWN_ACTIONS)
+    return index
+
+
+def statement_actions(statement: Dict[str, Any]) -> Tuple[List[str], Optional[List[str]]]:
+    # (Action patterns, NotAction patterns or None) from a normalized or raw
+    # policy statement.
+    def as_list(value: Any) -> List[str]:
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, list):
+            return [v for v in value if isinstance(v, str)]
+        return []
+
+    actions = as_list(statement.get("actions") or statement.get("Action"))
+    not_actions = statement.get("not_actions") or statement.get("NotAction")
+    return actions, as_list(not_actions) if not_actions is not None else None
@@ -0,0 +1,455 @@
+import fnmatch
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from engine.iam_actions import ActionIndex, default_index, statement_actions
+from engine.records import MAPPINGS
+
+# Effective-permission graph over IAM principals. A principal is the role,
+# user or group a policy is attached to ("AttachedTo"), or the policy itself
+# when it is not attached to anything. Each principal has a bitmask (over the
+# action index) of what its own policies allow, and edges to the principals
+# it can act as: roles it may assume, and roles it may pass to a compute
+# service it can launch. Reachability is one bitset over principal ids per
+# principal, so effective permissions are the union of the masks of
+# everything a principal reaches.
+#
+# Changes are applied lazily: set_policy()/remove_policy() only mark the
+# affected principals, and the next query recomputes reachability for those
+# principals and their ancestors (found by testing one bit in each stored
+# bitset) rather than rebuilding the graph or searching from every principal.
+#
+# Simplifications: statements with a Condition are treated as mitigated and
+# ignored, only unconditional Deny statements on "*" subtract actions, and
+# resource scoping is only used to resolve AssumeRole/PassRole targets. Trust
+# policies are not modelled, so an AssumeRole edge means "may assume if the
+# role trusts it".
+
+# Techniques that let a principal grant itself (or code it controls) more
+# privileges; a technique applies when every listed action is allowed.
+ESCALATION_TECHNIQUES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("CreatePolicyVersion", ("iam:CreatePolicyVersion",)),
+    ("SetDefaultPolicyVersion", ("iam:SetDefaultPolicyVersion",)),
+    ("AttachUserPolicy", ("iam:AttachUserPolicy",)),
+    ("AttachGroupPolicy", ("iam:AttachGroupPolicy",)),
+    ("AttachRolePolicy", ("iam:AttachRolePolicy",)),
+    ("PutUserPolicy", ("iam:PutUserPolicy",)),
+    ("PutGroupPolicy", ("iam:PutGroupPolicy",)),
+    ("PutRolePolicy", ("iam:PutRolePolicy",)),
+    ("AddUserToGroup", ("iam:AddUserToGroup",)),
+    ("CreateAccessKey", ("iam:CreateAccessKey",)),
+    ("CreateLoginProfile", ("iam:CreateLoginProfile",)),
+    ("UpdateLoginProfile", ("iam:UpdateLoginProfile",)),
+    ("UpdateAssumeRolePolicy", ("iam:UpdateAssumeRolePolicy", "sts:AssumeRole")),
+    ("PassRole+Lambda", ("iam:PassRole", "lambda:CreateFunction", "lambda:InvokeFunction")),
+    ("PassRole+EC2", ("iam:PassRole", "ec2:RunInstances")),
+    ("PassRole+CloudFormation", ("iam:PassRole", "cloudformation:CreateStack")),
+    ("PassRole+Glue", ("iam:PassRole", "glue:CreateDevEndpoint")),
+    ("PassRole+DataPipeline", ("iam:PassRole", "datapipeline:CreatePipeline", "datapipeline:PutPipelineDefinition")),
+    ("PassRole+CodeBuild", ("iam:PassRole", "codebuild:CreateProject", "codebuild:StartBuild")),
+    ("PassRole+SageMaker", ("iam:PassRole", "sagemaker:CreateNotebookInstance")),
+    ("UpdateFunctionCode", ("lambda:UpdateFunctionCode",)),
+)
+
+# Launching any of these with a passed role runs code as that role.
+PASS_ROLE_LAUNCHERS = (
+    "lambda:CreateFunction",
+    "ec2:RunInstances",
+    "cloudformation:CreateStack",
+    "glue:CreateDevEndpoint",
+    "datapipeline:CreatePipeline",
+    "codebuild:CreateProject",
+    "sagemaker:CreateNotebookInstance",
+)
+
+# Reachable principals listed per escalation.
+MAX_VIA = 10
+
+_IAM_PRINCIPAL_ARN = re.compile(r"^arn:[^:]*:iam::[^:]*:(?:role|user|group)/(?:.*/)?([^/]+)$")
+
+
+class PolicyGrants(NamedTuple):
+    principals: Tuple[str, ...]
+    allowed: int
+    denied: int
+    # Target principal names or glob patterns ("*" for any principal).
+    assume: Tuple[str, ...]
+    passes: Tuple[str, ...]
+
+
+class Escalation(NamedTuple):
+    principal: str
+    policies: Tuple[str, ...]
+    techniques: Tuple[str, ...]
+    # Whether a reachable principal has full IAM control.
+    admin: bool
+    via: Tuple[str, ...]
+    path: Tuple[str, ...]
+
+
+def policy_key(policy: Dict[str, Any]) -> str:
+    return (
+        policy.get("policy_id") or policy.get("policy_name") or policy.get("PolicyId")
+        or policy.get("PolicyName") or "UnknownPolicy"
+    )
+
+
+def _as_list(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [v for v in value if isinstance(v, str)]
+    return []
+
+
+def _targets(resources: Iterable[Any]) -> List[str]:
+    # Principal names (or name globs) from AssumeRole/PassRole resources;
+    # resources of other services cannot be principals.
+    targets = []
+    for resource in resources:
+        if not isinstance(resource, str):
+            continue
+        if resource == "*":
+            targets.append("*")
+            continue
+        match = _IAM_PRINCIPAL_ARN.match(resource)
+        if match:
+            targets.append(match.group(1))
+    return targets
+
+
+def policy_grants(policy: Dict[str, Any], index: Optional[ActionIndex] = None) -> PolicyGrants:
+    # Compact summary of a normalized or raw policy for the graph.
+    index = index or default_index()
+    assume_mask = index.mask(["sts:AssumeRole"])
+    pass_mask = index.mask(["iam:PassRole"])
+    statements = policy.get("statements")
+    if statements is None:
+        document = policy.get("document") or policy.get("PolicyDocument") or {}
+        statements = document.get("Statement", [])
+    if isinstance(statements, MAPPINGS):
+        statements = [statements]
+
+    allowed = denied = 0
+    assume: List[str] = []
+    passes: List[str] = []
+    for stmt in statements:
+        if not isinstance(stmt, MAPPINGS):
+            continue
+        if stmt.get("conditions") or stmt.get("Condition"):
+            continue
+        actions, not_actions = statement_actions(stmt)
+        mask = index.grants(actions, index.all_mask, not_actions)
+        resources = _as_list(stmt.get("resources") or stmt.get("Resource"))
+        effect = (stmt.get("effect") or stmt.get("Effect") or "").lower()
+        if effect == "deny":
+            if "*" in resources:
+                denied |= mask
+        elif effect == "allow":
+            allowed |= mask
+            if mask & assume_mask:
+                assume.extend(_targets(resources))
+            if mask & pass_mask:
+                passes.extend(_targets(resources))
+
+    attached = _as_list(policy.get("attached_to") or policy.get("AttachedTo"))
+    return PolicyGrants(
+        principals=tuple(dict.fromkeys(attached)) or (policy_key(policy),),
+        allowed=allowed,
+        denied=denied,
+        assume=tuple(dict.fromkeys(assume)),
+        passes=tuple(dict.fromkeys(passes)),
+    )
+
+
+def _bits(mask: int) -> Iterator[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class PermissionGraph:
+    def __init__(self, index: Optional[ActionIndex] = None):
+        self.index = index or default_index()
+        self._admin_mask = self.index.compile("iam:*").mask
+        self._assume_mask = self.index.mask(["sts:AssumeRole"])
+        self._pass_mask = self.index.mask(["iam:PassRole"])
+        self._launch_mask = self.index.mask(PASS_ROLE_LAUNCHERS)
+        self._techniques = [(name, self.index.mask(actions)) for name, actions in ESCALATION_TECHNIQUES]
+        self._escalation_mask = 0
+        for _, mask in self._techniques:
+            self._escalation_mask |= mask
+
+        self._policies: Dict[str, PolicyGrants] = {}
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._attached: List[Set[str]] = []
+        self._allowed: List[int] = []
+        self._succ: List[Tuple[int, ...]] = []
+        self._reach: List[int] = []
+        self._effective: List[int] = []
+        # Principals whose edges target every principal, and glob targets
+        # (pattern, source id) that new principals are matched against.
+        self._wild = 0
+        self._globs: Dict[int, List[re.Pattern]] = {}
+        # Pending work for the next refresh.
+        self._stale: Set[int] = set()
+        self._changed = 0
+        self._grown = False
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _intern(self, name: str) -> int:
+        principal = self._ids.get(name)
+        if principal is None:
+            principal = self._ids[name] = len(self._names)
+            self._names.append(name)
+            self._attached.append(set())
+            self._allowed.append(0)
+            self._succ.append(())
+            self._reach.append(1 << principal)
+            self._effective.append(0)
+            self._changed |= 1 << principal
+            self._grown = True
+            for source, patterns in self._globs.items():
+                if any(p.match(name) for p in patterns):
+                    self._stale.add(source)
+        return principal
+
+    def set_policy(self, policy: Dict[str, Any]) -> None:
+        # Adds or replaces a policy, keyed by policy id (or name).
+        self._set_grants(policy_key(policy), policy_grants(policy, self.index))
+
+    def remove_policy(self, key: str) -> None:
+        self._set_grants(key, None)
+
+    def _set_grants(self, key: str, grants: Optional[PolicyGrants]) -> None:
+        old = self._policies.pop(key, None)
+        if old is not None:
+            for name in old.principals:
+                principal = self._ids[name]
+                self._attached[principal].discard(key)
+                self._stale.add(principal)
+        if grants is not None:
+            self._policies[key] = grants
+            for name in grants.principals:
+                principal = self._intern(name)
+                self._attached[principal].add(key)
+                self._stale.add(principal)
+
+    def _resolve(self, source: int, patterns: Iterable[str]) -> Tuple[Set[int], bool]:
+        # (target ids, targets everything) for AssumeRole/PassRole patterns.
+        targets: Set[int] = set()
+        for pattern in patterns:
+            if pattern == "*":
+                return targets, True
+            if "*" in pattern or "?" in pattern:
+                regex = re.compile(fnmatch.translate(pattern))
+                self._globs.setdefault(source, []).append(regex)
+                targets.update(i for i, name in enumerate(self._names) if regex.match(name))
+            else:
+                targets.add(self._intern(pattern))
+        return targets, False
+
+    def _rebuild_edges(self, principal: int) -> None:
+        allowed = denied = 0
+        assume: List[str] = []
+        passes: List[str] = []
+        for key in self._attached[principal]:
+            grants = self._policies[key]
+            allowed |= grants.allowed
+            denied |= grants.denied
+            assume.extend(grants.assume)
+            passes.extend(grants.passes)
+        allowed &= ~denied
+        self._allowed[principal] = allowed
+
+        self._globs.pop(principal, None)
+        patterns = []
+        if allowed & self._assume_mask:
+            patterns.extend(assume)
+        if allowed & self._pass_mask and allowed & self._launch_mask:
+            patterns.extend(passes)
+        targets, everything = self._resolve(principal, patterns)
+        targets.discard(principal)
+        self._succ[principal] = tuple(sorted(targets))
+        if everything:
+            self._wild |= 1 << principal
+        else:
+            self._wild &= ~(1 << principal)
+        self._changed |= 1 << principal
+
+    def _refresh(self) -> None:
+        while self._stale:
+            stale, self._stale = self._stale, set()
+            for principal in stale:
+                self._rebuild_edges(principal)
+        if not self._changed:
+            return
+        changed = self._changed
+        if self._grown:
+            # Principals with "*" targets now reach the new principals too.
+            changed |= self._wild
+        dirty = changed
+        for principal, reach in enumerate(self._reach):
+            if reach & changed:
+                dirty |= 1 << principal
+        self._recompute(dirty)
+        self._changed = 0
+        self._grown = False
+
+    def _recompute(self, dirty: int) -> None:
+        # Tarjan's SCC algorithm (iterative) over the dirty principals. SCCs
+        # complete in reverse topological order, so each one is settled from
+        # successors that are already up to date; successors outside the
+        # dirty set kept their stored values.
+        everyone = (1 << len(self._names)) - 1
+        total = 0
+        if self._wild:
+            for allowed in self._allowed:
+                total |= allowed
+        succ, wild = self._succ, self._wild
+        order: Dict[int, int] = {}
+        low: Dict[int, int] = {}
+        stack: List[int] = []
+        on_stack: Set[int] = set()
+
+        def successors(node: int) -> Iterator[int]:
+            if wild >> node & 1:
+                return iter(())
+            return (s for s in succ[node] if dirty >> s & 1)
+
+        for root in _bits(dirty):
+            if root in order:
+                continue
+            order[root] = low[root] = len(order)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, successors(root))]
+            while work:
+                node, it = work[-1]
+                descended = False
+                for nxt in it:
+                    if nxt not in order:
+                        order[nxt] = low[nxt] = len(order)
+                        stack.append(nxt)
+                        on_stack.add(nxt)
+                        work.append((nxt, successors(nxt)))
+                        descended = True
+                        break
+                    if nxt in on_stack and order[nxt] < low[node]:
+                        low[node] = order[nxt]
+                if descended:
+                    continue
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == order[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        members.append(member)
+                        if member == node:
+                            break
+                    self._settle(members, everyone, total)
+
+    def _settle(self, members: List[int], everyone: int, total: int) -> None:
+        reach = effective = 0
+        inside = set(members)
+        for member in members:
+            reach |= 1 << member
+            effective |= self._allowed[member]
+            if self._wild >> member & 1:
+                reach |= everyone
+                effective |= total
+                continue
+            for target in self._succ[member]:
+                if target not in inside:
+                    reach |= self._reach[target]
+                    effective |= self._effective[target]
+        for member in members:
+            self._reach[member] = reach
+            self._effective[member] = effective
+
+    # Queries
+
+    def principals(self) -> List[str]:
+        return list(self._names)
+
+    def effective_actions(self, principal: str) -> int:
+        # Bitmask of actions the principal can use directly or by acting as a
+        # principal it reaches.
+        self._refresh()
+        return self._effective[self._ids[principal]]
+
+    def reachable(self, principal: str) -> List[str]:
+        self._refresh()
+        source = self._ids[principal]
+        return [self._names[i] for i in _bits(self._reach[source] & ~(1 << source))]
+
+    def _path(self, source: int, targets: int) -> Tuple[int, ...]:
+        # Shortest edge path from `source` to any principal in `targets`.
+        parents = {source: -1}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if self._wild >> node & 1:
+                nxt = (targets & -targets).bit_length() - 1
+                parents.setdefault(nxt, node)
+                node = nxt
+            else:
+                for nxt in self._succ[node]:
+                    if nxt not in parents:
+                        parents[nxt] = node
+                        if targets >> nxt & 1:
+                            node = nxt
+                            break
+                        queue.append(nxt)
+                else:
+                    continue
+            path = []
+            while node != -1:
+                path.append(node)
+                node = parents[node]
+            return tuple(reversed(path))
+        return (source,)
+
+    def escalations(self) -> Iterator[Escalation]:
+        # Principals with attached policies that are not already IAM admins
+        # but can gain privileges, directly or through principals they reach.
+        self._refresh()
+        admin_mask, escalation_mask = self._admin_mask, self._escalation_mask
+        admins = privileged = 0
+        for principal, allowed in enumerate(self._allowed):
+            if allowed & admin_mask == admin_mask:
+                admins |= 1 << principal
+            if allowed & escalation_mask:
+                privileged |= 1 << principal
+        for principal, allowed in enumerate(self._allowed):
+            if not self._attached[principal] or admins >> principal & 1:
+                continue
+            effective = self._effective[principal]
+            techniques = tuple(name for name, mask in self._techniques if effective & mask == mask)
+            others = self._reach[principal] & ~(1 << principal)
+            reached_admins = others & admins
+            if not techniques and not reached_admins:
+                continue
+            targets = reached_admins or (others & privileged)
+            via = []
+            for target in _bits(targets):
+                via.append(self._names[target])
+                if len(via) >= MAX_VIA:
+                    break
+            path = self._path(principal, targets) if targets else (principal,)
+            yield Escalation(
+                principal=self._names[principal],
+                policies=tuple(sorted(self._attached[principal])),
+                techniques=techniques,
+                admin=bool(reached_admins),
+                via=tuple(via),
+                path=tuple(self._names[i] for i in path),
+            )
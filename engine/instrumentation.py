@@ -0,0 +1,221 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Pipeline timers and counters. Everything is recorded into the process-wide
+# REGISTRY (rendered as Prometheus text on /metrics) and, while a scan runs
+# inside profiling(), into that scan's ScanProfile. When instrumentation is
+# disabled (SCANNER_METRICS=0) every helper returns before touching a clock
+# or a lock, and the rule engine uses its uninstrumented evaluator.
+
+_ENABLED = os.environ.get("SCANNER_METRICS", "1") != "0"
+_NULL_CONTEXT = nullcontext()
+
+LabelSet = Tuple[Tuple[str, str], ...]
+# Per-rule stats as collected by the registry: [resources, findings, nanoseconds].
+RuleStats = Dict[str, List[int]]
+
+_HELP = {
+    "scanner_stage_seconds": "Wall time spent in each scan pipeline stage.",
+    "scanner_rule_seconds": "Wall time spent evaluating each rule.",
+    "scanner_rule_resources_total": "Resources evaluated by each rule.",
+    "scanner_rule_findings_total": "Findings produced by each rule.",
+    "scanner_resources_total": "Resources read by the rule engine.",
+    "scanner_findings_total": "Findings produced by the rule engine.",
+    "scanner_cache_hits_total": "Resources whose findings were served from the result cache.",
+    "scanner_cache_misses_total": "Resources evaluated because the result cache had no entry.",
+    "scanner_scans_total": "Scans run, by final state.",
+}
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def set_enabled(flag: bool) -> None:
+    global _ENABLED
+    _ENABLED = flag
+
+
+def _labels(labels: Dict[str, Any]) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    # Counters, and timers kept as Prometheus summaries (count and sum).
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._timers: Dict[str, Dict[LabelSet, List[float]]] = {}
+
+    def inc(self, name: str, value: float = 1, labels: LabelSet = ()) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name: str, seconds: float, labels: LabelSet = (), count: int = 1) -> None:
+        with self._lock:
+            totals = self._timers.setdefault(name, {}).setdefault(labels, [0, 0.0])
+            totals[0] += count
+            totals[1] += seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+    @staticmethod
+    def _series(name: str, labels: LabelSet) -> str:
+        if not labels:
+            return name
+        rendered = ",".join(
+            '{}="{}"'.format(key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for key, value in labels
+        )
+        return f"{name}{{{rendered}}}"
+
+    def render(self) -> str:
+        # Prometheus text exposition format 0.0.4.
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{self._series(name, labels)} {value:g}")
+            for name in sorted(self._timers):
+                lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} summary")
+                for labels, (count, total) in sorted(self._timers[name].items()):
+                    lines.append(f"{self._series(name + '_count', labels)} {count}")
+                    lines.append(f"{self._series(name + '_sum', labels)} {total:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class ScanProfile:
+    # Timings and counts for a single scan, attached to its scan record.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.rules: Dict[str, Dict[str, float]] = {}
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def add_count(self, name: str, value: float) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_rule_stats(self, stats: RuleStats) -> None:
+        with self._lock:
+            for rule_id, (resources, findings, nanos) in stats.items():
+                entry = self.rules.setdefault(rule_id, {"resources": 0, "findings": 0, "seconds": 0.0})
+                entry["resources"] += resources
+                entry["findings"] += findings
+                entry["seconds"] += nanos / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+                "counters": dict(self.counters),
+                "rules": {
+                    rule_id: dict(entry, seconds=round(entry["seconds"], 6))
+                    for rule_id, entry in sorted(self.rules.items())
+                },
+            }
+
+
+_PROFILE: "contextvars.ContextVar[Optional[ScanProfile]]" = contextvars.ContextVar("scan_profile", default=None)
+
+
+@contextmanager
+def profiling() -> Iterator[ScanProfile]:
+    # Collects everything recorded in this context into a new ScanProfile.
+    profile = ScanProfile()
+    token = _PROFILE.set(profile)
+    try:
+        yield profile
+    finally:
+        _PROFILE.reset(token)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    REGISTRY.observe("scanner_stage_seconds", seconds, (("stage", name),))
+    profile = _PROFILE.get()
+    if profile is not None:
+        profile.add_stage(name, seconds)
+
+
+@contextmanager
+def _timed_stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def stage(name: str):
+    # Context manager timing a pipeline stage.
+    if not _ENABLED:
+        return _NULL_CONTEXT
+    return _timed_stage(name)
+
+
+def count(name: str, value: float = 1, **labels: Any) -> None:
+    if not _ENABLED:
+        return
+    REGISTRY.inc(name, value, _labels(labels))
+    profile = _PROFILE.get()
+    if profile is not None:
+        key = name if not labels else name + "{" + ",".join(f"{k}={v}" for k, v in _labels(labels)) + "}"
+        profile.add_count(key, value)
+
+
+def record_rule_stats(stats: RuleStats) -> None:
+    if not _ENABLED or not stats:
+        return
+    for rule_id, (resources, findings, nanos) in stats.items():
+        labels = (("rule", rule_id),)
+        REGISTRY.inc("scanner_rule_resources_total", resources, labels)
+        REGISTRY.inc("scanner_rule_findings_total", findings, labels)
+        REGISTRY.observe("scanner_rule_seconds", nanos / 1e9, labels, count=resources)
+    profile = _PROFILE.get()
+    if profile is not None:
+        profile.add_rule_stats(stats)
+
+
+def timed_iter(name: str, records: Iterable[Any]) -> Iterable[Any]:
+    # Attributes the time spent producing each record (e.g. parsing a lazy
+    # upload stream) to stage `name`. Returns `records` unchanged when
+    # instrumentation is disabled.
+    if not _ENABLED:
+        return records
+    return _timed_iter(name, records)
+
+
+def _timed_iter(name: str, records: Iterable[Any]) -> Iterator[Any]:
+    it = iter(records)
+    elapsed = 0.0
+    clock = time.perf_counter
+    try:
+        while True:
+            start = clock()
+            try:
+                record = next(it)
+            except StopIteration:
+                elapsed += clock() - start
+                return
+            elapsed += clock() - start
+            yield record
+    finally:
+        record_stage(name, elapsed)
@@ -0,0 +1,265 @@
+import ipaddress
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from engine.records import MAPPINGS
+
+# Address and port ranges for security group analysis. CIDRs (IPv4 and IPv6)
+# become closed integer intervals in one 128-bit space, with IPv4 mapped into
+# ::ffff:0:0/96, and port specifications become closed port intervals.
+# Non-public address space is kept as sorted, merged intervals and sensitive
+# ports as a sorted list, so asking whether a rule's range is public or which
+# sensitive ports it opens is a bisect instead of a string comparison against
+# "0.0.0.0/0".
+
+Interval = Tuple[int, int]
+
+ALL_PORTS: Interval = (0, 65535)
+# Parsed CIDRs are cached; the cache is dropped when it reaches this size.
+CIDR_CACHE_SIZE = 65536
+
+_V4_OFFSET = 0xFFFF << 32
+
+# Address space that is not reachable from the internet.
+NON_PUBLIC_CIDRS = (
+    "0.0.0.0/8", "10.0.0.0/8", "100.64.0.0/10", "127.0.0.0/8", "169.254.0.0/16", "172.16.0.0/12",
+    "192.0.0.0/24", "192.0.2.0/24", "192.168.0.0/16", "198.18.0.0/15", "198.51.100.0/24",
+    "203.0.113.0/24", "224.0.0.0/4", "240.0.0.0/4",
+    "::/128", "::1/128", "2001:db8::/32", "fc00::/7", "fe80::/10", "ff00::/8",
+)
+
+# Ports whose services should never be reachable from the internet.
+SENSITIVE_PORTS = {
+    20: "FTP data", 21: "FTP", 22: "SSH", 23: "Telnet", 25: "SMTP", 135: "MSRPC", 139: "NetBIOS",
+    445: "SMB", 1433: "MSSQL", 1521: "Oracle", 2375: "Docker", 2376: "Docker TLS", 3306: "MySQL",
+    3389: "RDP", 5432: "PostgreSQL", 5900: "VNC", 6379: "Redis", 9200: "Elasticsearch",
+    11211: "Memcached", 27017: "MongoDB",
+}
+
+_ALL_PROTOCOLS = {"-1", "all", "any", "*"}
+_PORT_PROTOCOLS = {"tcp", "udp", "6", "17"}
+_CIDR_CACHE: Dict[str, Optional[Interval]] = {}
+_PUBLIC_CACHE: Dict[str, bool] = {}
+
+
+def _parse_cidr(text: str) -> Optional[Interval]:
+    try:
+        network = ipaddress.ip_network(text.strip(), strict=False)
+    except ValueError:
+        return None
+    lo, hi = int(network.network_address), int(network.broadcast_address)
+    if network.version == 4:
+        return lo + _V4_OFFSET, hi + _V4_OFFSET
+    return lo, hi
+
+
+def parse_cidr(text: Any) -> Optional[Interval]:
+    # Address interval for an IPv4 or IPv6 CIDR (or bare address), None when
+    # it is not one (e.g. a security group or prefix list reference).
+    if not isinstance(text, str):
+        return None
+    interval = _CIDR_CACHE.get(text, False)
+    if interval is False:
+        if len(_CIDR_CACHE) >= CIDR_CACHE_SIZE:
+            _CIDR_CACHE.clear()
+        interval = _CIDR_CACHE[text] = _parse_cidr(text)
+    return interval
+
+
+class RangeSet:
+    # Sorted, merged closed intervals.
+    def __init__(self, intervals: Iterable[Interval]):
+        merged: List[List[int]] = []
+        for lo, hi in sorted(intervals):
+            if merged and lo <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        self._starts = [lo for lo, _ in merged]
+        self._ends = [hi for _, hi in merged]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def covers(self, lo: int, hi: int) -> bool:
+        # Whether [lo, hi] lies entirely inside the set.
+        i = bisect_right(self._starts, lo) - 1
+        return i >= 0 and self._ends[i] >= hi
+
+    def overlaps(self, lo: int, hi: int) -> bool:
+        i = bisect_right(self._starts, hi) - 1
+        return i >= 0 and self._ends[i] >= lo
+
+    def within(self, lo: int, hi: int) -> List[Interval]:
+        # The parts of the set inside [lo, hi].
+        i = max(bisect_right(self._starts, lo) - 1, 0)
+        found = []
+        while i < len(self._starts) and self._starts[i] <= hi:
+            if self._ends[i] >= lo:
+                found.append((max(self._starts[i], lo), min(self._ends[i], hi)))
+            i += 1
+        return found
+
+
+class IntervalTree:
+    # Static interval tree over closed intervals with payloads, for sets that
+    # overlap (e.g. VPC ranges). Intervals are sorted by start; the midpoint
+    # of each slice is a node of an implicit balanced tree and records the
+    # largest end in its subtree, so an overlap query skips whole subtrees
+    # that end before it or start after it: O(log n + matches).
+    def __init__(self, items: Iterable[Tuple[int, int, Any]]):
+        ordered = sorted(items, key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in ordered]
+        self._ends = [item[1] for item in ordered]
+        self._values = [item[2] for item in ordered]
+        self._max = list(self._ends)
+        self._build(0, len(ordered))
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _build(self, lo: int, hi: int) -> int:
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        self._max[mid] = max(self._ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        return self._max[mid]
+
+    def overlapping(self, lo: int, hi: int) -> Iterator[Any]:
+        # Payloads of the intervals that share at least one point with [lo, hi].
+        starts, ends, values, max_end = self._starts, self._ends, self._values, self._max
+        stack = [(0, len(starts))]
+        while stack:
+            a, b = stack.pop()
+            if a >= b:
+                continue
+            mid = (a + b) // 2
+            if max_end[mid] < lo:
+                continue
+            stack.append((a, mid))
+            if starts[mid] <= hi:
+                if ends[mid] >= lo:
+                    yield values[mid]
+                stack.append((mid + 1, b))
+
+
+NON_PUBLIC = RangeSet(parse_cidr(cidr) for cidr in NON_PUBLIC_CIDRS)
+_SENSITIVE = sorted(SENSITIVE_PORTS)
+
+
+def is_public(cidr: Any) -> bool:
+    # Whether any address in the CIDR is internet-routable, so "0.0.0.0/1"
+    # and "::/0" count as public while "10.0.0.0/8" does not.
+    public = _PUBLIC_CACHE.get(cidr)
+    if public is None:
+        interval = parse_cidr(cidr)
+        public = interval is not None and not NON_PUBLIC.covers(*interval)
+        if isinstance(cidr, str):
+            if len(_PUBLIC_CACHE) >= CIDR_CACHE_SIZE:
+                _PUBLIC_CACHE.clear()
+            _PUBLIC_CACHE[cidr] = public
+    return public
+
+
+def _port(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def port_range(protocol: Any, from_port: Any, to_port: Any) -> Optional[Interval]:
+    # Port interval a rule opens, or None when it opens no ports (ICMP) or
+    # they are unknown. "All traffic" and -1 ports open every port.
+    proto = str(protocol if protocol is not None else "tcp").lower()
+    if proto in _ALL_PROTOCOLS:
+        return ALL_PORTS
+    if proto not in _PORT_PROTOCOLS:
+        return None
+    lo, hi = _port(from_port), _port(to_port)
+    if lo is None and hi is None:
+        return None
+    lo = hi if lo is None else lo
+    hi = lo if hi is None else hi
+    if lo < 0 or hi < 0:
+        return ALL_PORTS
+    lo, hi = min(lo, hi, 65535), min(max(lo, hi), 65535)
+    return lo, hi
+
+
+def sensitive_ports(ports: Interval) -> List[int]:
+    # Sensitive ports inside a port interval, in ascending order.
+    lo, hi = ports
+    return _SENSITIVE[bisect_left(_SENSITIVE, lo):bisect_right(_SENSITIVE, hi)]
+
+
+class IngressRule(NamedTuple):
+    protocol: str
+    ports: Optional[Interval]
+    cidrs: Tuple[str, ...]
+    # The CIDRs that include internet-routable addresses.
+    public: Tuple[str, ...]
+
+
+def _cidr_values(rule: Dict[str, Any]) -> Sequence[str]:
+    # Every CIDR of a rule: the parser's "cidrs" list, or the raw (AWS API
+    # shaped) fields when the rule was not normalized.
+    cidrs = rule.get("cidrs")
+    if isinstance(cidrs, (list, tuple)) and cidrs:
+        return cidrs
+    values: List[Any] = []
+    for key in ("cidr", "cidr_blocks", "cidr_ip", "CidrIp", "Cidr", "CidrIpRanges",
+                "CidrIpv6", "ipv6_cidr", "ipv6_cidr_blocks"):
+        value = rule.get(key)
+        if isinstance(value, (list, tuple)):
+            values.extend(value)
+        elif value is not None:
+            values.append(value)
+    for key, field in (("IpRanges", "CidrIp"), ("Ipv6Ranges", "CidrIpv6")):
+        for entry in rule.get(key) or ():
+            if isinstance(entry, dict) and entry.get(field):
+                values.append(entry[field])
+    return list(dict.fromkeys(v for v in values if isinstance(v, str)))
+
+
+def _first(rule: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        value = rule.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def ingress_rules(sg: Dict[str, Any], public_only: bool = False) -> List[IngressRule]:
+    # Inbound rules of a normalized or raw security group, optionally only
+    # those open to an internet-routable range (checked before ports are
+    # parsed, since most rules are internal).
+    rules = sg.get("InboundRules") or sg.get("Inbound") or sg.get("rules") or sg.get("IpPermissions") or []
+    if isinstance(rules, MAPPINGS):
+        rules = [rules]
+    parsed = []
+    public_cache = _PUBLIC_CACHE
+    for rule in rules:
+        if not isinstance(rule, MAPPINGS):
+            continue
+        direction = rule.get("direction") or rule.get("Direction")
+        if direction and str(direction).lower() != "ingress":
+            continue
+        cidrs = _cidr_values(rule)
+        public = []
+        for cidr in cidrs:
+            flag = public_cache.get(cidr)
+            if flag is None:
+                flag = is_public(cidr)
+            if flag:
+                public.append(cidr)
+        if public_only and not public:
+            continue
+        protocol = str(_first(rule, "protocol", "IpProtocol") or "tcp").lower()
+        ports = port_range(
+            protocol,
+            _first(rule, "from_port", "FromPort", "port", "From"),
+            _first(rule, "to_port", "ToPort", "port", "To"),
+        )
+        parsed.append(IngressRule(protocol, ports, tuple(cidrs), tuple(public)))
+    return parsed
@@ -0,0 +1,175 @@
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from engine.network_ranges import IntervalTree, is_public, parse_cidr
+from engine.records import MAPPINGS
+
+# Cross-group reachability for production segmentation. Every security group
+# is summarized once as it streams past: its environment is recorded by id
+# and name, its VPC's ranges ("vpc_cidrs") and environments are collected,
+# and production groups keep only the private CIDRs and group references
+# they accept traffic from. Afterwards the ranges of every VPC that hosts a
+# non-production group go into one interval tree, so "does this production
+# rule accept a non-production range" is an overlap query and "does it trust
+# a non-production group" a dict lookup, instead of comparing every pair of
+# groups. Public sources are left to the public exposure rules.
+
+PRODUCTION_ENVIRONMENTS = frozenset({"prod", "production", "prd", "live"})
+_UNKNOWN_ENVIRONMENTS = frozenset({"", "unknown", "none", "n/a"})
+
+# Sources listed per violation.
+MAX_SOURCES = 10
+
+
+def is_production(environment: Any) -> Optional[bool]:
+    # True for production, False for another known environment, None when
+    # the environment is unknown.
+    value = str(environment or "").strip().lower()
+    if value in _UNKNOWN_ENVIRONMENTS:
+        return None
+    return value in PRODUCTION_ENVIRONMENTS
+
+
+def _group_id(sg: Dict[str, Any]) -> str:
+    return sg.get("group_id") or sg.get("GroupId") or sg.get("group_name") or sg.get("GroupName") or "sg-unknown"
+
+
+def _group_name(sg: Dict[str, Any]) -> str:
+    return sg.get("group_name") or sg.get("GroupName") or _group_id(sg)
+
+
+def _rule_sources(rule: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    # (CIDRs, group references) of a normalized rule, or a raw one with the
+    # common single-value fields.
+    cidrs = rule.get("cidrs")
+    if cidrs is None:
+        cidr = rule.get("cidr") or rule.get("CidrIp")
+        cidrs = [cidr] if isinstance(cidr, str) else list(cidr or ())
+    groups = list(rule.get("source_groups") or ())
+    for pair in rule.get("UserIdGroupPairs") or ():
+        if isinstance(pair, dict) and (pair.get("GroupId") or pair.get("GroupName")):
+            groups.append(pair.get("GroupId") or pair.get("GroupName"))
+    groups.extend(c for c in cidrs if isinstance(c, str) and c.startswith("sg-"))
+    return [c for c in cidrs if isinstance(c, str) and not c.startswith("sg-")], groups
+
+
+class _ProductionGroup(NamedTuple):
+    group_id: str
+    group_name: str
+    environment: str
+    vpc_id: str
+    cidrs: Tuple[str, ...]
+    groups: Tuple[str, ...]
+
+
+class Violation(NamedTuple):
+    group_id: str
+    group_name: str
+    environment: str
+    vpc_id: str
+    # (referenced group, its environment)
+    groups: Tuple[Tuple[str, str], ...]
+    # (source CIDR, overlapped VPC, environments hosted in that VPC)
+    ranges: Tuple[Tuple[str, str, Tuple[str, ...]], ...]
+    # Totals before truncation to MAX_SOURCES.
+    group_count: int
+    range_count: int
+
+
+class SegmentationIndex:
+    def __init__(self):
+        self._environments: Dict[str, str] = {}
+        self._vpc_environments: Dict[str, Set[str]] = {}
+        self._vpc_ranges: Dict[str, Set[str]] = {}
+        self._production: List[_ProductionGroup] = []
+        self._tree: Optional[IntervalTree] = None
+        # VPC -> the non-production environments it hosts, built with the tree.
+        self._non_production: Dict[str, Tuple[str, ...]] = {}
+
+    def add(self, sg: Dict[str, Any]) -> None:
+        group_id, name = _group_id(sg), _group_name(sg)
+        environment = sg.get("environment") or sg.get("Environment") or "unknown"
+        vpc_id = sg.get("vpc_id") or sg.get("VpcId") or "unknown"
+        production = is_production(environment)
+        self._tree = None
+        if production is not None:
+            self._environments[group_id] = environment
+            self._environments.setdefault(name, environment)
+            if vpc_id != "unknown":
+                self._vpc_environments.setdefault(vpc_id, set()).add(str(environment).lower())
+        if vpc_id != "unknown":
+            ranges = sg.get("vpc_cidrs") or ()
+            if ranges:
+                self._vpc_ranges.setdefault(vpc_id, set()).update(ranges)
+        if not production:
+            return
+
+        cidrs: Dict[str, None] = {}
+        groups: Dict[str, None] = {}
+        for rule in sg.get("rules") or sg.get("InboundRules") or ():
+            if not isinstance(rule, MAPPINGS):
+                continue
+            direction = rule.get("direction") or rule.get("Direction")
+            if direction and str(direction).lower() != "ingress":
+                continue
+            rule_cidrs, rule_groups = _rule_sources(rule)
+            for cidr in rule_cidrs:
+                if parse_cidr(cidr) is not None and not is_public(cidr):
+                    cidrs[cidr] = None
+            for group in rule_groups:
+                groups[group] = None
+        if cidrs or groups:
+            self._production.append(
+                _ProductionGroup(group_id, name, environment, vpc_id, tuple(cidrs), tuple(groups))
+            )
+
+    def _non_production_ranges(self) -> IntervalTree:
+        if self._tree is None:
+            items = []
+            self._non_production = {}
+            for vpc_id, ranges in self._vpc_ranges.items():
+                environments = tuple(sorted(
+                    env for env in self._vpc_environments.get(vpc_id, ()) if is_production(env) is False
+                ))
+                if not environments:
+                    continue
+                self._non_production[vpc_id] = environments
+                for cidr in ranges:
+                    interval = parse_cidr(cidr)
+                    if interval is not None:
+                        items.append((interval[0], interval[1], vpc_id))
+            self._tree = IntervalTree(items)
+        return self._tree
+
+    def non_production_vpcs(self, cidr: str) -> List[str]:
+        # VPCs hosting non-production groups whose ranges overlap `cidr`.
+        interval = parse_cidr(cidr)
+        if interval is None:
+            return []
+        return sorted(set(self._non_production_ranges().overlapping(*interval)))
+
+    def violations(self) -> Iterator[Violation]:
+        # Production groups that accept traffic from a non-production group
+        # or from a range belonging to a VPC that hosts one.
+        tree = self._non_production_ranges()
+        for group in self._production:
+            referenced = []
+            for ref in group.groups:
+                environment = self._environments.get(ref)
+                if environment is not None and is_production(environment) is False:
+                    referenced.append((ref, environment))
+            ranges = []
+            for cidr in group.cidrs:
+                interval = parse_cidr(cidr)
+                for vpc_id in sorted(set(tree.overlapping(*interval))):
+                    ranges.append((cidr, vpc_id, self._non_production[vpc_id]))
+            if referenced or ranges:
+                yield Violation(
+                    group_id=group.group_id,
+                    group_name=group.group_name,
+                    environment=group.environment,
+                    vpc_id=group.vpc_id,
+                    groups=tuple(referenced[:MAX_SOURCES]),
+                    ranges=tuple(ranges[:MAX_SOURCES]),
+                    group_count=len(referenced),
+                    range_count=len(ranges),
+                )
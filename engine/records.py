@@ -0,0 +1,392 @@
+import sys
+from collections.abc import Mapping
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Compact records for parsed resources and findings. Every normalized
+# resource and every finding is a slotted object instead of a dict: a finding
+# dict with twenty keys costs over a kilobyte while a slot costs eight bytes,
+# and the text all findings of a rule share (title, description, remediation,
+# ...) lives in one interned RuleInfo that the findings point to, including
+# findings decoded from the result cache or the scan store. Records keep the
+# read side of the dict interface (record["key"], get, in, keys, items), so
+# rules and helpers that accept both raw uploads and normalized resources
+# work unchanged; to_dict() turns them into plain dicts where JSON or a
+# template needs one, and Finding.compact() drops the rule metadata where
+# findings are stored next to a per-rule catalog.
+
+DEFAULT_DESCRIPTION = "No description provided."
+
+
+class Record:
+    __slots__ = ()
+    # Mapping keys in to_dict() order; defaults to the slots.
+    _keys: Tuple[str, ...] = ()
+    # Keys that are left out of the mapping while their value is None.
+    _optional: frozenset = frozenset()
+    _getters: Dict[str, Callable[[Any], Any]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "_keys" not in cls.__dict__:
+            cls._keys = cls.__slots__
+        cls._getters = {key: attrgetter(key) for key in cls._keys}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = self._getters.get(key)
+        if getter is None:
+            return default
+        value = getter(self)
+        if value is None and key in self._optional:
+            return default
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        getter = self._getters.get(key)
+        if getter is not None:
+            value = getter(self)
+            if value is not None or key not in self._optional:
+                return value
+        raise KeyError(key)
+
+    def __contains__(self, key: Any) -> bool:
+        try:
+            self[key]
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def keys(self) -> List[str]:
+        return [key for key in self._keys if key in self]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def values(self) -> List[Any]:
+        return [self[key] for key in self.keys()]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: _plain(value) for key, value in self.items()}
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Record):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+Mapping.register(Record)
+
+# For isinstance checks that accept a raw (dict) or normalized (record) entry.
+MAPPINGS = (dict, Record)
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Record):
+        return value.to_dict()
+    if type(value) is tuple and value and isinstance(value[0], Record):
+        return [item.to_dict() for item in value]
+    if value is _NO_FACTORS:
+        return {}
+    return value
+
+
+def as_dict(value: Any) -> Any:
+    return value.to_dict() if isinstance(value, Record) else value
+
+
+def json_default(value: Any) -> Any:
+    # `default` for json.dumps: records become dicts, anything else a string.
+    if isinstance(value, Record):
+        return value.to_dict()
+    return str(value)
+
+
+class IamStatement(Record):
+    __slots__ = ("sid", "effect", "actions", "resources", "conditions", "not_actions")
+    _optional = frozenset({"not_actions"})
+
+    def __init__(self, sid, effect, actions, resources, conditions, not_actions=None):
+        self.sid = sid
+        self.effect = effect
+        self.actions = actions
+        self.resources = resources
+        self.conditions = conditions
+        self.not_actions = not_actions
+
+
+class IamPolicy(Record):
+    __slots__ = ("policy_id", "policy_name", "attached_to", "statements", "tags")
+
+    def __init__(self, policy_id, policy_name, attached_to, statements, tags):
+        self.policy_id = policy_id
+        self.policy_name = policy_name
+        self.attached_to = attached_to
+        self.statements = statements
+        self.tags = tags
+
+
+class S3Bucket(Record):
+    __slots__ = (
+        "bucket_name", "environment", "public_access", "encryption", "logging", "data_classification", "tags",
+    )
+
+    def __init__(self, bucket_name, environment, public_access, encryption, logging, data_classification, tags):
+        self.bucket_name = bucket_name
+        self.environment = environment
+        self.public_access = public_access
+        self.encryption = encryption
+        self.logging = logging
+        self.data_classification = data_classification
+        self.tags = tags
+
+
+class SecurityGroupRule(Record):
+    __slots__ = ("direction", "protocol", "from_port", "to_port", "cidr", "cidrs", "source_groups", "description")
+
+    def __init__(self, direction, protocol, from_port, to_port, cidr, cidrs, source_groups, description):
+        self.direction = direction
+        self.protocol = protocol
+        self.from_port = from_port
+        self.to_port = to_port
+        self.cidr = cidr
+        self.cidrs = cidrs
+        self.source_groups = source_groups
+        self.description = description
+
+
+class SecurityGroup(Record):
+    __slots__ = ("group_id", "group_name", "vpc_id", "vpc_cidrs", "environment", "rules", "tags")
+
+    def __init__(self, group_id, group_name, vpc_id, vpc_cidrs, environment, rules, tags):
+        self.group_id = group_id
+        self.group_name = group_name
+        self.vpc_id = vpc_id
+        self.vpc_cidrs = vpc_cidrs
+        self.environment = environment
+        self.rules = rules
+        self.tags = tags
+
+
+class RuleInfo(Record):
+    # The rule-level part of a finding. Obtain through rule_info() so equal
+    # metadata is one shared object.
+    __slots__ = ("id", "title", "service", "issue", "resource_type", "description", "remediation")
+
+    def __init__(self, id, title, service, issue, resource_type, description, remediation):
+        self.id = id
+        self.title = title
+        self.service = service
+        self.issue = issue
+        self.resource_type = resource_type
+        self.description = description
+        self.remediation = remediation
+
+    def replace(self, **changes: Any) -> "RuleInfo":
+        fields = {key: getattr(self, key) for key in self.__slots__}
+        fields.update(changes)
+        return rule_info(**fields)
+
+    def __reduce__(self):
+        # Re-interned when unpickled, e.g. in the parent of a worker process.
+        return _rule_info_args, tuple(getattr(self, key) for key in self.__slots__)
+
+
+_RULE_INFOS: Dict[Tuple[Any, ...], RuleInfo] = {}
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+def rule_info(
+    id: Any,
+    title: Any,
+    service: Any,
+    issue: Any,
+    resource_type: Any,
+    description: Any,
+    remediation: Any,
+) -> RuleInfo:
+    key = (id, title, service, issue, resource_type, description or DEFAULT_DESCRIPTION, remediation)
+    info = _RULE_INFOS.get(key)
+    if info is None:
+        key = tuple(_intern(value) for value in key)
+        info = _RULE_INFOS[key] = RuleInfo(*key)
+    return info
+
+
+def _rule_info_args(*args: Any) -> RuleInfo:
+    return rule_info(*args)
+
+
+class _NoFactors(dict):
+    # The empty factors shared by findings without any; read-only so it cannot
+    # be changed through one finding, and unpickled as the same object.
+    def _read_only(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("Shared empty factors are read-only; assign a new dict instead")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only  # type: ignore[assignment]
+
+    def __reduce__(self):
+        return _no_factors, ()
+
+
+def _no_factors() -> "_NoFactors":
+    return _NO_FACTORS
+
+
+_NO_FACTORS = _NoFactors()
+_RULE_FIELDS = RuleInfo.__slots__
+_SCORE_FIELDS = (
+    "impact_factors", "likelihood_factors", "impact_score", "likelihood_score", "risk_score", "risk_category",
+    "fix_priority",
+)
+_WRITABLE = frozenset(("severity", "resource_id", "explanation", "evidence") + _SCORE_FIELDS)
+
+
+def _rule_field(name: str) -> property:
+    getter = attrgetter("rule." + name)
+
+    def set_field(self, value):
+        self.rule = self.rule.replace(**{name: value})
+
+    return property(getter, set_field)
+
+
+class Finding(Record):
+    # One match of a rule. Rule-level fields are read from (and, when set,
+    # replace) the shared RuleInfo; keys that are not finding fields, e.g.
+    # annotations added by callers, go to `extra`.
+    __slots__ = (
+        "rule", "severity", "resource_id", "explanation", "evidence", "impact_factors", "likelihood_factors",
+        "impact_score", "likelihood_score", "risk_score", "risk_category", "fix_priority", "extra",
+    )
+    _keys = (
+        "id", "title", "service", "severity", "issue", "resource_type", "resource_id", "resource",
+        "description", "explanation", "evidence", "remediation",
+    ) + _SCORE_FIELDS
+    _optional = frozenset({"evidence"})
+
+    id = _rule_field("id")
+    title = _rule_field("title")
+    service = _rule_field("service")
+    issue = _rule_field("issue")
+    resource_type = _rule_field("resource_type")
+    description = _rule_field("description")
+    remediation = _rule_field("remediation")
+    resource = property(attrgetter("resource_id"))
+
+    def __init__(self, rule: RuleInfo, severity: Any, resource_id: Any, explanation: Any, evidence: Any = None):
+        self.rule = rule
+        self.severity = severity
+        self.resource_id = resource_id
+        self.explanation = explanation
+        self.evidence = evidence
+        self.impact_factors = _NO_FACTORS
+        self.likelihood_factors = _NO_FACTORS
+        self.impact_score = 0
+        self.likelihood_score = 0
+        self.risk_score = 0
+        self.risk_category = "Low"
+        self.fix_priority = None
+        self.extra = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], rule: Optional[RuleInfo] = None) -> "Finding":
+        # Inverse of to_dict(), e.g. for findings loaded from JSON. Pass the
+        # rule's RuleInfo to decode the output of compact().
+        finding = cls(
+            rule if rule is not None else rule_info(*(data.get(key) for key in _RULE_FIELDS)),
+            data.get("severity"),
+            data.get("resource_id"),
+            data.get("explanation"),
+            data.get("evidence"),
+        )
+        for key in _SCORE_FIELDS:
+            if key in data:
+                setattr(finding, key, data[key])
+        for key, value in data.items():
+            if key not in cls._getters:
+                finding[key] = value
+        return finding
+
+    def get(self, key: str, default: Any = None) -> Any:
+        getter = self._getters.get(key)
+        if getter is None:
+            extra = self.extra
+            return default if extra is None else extra.get(key, default)
+        value = getter(self)
+        if value is None and key == "evidence":
+            return default
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._getters and self.extra is not None and key in self.extra:
+            return self.extra[key]
+        return Record.__getitem__(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _WRITABLE:
+            setattr(self, key, value)
+        elif key in _RULE_FIELDS:
+            self.rule = self.rule.replace(**{key: value})
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+
+    def keys(self) -> List[str]:
+        keys = Record.keys(self)
+        if self.extra:
+            keys.extend(key for key in self.extra if key not in self._getters)
+        return keys
+
+    def compact(self) -> Dict[str, Any]:
+        # The per-finding fields and the rule id, without the rule metadata
+        # every finding of the rule shares or the "resource" alias; what gets
+        # stored per finding, with the metadata joined back by rule id.
+        data = {
+            "id": self.rule.id,
+            "severity": self.severity,
+            "resource_id": self.resource_id,
+            "explanation": self.explanation,
+        }
+        if self.evidence is not None:
+            data["evidence"] = _plain(self.evidence)
+        for key in _SCORE_FIELDS:
+            data[key] = _plain(getattr(self, key))
+        if self.extra:
+            for key, value in self.extra.items():
+                if key not in self._getters:
+                    data[key] = value
+        return data
+
+    def copy(self) -> "Finding":
+        finding = Finding(self.rule, self.severity, self.resource_id, self.explanation, self.evidence)
+        for key in _SCORE_FIELDS:
+            setattr(finding, key, getattr(self, key))
+        finding.extra = dict(self.extra) if self.extra is not None else None
+        return finding
+
+
+def finding_from(data: Any) -> Finding:
+    return data if isinstance(data, Finding) else Finding.from_dict(data)
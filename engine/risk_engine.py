@@ -1,4 +1,16 @@
-from typing import Any, Dict, List, Tuple
+import hashlib
+import heapq
+import json
+from array import array
+from itertools import product
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from engine.records import Finding
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the array module path gives the same results.
+    np = None
 
 
 IMPACT_MAP = {
@@ -83,28 +95,325 @@ def categorize(score: int) -> str:
     return "Low"
 
 
-def score_findings(findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    for finding in findings:
-        impact = calculate_impact(finding.get("impact_factors", {}))
-        likelihood = calculate_likelihood(finding.get("likelihood_factors", {}))
-        risk_score = impact * likelihood
+def _factors(finding: Any) -> Tuple[Dict[str, str], Dict[str, str]]:
+    if type(finding) is Finding:
+        return finding.impact_factors, finding.likelihood_factors
+    return finding.get("impact_factors", {}), finding.get("likelihood_factors", {})
+
+
+def _set_scores(finding: Any, impact: int, likelihood: int, risk_score: int, category: str) -> None:
+    # Finding records are written through their slots; plain dicts (e.g.
+    # findings loaded from JSON) by key.
+    if type(finding) is Finding:
+        finding.impact_score = impact
+        finding.likelihood_score = likelihood
+        finding.risk_score = risk_score
+        finding.risk_category = category
+    else:
         finding["impact_score"] = impact
         finding["likelihood_score"] = likelihood
         finding["risk_score"] = risk_score
-        finding["risk_category"] = categorize(risk_score)
+        finding["risk_category"] = category
+
+
+# Scoring profiles. Impact and likelihood are each the rounded mean of three
+# factor weights, so a profile (the weight of each factor value plus the
+# category thresholds) fixes the scores of every combination of the six
+# factor values. It compiles them into one table keyed by that tuple, making
+# the scoring of a finding a single dictionary lookup; combinations with
+# values outside the maps (weighted DEFAULT_WEIGHT) are computed on first use
+# and added. Custom profiles, e.g. one per tenant, override weights or
+# thresholds of the default, which uses the maps above.
+IMPACT_FACTORS = (("data_sensitivity", "unknown"), ("privilege", "unknown"), ("blast_radius", "unknown"))
+LIKELIHOOD_FACTORS = (
+    ("internet_exposure", "unknown"),
+    ("ease_of_exploit", "moderate"),
+    ("common_attack_pattern", "medium"),
+)
+DEFAULT_WEIGHT = 3
+MAX_WEIGHT = 10
+CATEGORY_THRESHOLDS = {"Critical": 20, "High": 12, "Medium": 6}
+# Bound on a compiled table. Profiles with more combinations than this are
+# only compiled for the combinations met while scoring.
+SCORE_TABLE_MAX_ENTRIES = 1 << 16
+
+_DEFAULT_WEIGHTS = dict(zip(
+    [name for name, _ in IMPACT_FACTORS + LIKELIHOOD_FACTORS],
+    (IMPACT_MAP, PRIVILEGE_MAP, BLAST_MAP, EXPOSURE_MAP, EASE_MAP, ATTACK_MAP),
+))
+_AVG_BY_SUM = [max(1, round(total / 3)) for total in range(3 * MAX_WEIGHT + 1)]
+
+# (impact, likelihood, risk_score, risk_category)
+ScoreEntry = Tuple[int, int, int, str]
+
+
+class ScoringProfile:
+    def __init__(
+        self,
+        name: str = "default",
+        weights: Optional[Mapping[str, Mapping[str, int]]] = None,
+        thresholds: Optional[Mapping[str, int]] = None,
+    ):
+        merged = {factor: dict(values) for factor, values in _DEFAULT_WEIGHTS.items()}
+        for factor, values in (weights or {}).items():
+            if factor not in merged:
+                raise ValueError(f"Unknown risk factor {factor}")
+            for value, weight in values.items():
+                if type(weight) is not int or not 1 <= weight <= MAX_WEIGHT:
+                    raise ValueError(f"Weight of {factor} {value!r} must be an integer from 1 to {MAX_WEIGHT}")
+                merged[factor][value] = weight
+        limits = dict(CATEGORY_THRESHOLDS)
+        for category, threshold in (thresholds or {}).items():
+            if category not in limits or type(threshold) is not int:
+                raise ValueError(f"Invalid threshold {category}={threshold!r}")
+            limits[category] = threshold
+        if not limits["Critical"] >= limits["High"] >= limits["Medium"]:
+            raise ValueError("Thresholds must satisfy Critical >= High >= Medium")
+        self.name = name
+        self.weights = merged
+        self.thresholds = limits
+        self.category_by_score = [self.categorize(score) for score in range(MAX_WEIGHT * MAX_WEIGHT + 1)]
+        self._maps = tuple(merged[factor] for factor, _ in IMPACT_FACTORS + LIKELIHOOD_FACTORS)
+        self.table: Dict[Tuple[Any, ...], ScoreEntry] = {}
+        combinations = 1
+        for weights_by_value in self._maps:
+            combinations *= len(weights_by_value)
+        if combinations <= SCORE_TABLE_MAX_ENTRIES:
+            self.table = {key: self._score(key) for key in product(*self._maps)}
+        self.unfactored = self._score(tuple(default for _, default in IMPACT_FACTORS + LIKELIHOOD_FACTORS))
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "ScoringProfile":
+        # {"name": ..., "weights": {factor: {value: weight}}, "thresholds":
+        # {category: minimum score}}; everything is optional.
+        return cls(data.get("name", "custom"), data.get("weights"), data.get("thresholds"))
+
+    def __reduce__(self):
+        # Worker processes rebuild the table instead of unpickling it.
+        return (ScoringProfile, (self.name, self.weights, self.thresholds))
+
+    def fingerprint(self) -> str:
+        payload = json.dumps([self.weights, self.thresholds], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def categorize(self, score: int) -> str:
+        for category in ("Critical", "High", "Medium"):
+            if score >= self.thresholds[category]:
+                return category
+        return "Low"
+
+    def _score(self, key: Tuple[Any, ...]) -> ScoreEntry:
+        w = [weights.get(value, DEFAULT_WEIGHT) for weights, value in zip(self._maps, key)]
+        impact = _AVG_BY_SUM[w[0] + w[1] + w[2]]
+        likelihood = _AVG_BY_SUM[w[3] + w[4] + w[5]]
+        score = impact * likelihood
+        return impact, likelihood, score, self.category_by_score[score]
+
+    def lookup(self, impact_factors: Dict[str, str], likelihood_factors: Dict[str, str]) -> ScoreEntry:
+        if not impact_factors and not likelihood_factors:
+            # Findings from rules that set no factors, the common case.
+            return self.unfactored
+        key = (
+            impact_factors.get("data_sensitivity", "unknown"),
+            impact_factors.get("privilege", "unknown"),
+            impact_factors.get("blast_radius", "unknown"),
+            likelihood_factors.get("internet_exposure", "unknown"),
+            likelihood_factors.get("ease_of_exploit", "moderate"),
+            likelihood_factors.get("common_attack_pattern", "medium"),
+        )
+        entry = self.table.get(key)
+        if entry is None:
+            entry = self._score(key)
+            if len(self.table) < SCORE_TABLE_MAX_ENTRIES:
+                self.table[key] = entry
+        return entry
+
+
+DEFAULT_PROFILE = ScoringProfile()
+
+
+def load_profile(path: str) -> ScoringProfile:
+    with open(path, "r", encoding="utf-8") as f:
+        return ScoringProfile.from_dict(json.load(f))
+
+
+def score_findings(findings: List[Finding], profile: Optional[ScoringProfile] = None) -> List[Finding]:
+    lookup = (profile or DEFAULT_PROFILE).lookup
+    for finding in findings:
+        _set_scores(finding, *lookup(*_factors(finding)))
     return findings
 
 
-def prioritize(findings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    scored = score_findings(findings)
+def prioritize(findings: List[Finding], profile: Optional[ScoringProfile] = None) -> List[Finding]:
+    if len(findings) >= COLUMNAR_THRESHOLD:
+        return prioritize_columnar(findings, profile=profile)
+    scored = score_findings(findings, profile)
     scored.sort(key=lambda f: (f.get("risk_score", 0), f.get("impact_score", 0)), reverse=True)
     for idx, finding in enumerate(scored, start=1):
         finding["fix_priority"] = idx
     return scored
 
 
-def overall_posture(findings: List[Dict[str, Any]]) -> Tuple[str, int]:
+def overall_posture(findings: List[Finding]) -> Tuple[str, int]:
     if not findings:
         return "Low", 0
     top = max(findings, key=lambda f: f.get("risk_score", 0))
     return top.get("risk_category", "Low"), top.get("risk_score", 0)
+
+
+# Batch scoring. Scores are kept as parallel integer columns, so the priority
+# order is a stable sort over one integer key per finding and only the
+# findings that are materialized are written to. Results are identical to
+# score_findings/prioritize.
+COLUMNAR_THRESHOLD = 5000
+
+# Impact never exceeds MAX_WEIGHT, so risk_score * _IMPACT_RADIX + impact
+# orders findings exactly like the (risk_score, impact_score) tuple used by
+# prioritize.
+_IMPACT_RADIX = MAX_WEIGHT + 1
+
+
+def score_columns(findings: Sequence[Finding], profile: Optional[ScoringProfile] = None) -> Dict[str, Sequence[int]]:
+    # Scores as parallel integer columns (impact, likelihood, risk_score) without
+    # touching the findings.
+    lookup = (profile or DEFAULT_PROFILE).lookup
+    return _entry_columns([lookup(*_factors(finding)) for finding in findings])
+
+
+def _entry_columns(entries: Sequence[ScoreEntry]) -> Dict[str, Sequence[int]]:
+    return {
+        "impact": array("B", [entry[0] for entry in entries]),
+        "likelihood": array("B", [entry[1] for entry in entries]),
+        "risk_score": array("B", [entry[2] for entry in entries]),
+    }
+
+
+def rank_columns(columns: Dict[str, Sequence[int]]) -> List[int]:
+    # Finding indexes in fix-priority order (highest risk first, ties keep input order).
+    if np is not None:
+        keys = np.asarray(columns["risk_score"], dtype=np.int32) * _IMPACT_RADIX + np.asarray(columns["impact"])
+        return np.argsort(-keys, kind="stable").tolist()
+    keys = array("H", [r * _IMPACT_RADIX + i for r, i in zip(columns["risk_score"], columns["impact"])])
+    return sorted(range(len(keys)), key=keys.__getitem__, reverse=True)
+
+
+def materialize(
+    findings: Sequence[Finding],
+    columns: Dict[str, Sequence[int]],
+    order: Sequence[int],
+    limit: Optional[int] = None,
+    profile: Optional[ScoringProfile] = None,
+) -> List[Finding]:
+    # Writes scores and fix_priority into the findings selected by `order`
+    # (optionally only the first `limit`) and returns them in priority order.
+    category_by_score = (profile or DEFAULT_PROFILE).category_by_score
+    impact = columns["impact"]
+    likelihood = columns["likelihood"]
+    risk = columns["risk_score"]
+    selected = order if limit is None else order[:limit]
+    result = []
+    for rank, idx in enumerate(selected, start=1):
+        finding = findings[idx]
+        score = int(risk[idx])
+        _set_scores(finding, int(impact[idx]), int(likelihood[idx]), score, category_by_score[score])
+        finding["fix_priority"] = rank
+        result.append(finding)
+    return result
+
+
+def prioritize_columnar(
+    findings: List[Finding], limit: Optional[int] = None, profile: Optional[ScoringProfile] = None
+) -> List[Finding]:
+    columns = score_columns(findings, profile)
+    order = rank_columns(columns)
+    return materialize(findings, columns, order, limit, profile)
+
+
+# Streaming prioritization. Findings are scored as they arrive from the rule
+# engine; a histogram of risk scores gives the category counts and the
+# posture, and a min-heap keeps the `limit` highest-priority findings, so
+# neither needs a sort or another pass over the findings. Only with
+# full_order=True (e.g. for exports) are all findings kept and ordered.
+class PriorityStream:
+    def __init__(self, limit: int = 0, profile: Optional[ScoringProfile] = None, full_order: bool = False):
+        # A limit of 0 keeps no top findings, only the counts and posture.
+        self.limit = limit
+        self.profile = profile or DEFAULT_PROFILE
+        self.full_order = full_order
+        self.count = 0
+        self._histogram = [0] * (MAX_WEIGHT * MAX_WEIGHT + 1)
+        # (priority key, -arrival, score entry, finding); arrival breaks ties
+        # in input order, like the stable sort in prioritize.
+        self._heap: List[Tuple[int, int, ScoreEntry, Finding]] = []
+        self._findings: List[Finding] = []
+        self._entries: List[ScoreEntry] = []
+        self._order: Optional[List[int]] = None
+
+    def extend(self, findings: Iterable[Finding]) -> None:
+        lookup = self.profile.lookup
+        histogram = self._histogram
+        seq = self.count
+        if self.full_order:
+            kept = self._findings
+            entries = self._entries
+            for finding in findings:
+                entry = lookup(*_factors(finding))
+                histogram[entry[2]] += 1
+                kept.append(finding)
+                entries.append(entry)
+                seq += 1
+            self._order = None
+        elif not self.limit:
+            for finding in findings:
+                histogram[lookup(*_factors(finding))[2]] += 1
+                seq += 1
+        else:
+            heap = self._heap
+            limit = self.limit
+            for finding in findings:
+                entry = lookup(*_factors(finding))
+                histogram[entry[2]] += 1
+                key = entry[2] * _IMPACT_RADIX + entry[0]
+                if len(heap) < limit:
+                    heapq.heappush(heap, (key, -seq, entry, finding))
+                elif key > heap[0][0]:
+                    heapq.heapreplace(heap, (key, -seq, entry, finding))
+                seq += 1
+        self.count = seq
+
+    def counts(self) -> Dict[str, int]:
+        counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
+        category_by_score = self.profile.category_by_score
+        for score, count in enumerate(self._histogram):
+            if count:
+                counts[category_by_score[score]] += count
+        return counts
+
+    def posture(self) -> Tuple[str, int]:
+        # Same as overall_posture() of the prioritized findings.
+        for score in range(len(self._histogram) - 1, -1, -1):
+            if self._histogram[score]:
+                return self.profile.category_by_score[score], score
+        return "Low", 0
+
+    def top(self) -> List[Finding]:
+        # The `limit` highest-priority findings, scored and numbered from 1.
+        if self.full_order:
+            return self._materialize(self.limit)
+        ranked = sorted(self._heap, reverse=True)
+        for rank, (_, _, entry, finding) in enumerate(ranked, start=1):
+            _set_scores(finding, *entry)
+            finding["fix_priority"] = rank
+        return [item[3] for item in ranked]
+
+    def ordered(self) -> List[Finding]:
+        # Every finding in fix-priority order, as prioritize() returns them.
+        if not self.full_order:
+            raise ValueError("Full ordering needs a PriorityStream created with full_order=True")
+        return self._materialize(None)
+
+    def _materialize(self, limit: Optional[int]) -> List[Finding]:
+        columns = _entry_columns(self._entries)
+        if self._order is None:
+            self._order = rank_columns(columns)
+        return materialize(self._findings, columns, self._order, limit, self.profile)
@@ -1,36 +1,256 @@
+import logging
 import os
-from typing import Any, Dict, List
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from rules.iam_rules import run_iam_rules
-from rules.network_rules import run_network_rules
-from rules.storage_rules import run_storage_rules
+from engine import instrumentation
+from engine.records import Finding
+# Importing the rule modules registers their rules with the registry.
+from rules import iam_rules, network_rules, storage_rules  # noqa: F401
+from rules.registry import (
+    Rule,
+    analyzer_rules,
+    evaluate_each,
+    evaluate_each_profiled,
+    evaluate_views,
+    get_rule_info,
+    ruleset_version,
+)
+from storage.result_cache import ResultCache, resource_fingerprint
 
+logger = logging.getLogger(__name__)
 
-def run_all_rules(parsed_inputs: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
-    findings: List[Dict[str, Any]] = []
+DEFAULT_CHUNK_SIZE = 2000
 
-    iam_policies = parsed_inputs.get("iam_policies", [])
-    s3_configs = parsed_inputs.get("s3_configs", [])
-    security_groups = parsed_inputs.get("security_groups", [])
+RESOURCE_BATCHES = (
+    ("IAM", "iam_policy", "iam_policies"),
+    ("S3", "s3_bucket", "s3_configs"),
+    ("NETWORK", "security_group", "security_groups"),
+)
 
-    print("RULE ENGINE: iam_policies=", len(iam_policies), "s3_configs=", len(s3_configs), "security_groups=", len(security_groups))
 
-    iam_findings = run_iam_rules(iam_policies)
-    print("IAM RULES EXECUTED: produced", len(iam_findings))
-    findings.extend(iam_findings)
+# (resource type, cache keys or None, cached findings (as dicts) by key)
+ChunkContext = Tuple[str, Optional[List[str]], Dict[str, List[Dict[str, Any]]]]
+# (resource type, resources to evaluate, collect per-rule stats)
+ChunkTask = Tuple[str, List[Dict[str, Any]], bool]
+ChunkResult = Tuple[List[List[Finding]], Optional[Dict[str, List[int]]]]
+# How a process pool fails on platforms where it cannot run.
+_POOL_ERRORS = (BrokenExecutor, OSError)
+# Analyzer rules with their analyzer instance, by resource type.
+Analyzers = Dict[str, List[Tuple[Rule, Any]]]
 
-    s3_findings = run_storage_rules(s3_configs)
-    print("S3 RULES EXECUTED: produced", len(s3_findings))
-    findings.extend(s3_findings)
 
-    net_findings = run_network_rules(security_groups)
-    print("NETWORK RULES EXECUTED: produced", len(net_findings))
-    findings.extend(net_findings)
+def _chunked(resources: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    it = iter(resources)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _run_chunk(task: ChunkTask) -> ChunkResult:
+    # Per-rule stats travel back with the findings because chunks may run in
+    # worker processes that do not share the parent's metrics.
+    resource_type, chunk, profiled = task
+    if not profiled:
+        return evaluate_each(resource_type, chunk), None
+    stats: Dict[str, List[int]] = {}
+    return evaluate_each_profiled(resource_type, chunk, stats), stats
+
+
+def _plan_chunks(
+    batches: List[Tuple[str, str, Iterable[Dict[str, Any]]]],
+    chunk_size: int,
+    cache: Optional[ResultCache],
+    profiled: bool = False,
+    analyzers: Optional[Analyzers] = None,
+    analyzer_stats: Optional[Dict[str, List[int]]] = None,
+) -> Iterator[Tuple[ChunkContext, ChunkTask]]:
+    # Yields (context, task) pairs. With a cache, each chunk is looked up by
+    # content hash first and only the resources that missed are evaluated.
+    # Analyzers see every resource, cached or not, in the parent process.
+    ruleset = ruleset_version() if cache is not None else ""
+    for _, resource_type, resources in batches:
+        for chunk in _chunked(resources, chunk_size):
+            if profiled:
+                instrumentation.count("scanner_resources_total", len(chunk), resource_type=resource_type)
+            for rule, analyzer in (analyzers or {}).get(resource_type, ()):
+                start = time.perf_counter_ns()
+                for resource in chunk:
+                    analyzer.add(resource)
+                if analyzer_stats is not None:
+                    entry = analyzer_stats.setdefault(rule.id, [0, 0, 0])
+                    entry[0] += len(chunk)
+                    entry[2] += time.perf_counter_ns() - start
+            if cache is None:
+                yield (resource_type, None, {}), (resource_type, chunk, profiled)
+                continue
+            keys = [resource_fingerprint(resource_type, resource, ruleset) for resource in chunk]
+            cached = cache.get_many(keys)
+            misses = [resource for resource, key in zip(chunk, keys) if key not in cached]
+            if profiled:
+                instrumentation.count("scanner_cache_hits_total", len(chunk) - len(misses))
+                instrumentation.count("scanner_cache_misses_total", len(misses))
+            yield (resource_type, keys, cached), (resource_type, misses, profiled)
+
+
+def _merge_chunk(
+    context: ChunkContext,
+    evaluated: List[List[Finding]],
+    cache: Optional[ResultCache],
+) -> List[List[Finding]]:
+    _, keys, cached = context
+    if keys is None:
+        return evaluated
+    fresh = iter(evaluated)
+    grouped: List[List[Finding]] = []
+    new_entries: List[Tuple[str, List[Dict[str, Any]]]] = []
+    for key in keys:
+        if key in cached:
+            # Identical resources share a cache entry but each occurrence gets
+            # its own records, since later stages score findings in place.
+            # Entries hold compact findings; the rule metadata is rejoined
+            # from the registry (the key includes the ruleset version).
+            grouped.append([Finding.from_dict(data, get_rule_info(data.get("id"))) for data in cached[key]])
+        else:
+            resource_findings = next(fresh)
+            grouped.append(resource_findings)
+            new_entries.append((key, [finding.compact() for finding in resource_findings]))
+    cache.put_many(new_entries)
+    return grouped
+
+
+def _ordered_map(
+    executor: Optional[Executor],
+    items: Iterable[Tuple[ChunkContext, ChunkTask]],
+    max_in_flight: int,
+) -> Iterator[Tuple[ChunkContext, ChunkResult]]:
+    # Like Executor.map, but only keeps a bounded window of chunks in flight so
+    # streamed inputs are not pulled into memory all at once. Results come back
+    # in submission order, which keeps findings in the same order as a serial
+    # run. Without an executor chunks are evaluated inline. If a process pool
+    # breaks (workers that cannot start or die), the chunks in flight and the
+    # rest are evaluated on threads instead.
+    pending: deque = deque()
+    fallback: Optional[Executor] = None
+
+    def use_threads(exc: BaseException) -> Executor:
+        nonlocal executor, fallback
+        if fallback is not None or not isinstance(executor, ProcessPoolExecutor):
+            raise exc
+        logger.warning("Process pool failed, evaluating rules on threads: %s", exc)
+        executor = fallback = ThreadPoolExecutor(max_workers=max(1, max_in_flight // 2))
+        for i, (context, task, future, _) in enumerate(pending):
+            if future is not None:
+                pending[i] = (context, task, fallback.submit(_run_chunk, task), None)
+        return fallback
+
+    def submit(task: ChunkTask) -> Tuple[Optional[Future], Optional[ChunkResult]]:
+        if executor is None or not task[1]:
+            return None, _run_chunk(task)
+        try:
+            return executor.submit(_run_chunk, task), None
+        except _POOL_ERRORS as exc:
+            return use_threads(exc).submit(_run_chunk, task), None
+
+    def take() -> Tuple[ChunkContext, ChunkResult]:
+        context, task, future, result = pending.popleft()
+        if future is None:
+            return context, result
+        try:
+            return context, future.result()
+        except _POOL_ERRORS as exc:
+            return context, use_threads(exc).submit(_run_chunk, task).result()
+
+    try:
+        for context, task in items:
+            pending.append((context, task, *submit(task)))
+            if len(pending) >= max_in_flight:
+                yield take()
+        while pending:
+            yield take()
+    finally:
+        if fallback is not None:
+            fallback.shutdown()
+
+
+def _create_executor(workers: int, use_processes: bool) -> Executor:
+    if use_processes:
+        try:
+            return ProcessPoolExecutor(max_workers=workers)
+        except (ImportError, NotImplementedError, OSError) as exc:
+            # Some platforms (and sandboxes without working semaphores) cannot
+            # start worker processes; threads keep the scan running there.
+            logger.warning("Process pool unavailable, evaluating rules on threads: %s", exc)
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+# Resource inputs may be lists or the lazy iterators from the parser's
+# stream_* functions; each one is consumed exactly once. With workers > 1 the
+# resources are sharded into chunks of `chunk_size` and evaluated on a process
+# pool (threads where processes are unavailable); findings are merged back in
+# input order so the result is identical to the serial run. With a cache,
+# resources whose content hash is already known reuse their cached findings.
+# iter_all_rules() yields the findings in batches (per resource, then per
+# cross-resource rule) as they are produced; run_all_rules() collects them.
+def iter_all_rules(
+    parsed_inputs: Dict[str, Iterable[Dict[str, Any]]],
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_processes: bool = True,
+    cache: Optional[ResultCache] = None,
+) -> Iterator[List[Finding]]:
+    batches = [
+        (label, resource_type, parsed_inputs.get(key, []))
+        for label, resource_type, key in RESOURCE_BATCHES
+    ]
+
+    produced = {resource_type: 0 for _, resource_type, _ in RESOURCE_BATCHES}
+    profiled = instrumentation.enabled()
+    analyzers: Analyzers = {
+        resource_type: [(rule, rule.analyzer()) for rule in analyzer_rules(resource_type)]
+        for _, resource_type, _ in RESOURCE_BATCHES
+    }
+    analyzer_stats: Optional[Dict[str, List[int]]] = {} if profiled else None
+    executor = _create_executor(workers, use_processes) if workers > 1 else None
+    try:
+        planned = _plan_chunks(batches, chunk_size, cache, profiled, analyzers, analyzer_stats)
+        chunks = _ordered_map(executor, planned, max(workers * 2, 1))
+        for context, (evaluated, stats) in chunks:
+            if stats:
+                instrumentation.record_rule_stats(stats)
+            for resource_findings in _merge_chunk(context, evaluated, cache):
+                produced[context[0]] += len(resource_findings)
+                yield resource_findings
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Cross-resource rules run once every resource has been seen.
+    for resource_type, entries in analyzers.items():
+        for rule, analyzer in entries:
+            start = time.perf_counter_ns()
+            rule_findings = evaluate_views(rule, analyzer.views())
+            if analyzer_stats is not None:
+                entry = analyzer_stats.setdefault(rule.id, [0, 0, 0])
+                entry[1] += len(rule_findings)
+                entry[2] += time.perf_counter_ns() - start
+            produced[resource_type] += len(rule_findings)
+            yield rule_findings
+    if analyzer_stats:
+        instrumentation.record_rule_stats(analyzer_stats)
+
+    for resource_type, count in produced.items():
+        instrumentation.count("scanner_findings_total", count, resource_type=resource_type)
 
     # Optional test forcing via environment variable for UI rendering validation
     if os.environ.get("FORCE_TEST_FINDING") == "1":
-        print("RULE ENGINE: FORCE_TEST_FINDING active — adding synthetic test finding")
-        findings.append({
+        logger.warning("FORCE_TEST_FINDING active, adding synthetic test finding")
+        yield [Finding.from_dict({
             "id": "TEST_PIPELINE",
             "title": "Pipeline test",
             "description": "Synthetic finding to validate end-to-end pipeline and UI rendering.",
@@ -44,20 +264,19 @@ def run_all_rules(parsed_inputs: Dict[str, List[Dict[str, Any]]]) -> List[Dict[s
             "likelihood_score": 5,
             "impact_factors": {"data_sensitivity": "pii", "privilege": "admin", "blast_radius": "account"},
             "likelihood_factors": {"internet_exposure": "public", "ease_of_exploit": "easy", "common_attack_pattern": "high"},
-        })
-
-    # Normalize findings to include risk metadata expected by templates and scoring logic
-    for f in findings:
-        f.setdefault("impact_factors", {})
-        f.setdefault("likelihood_factors", {})
-        # placeholder scores; will be computed in risk engine if not present
-        f.setdefault("impact_score", 0)
-        f.setdefault("likelihood_score", 0)
-        f.setdefault("risk_score", 0)
-        f.setdefault("risk_category", "Low")
-        f.setdefault("fix_priority", None)
-        f.setdefault("description", f.get("description") or "No description provided.")
-
-    print("RULE ENGINE: total findings=", len(findings))
+        })]
+
 
+def run_all_rules(
+    parsed_inputs: Dict[str, Iterable[Dict[str, Any]]],
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    use_processes: bool = True,
+    cache: Optional[ResultCache] = None,
+) -> List[Finding]:
+    findings: List[Finding] = []
+    for batch in iter_all_rules(parsed_inputs, workers, chunk_size, use_processes, cache):
+        findings.extend(batch)
+    # Findings already carry the risk fields expected by templates and scoring
+    # logic (placeholder scores until the risk engine computes them).
     return findings
@@ -0,0 +1,87 @@
+import hashlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Drift between two scans. A finding is identified across scans by its rule
+# id, resource type and resource id. key_hash() reduces that to a 64-bit
+# integer (stored with every finding by the scan store), so a scan becomes a
+# hash map of key -> position and new, resolved and unchanged findings are
+# set differences between two of them. Several findings of one rule on one
+# resource (e.g. one per statement) share a key and count once, at their
+# highest priority.
+
+_CATEGORIES = ("Critical", "High", "Medium", "Low")
+
+
+def key_hash(rule_id: Any, resource_type: Any, resource_id: Any) -> int:
+    # Stable across processes and runs, unlike hash(); signed so it fits an
+    # SQLite INTEGER.
+    text = f"{rule_id}\x1f{resource_type}\x1f{resource_id}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(text, digest_size=8).digest(), "big", signed=True)
+
+
+def finding_key(finding: Any) -> int:
+    return key_hash(finding.get("id"), finding.get("resource_type"), finding.get("resource_id"))
+
+
+def index_findings(findings: Iterable[Any]) -> Dict[int, int]:
+    # key -> position of its first finding, for findings in fix-priority order.
+    index: Dict[int, int] = {}
+    for position, finding in enumerate(findings):
+        index.setdefault(finding_key(finding), position)
+    return index
+
+
+@dataclass
+class ScanDiff:
+    # Positions in fix-priority order: `new` and `unchanged` in the head
+    # (later) scan, `resolved` in the base scan.
+    new: List[int] = field(default_factory=list)
+    resolved: List[int] = field(default_factory=list)
+    unchanged: List[int] = field(default_factory=list)
+
+    def counts(self) -> Dict[str, int]:
+        return {"new": len(self.new), "resolved": len(self.resolved), "unchanged": len(self.unchanged)}
+
+
+def diff_indexes(base: Dict[int, int], head: Dict[int, int]) -> ScanDiff:
+    diff = ScanDiff()
+    new, unchanged = diff.new, diff.unchanged
+    for key, position in head.items():
+        if key in base:
+            unchanged.append(position)
+        else:
+            new.append(position)
+    diff.resolved = [position for key, position in base.items() if key not in head]
+    new.sort()
+    unchanged.sort()
+    diff.resolved.sort()
+    return diff
+
+
+def diff_findings(base: Iterable[Any], head: Iterable[Any]) -> ScanDiff:
+    return diff_indexes(index_findings(base), index_findings(head))
+
+
+def _breakdown(rows: Iterable[Tuple[Any, Any]]) -> Dict[str, Dict[str, int]]:
+    by_category = dict.fromkeys(_CATEGORIES, 0)
+    by_rule: Counter = Counter()
+    for rule_id, category in rows:
+        by_category[category] = by_category.get(category, 0) + 1
+        by_rule[rule_id] += 1
+    return {"by_category": by_category, "by_rule": dict(by_rule.most_common())}
+
+
+def drift_summary(
+    diff: ScanDiff,
+    new_rows: Iterable[Tuple[Any, Any]],
+    resolved_rows: Iterable[Tuple[Any, Any]],
+) -> Dict[str, Any]:
+    # Drift report: change counts plus the (rule id, risk category) breakdown
+    # of the new and the resolved findings.
+    return {
+        "counts": diff.counts(),
+        "new": _breakdown(new_rows),
+        "resolved": _breakdown(resolved_rows),
+    }
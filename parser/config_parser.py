@@ -1,5 +1,32 @@
+import io
 import json
-from typing import Any, Dict, List, Tuple
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from engine.records import IamPolicy, IamStatement, Record, S3Bucket, SecurityGroup, SecurityGroupRule
+from parser.json_backend import gc_paused, load_path
+
+IAM_WRAPPER_KEYS = ("policies", "Policies")
+S3_WRAPPER_KEYS = ("buckets", "Buckets")
+SG_WRAPPER_KEYS = ("security_groups", "SecurityGroups")
+
+STREAM_CHUNK_SIZE = 1 << 16
+# Largest single record (in characters) the streaming parser buffers; a
+# record that is still incomplete beyond this is reported as invalid.
+MAX_RECORD_SIZE = 64 << 20
+# A decode error this far before the end of the buffered input cannot be
+# caused by a token cut off at the end (only an unterminated string can
+# reach back further), so the input is malformed.
+_TRUNCATION_SLACK = 256
+
+_WHITESPACE = " \t\n\r"
+_DECODER = json.JSONDecoder()
+
+
+def _word(value: Any) -> Any:
+    # Short values that repeat across resources (environments, protocols,
+    # effects) are interned so normalized records share one string.
+    return sys.intern(value) if type(value) is str else value
 
 
 def _safe_list(value: Any) -> List[Any]:
@@ -13,8 +40,7 @@ def _safe_list(value: Any) -> List[Any]:
 def load_json_file(path: str) -> Tuple[Any, List[str]]:
     errors: List[str] = []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f), errors
+        return load_path(path), errors
     except FileNotFoundError:
         errors.append(f"File not found: {path}")
     except json.JSONDecodeError as exc:
@@ -24,9 +50,214 @@ def load_json_file(path: str) -> Tuple[Any, List[str]]:
     return None, errors
 
 
-def parse_iam_policies(raw: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
+class _JsonStream:
+    # Incremental reader over a text stream. Only the value currently being
+    # decoded is buffered, so memory is bounded by the largest single record
+    # (at most MAX_RECORD_SIZE).
+    def __init__(self, f):
+        self._f = f
+        self._chunk_size = STREAM_CHUNK_SIZE
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        if self._pos > self._chunk_size:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        chunk = self._f.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill(self._chunk_size):
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected '{char}' but found '{found or 'end of input'}'")
+        self._pos += 1
+
+    def value(self) -> Any:
+        if not self.peek():
+            raise ValueError("unexpected end of input")
+        read_size = self._chunk_size
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self._buf, self._pos)
+                # A scalar ending exactly at the buffer edge (e.g. a number) may
+                # continue in the next chunk, so only accept it once more input
+                # is buffered or the stream is exhausted.
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return obj
+            except json.JSONDecodeError as exc:
+                if self._eof:
+                    raise
+                if not exc.msg.startswith("Unterminated string") and exc.pos < len(self._buf) - _TRUNCATION_SLACK:
+                    raise
+            if len(self._buf) - self._pos > MAX_RECORD_SIZE:
+                raise ValueError(f"record exceeds {MAX_RECORD_SIZE} characters")
+            self._fill(read_size)
+            # Grow reads geometrically so a huge record is re-scanned O(log n) times.
+            read_size *= 2
+
+
+def _iter_array(stream: _JsonStream) -> Iterator[Any]:
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return
+    while True:
+        yield stream.value()
+        if stream.peek() == ",":
+            stream.expect(",")
+            continue
+        stream.expect("]")
+        return
+
+
+def _iter_document(stream: _JsonStream, wrapper_keys: Tuple[str, ...]) -> Iterator[Any]:
+    if stream.peek() != "{":
+        if stream.peek() == "[":
+            yield from _iter_array(stream)
+        else:
+            yield stream.value()
+        return
+
+    stream.expect("{")
+    pending: Dict[str, Any] = {}
+    wrapped = False
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key in wrapper_keys and not wrapped:
+            wrapped = True
+            pending = {}
+            if stream.peek() == "[":
+                yield from _iter_array(stream)
+            else:
+                yield stream.value()
+        elif wrapped:
+            stream.value()
+        else:
+            pending[key] = stream.value()
+        if stream.peek() != ",":
+            break
+        stream.expect(",")
+    stream.expect("}")
+    # An object without a wrapper key is a single record, as in the parse_* functions.
+    if not wrapped:
+        yield pending
+
+
+def iter_json_records(source: Any, wrapper_keys: Tuple[str, ...], errors: List[str]) -> Iterator[Any]:
+    # Yields records one at a time from a JSON document (a top-level array, a
+    # wrapper object such as {"Policies": [...]} or a single object) or from a
+    # JSON Lines stream. `source` is a path or a text/binary file object.
+    label = source if isinstance(source, str) else getattr(source, "name", None) or "upload"
+    try:
+        if isinstance(source, str):
+            f = open(source, "r", encoding="utf-8")
+        elif isinstance(source, io.TextIOBase):
+            f = source
+        else:
+            f = io.TextIOWrapper(source, encoding="utf-8")
+    except FileNotFoundError:
+        errors.append(f"File not found: {source}")
+        return
+    except Exception as exc:
+        errors.append(f"Unexpected error reading {label}: {exc}")
+        return
+
+    stream = _JsonStream(f)
+    try:
+        while stream.peek():
+            yield from _iter_document(stream, wrapper_keys)
+    except (ValueError, UnicodeDecodeError) as exc:
+        errors.append(f"Invalid JSON in {label}: {exc}")
+    finally:
+        if isinstance(source, str):
+            f.close()
+        elif f is not source:
+            # Leave the caller's binary stream open.
+            f.detach()
+
+
+def _stream_normalized(
+    records: Iterable[Any],
+    normalize: Callable[[Dict[str, Any]], Record],
+    entry_error: str,
+    errors: List[str],
+) -> Iterator[Record]:
+    for record in records:
+        if not isinstance(record, dict):
+            errors.append(entry_error)
+            continue
+        yield normalize(record)
+
+
+def stream_iam_policies(source: Any, errors: List[str]) -> Iterator[IamPolicy]:
+    records = iter_json_records(source, IAM_WRAPPER_KEYS, errors)
+    return _stream_normalized(records, _normalize_iam_policy, "IAM policy entry is not an object", errors)
+
+
+def stream_s3_configs(source: Any, errors: List[str]) -> Iterator[S3Bucket]:
+    records = iter_json_records(source, S3_WRAPPER_KEYS, errors)
+    return _stream_normalized(records, _normalize_s3_bucket, "S3 bucket entry is not an object", errors)
+
+
+def stream_security_groups(source: Any, errors: List[str]) -> Iterator[SecurityGroup]:
+    records = iter_json_records(source, SG_WRAPPER_KEYS, errors)
+    return _stream_normalized(records, _normalize_security_group, "Security group entry is not an object", errors)
+
+
+def _normalize_iam_policy(policy: Dict[str, Any]) -> IamPolicy:
+    policy_name = policy.get("policy_name") or policy.get("PolicyName") or "UnnamedPolicy"
+    policy_id = policy.get("policy_id") or policy.get("PolicyId") or policy_name
+    document = policy.get("document") or policy.get("PolicyDocument") or {}
+    statements = document.get("Statement", [])
+    if isinstance(statements, dict):
+        statements = [statements]
+
+    normalized_statements = []
+    for stmt in statements:
+        if not isinstance(stmt, dict):
+            continue
+        actions = _safe_list(stmt.get("Action") or stmt.get("Actions"))
+        resources = _safe_list(stmt.get("Resource") or stmt.get("Resources"))
+        normalized_statements.append(IamStatement(
+            _word(stmt.get("Sid") or "Statement"),
+            _word((stmt.get("Effect") or "Allow").lower()),
+            actions,
+            resources,
+            stmt.get("Condition") or {},
+            _safe_list(stmt.get("NotAction")) if "NotAction" in stmt else None,
+        ))
+
+    return IamPolicy(
+        policy_id,
+        policy_name,
+        _safe_list(policy.get("attached_to") or policy.get("AttachedTo")),
+        tuple(normalized_statements),
+        policy.get("tags") or policy.get("Tags") or {},
+    )
+
+
+def parse_iam_policies(raw: Any) -> Tuple[List[IamPolicy], List[str]]:
     errors: List[str] = []
-    policies: List[Dict[str, Any]] = []
+    policies: List[IamPolicy] = []
 
     if raw is None:
         return policies, errors
@@ -44,45 +275,51 @@ def parse_iam_policies(raw: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
         errors.append("IAM policies must be a list or a dict with 'policies'")
         return policies, errors
 
-    for policy in raw_policies:
-        if not isinstance(policy, dict):
-            errors.append("IAM policy entry is not an object")
-            continue
-
-        policy_name = policy.get("policy_name") or policy.get("PolicyName") or "UnnamedPolicy"
-        policy_id = policy.get("policy_id") or policy.get("PolicyId") or policy_name
-        document = policy.get("document") or policy.get("PolicyDocument") or {}
-        statements = document.get("Statement", [])
-        if isinstance(statements, dict):
-            statements = [statements]
-
-        normalized_statements = []
-        for stmt in statements:
-            if not isinstance(stmt, dict):
+    with gc_paused():
+        for policy in raw_policies:
+            if not isinstance(policy, dict):
+                errors.append("IAM policy entry is not an object")
                 continue
-            actions = _safe_list(stmt.get("Action") or stmt.get("Actions"))
-            resources = _safe_list(stmt.get("Resource") or stmt.get("Resources"))
-            normalized_statements.append({
-                "sid": stmt.get("Sid") or "Statement",
-                "effect": (stmt.get("Effect") or "Allow").lower(),
-                "actions": actions,
-                "resources": resources,
-                "conditions": stmt.get("Condition") or {},
-            })
-
-        policies.append({
-            "policy_id": policy_id,
-            "policy_name": policy_name,
-            "statements": normalized_statements,
-            "tags": policy.get("tags") or policy.get("Tags") or {},
-        })
+
+            policies.append(_normalize_iam_policy(policy))
 
     return policies, errors
 
 
-def parse_s3_configs(raw: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
+def _normalize_s3_bucket(bucket: Dict[str, Any]) -> S3Bucket:
+    # Accept both boolean flags and structured dicts
+    public_access = bucket.get("public_access") or bucket.get("PublicAccess") or {}
+    encryption = bucket.get("encryption") or bucket.get("EncryptionAtRest") or {}
+    logging = bucket.get("logging") or bucket.get("AccessLogging") or {}
+
+    # If PublicAccess is a boolean, convert to read/write flags
+    if isinstance(public_access, bool):
+        public_access = {"read": public_access, "write": public_access}
+
+    # If EncryptionAtRest is a boolean, convert to dict
+    if isinstance(encryption, bool):
+        encryption = {"enabled": encryption}
+
+    name = bucket.get("bucket_name") or bucket.get("BucketName") or bucket.get("name") or "unnamed-bucket"
+    environment = _word(bucket.get("environment") or bucket.get("Environment") or "unknown")
+    classification = _word(bucket.get("data_classification") or bucket.get("DataSensitivity") or "unknown")
+    return S3Bucket(
+        name,
+        environment,
+        {"read": bool(public_access.get("read")), "write": bool(public_access.get("write"))},
+        {"enabled": bool(encryption.get("enabled")), "algorithm": _word(encryption.get("algorithm") or "none")},
+        {
+            "enabled": bool(logging.get("enabled")) if isinstance(logging, dict) else bool(logging),
+            "target": logging.get("target") if isinstance(logging, dict) else None,
+        },
+        classification,
+        bucket.get("tags") or bucket.get("Tags") or {},
+    )
+
+
+def parse_s3_configs(raw: Any) -> Tuple[List[S3Bucket], List[str]]:
     errors: List[str] = []
-    buckets: List[Dict[str, Any]] = []
+    buckets: List[S3Bucket] = []
 
     if raw is None:
         return buckets, errors
@@ -100,49 +337,156 @@ def parse_s3_configs(raw: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
         errors.append("S3 configs must be a list or a dict with 'buckets'")
         return buckets, errors
 
-    for bucket in raw_buckets:
-        if not isinstance(bucket, dict):
-            errors.append("S3 bucket entry is not an object")
-            continue
+    with gc_paused():
+        for bucket in raw_buckets:
+            if not isinstance(bucket, dict):
+                errors.append("S3 bucket entry is not an object")
+                continue
 
-        # Accept both boolean flags and structured dicts
-        public_access = bucket.get("public_access") or bucket.get("PublicAccess") or {}
-        encryption = bucket.get("encryption") or bucket.get("EncryptionAtRest") or {}
-        logging = bucket.get("logging") or bucket.get("AccessLogging") or {}
-
-        # If PublicAccess is a boolean, convert to read/write flags
-        if isinstance(public_access, bool):
-            public_access = {"read": public_access, "write": public_access}
-
-        # If EncryptionAtRest is a boolean, convert to dict
-        if isinstance(encryption, bool):
-            encryption = {"enabled": encryption}
-
-        buckets.append({
-            "bucket_name": bucket.get("bucket_name") or bucket.get("BucketName") or bucket.get("name") or "unnamed-bucket",
-            "environment": bucket.get("environment") or bucket.get("Environment") or "unknown",
-            "public_access": {
-                "read": bool(public_access.get("read")),
-                "write": bool(public_access.get("write")),
-            },
-            "encryption": {
-                "enabled": bool(encryption.get("enabled")),
-                "algorithm": encryption.get("algorithm") or "none",
-            },
-            "logging": {
-                "enabled": bool(logging.get("enabled")) if isinstance(logging, dict) else bool(logging),
-                "target": logging.get("target") if isinstance(logging, dict) else None,
-            },
-            "data_classification": bucket.get("data_classification") or bucket.get("DataSensitivity") or "unknown",
-            "tags": bucket.get("tags") or bucket.get("Tags") or {},
-        })
+            buckets.append(_normalize_s3_bucket(bucket))
 
     return buckets, errors
 
 
-def parse_security_groups(raw: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
+_DEFAULT_CIDRS = ("0.0.0.0/0",)
+_CIDR_FIELDS = (
+    "cidr", "cidr_blocks", "cidr_ip", "CidrIp", "CidrIpRanges", "CidrIpv6", "ipv6_cidr", "ipv6_cidr_blocks",
+    "IpRanges", "Ipv6Ranges",
+)
+# AWS API shaped lists of {"CidrIp": ...} / {"CidrIpv6": ...} entries.
+_CIDR_RANGE_FIELDS = {"IpRanges": "CidrIp", "Ipv6Ranges": "CidrIpv6"}
+# Security group references a rule accepts traffic from; AWS API shaped
+# UserIdGroupPairs hold {"GroupId": ...} (or "GroupName") entries.
+_GROUP_FIELDS = (
+    "source_groups", "source_group", "source_security_group_id", "SourceSecurityGroupId", "UserIdGroupPairs",
+)
+_CIDR_KEYS = frozenset(_CIDR_FIELDS)
+_SOURCE_KEYS = _CIDR_KEYS | frozenset(_GROUP_FIELDS)
+_OTHER_SOURCE_KEYS = _SOURCE_KEYS - {"cidr"}
+_SOURCE_KEY_ORDER = {key: i for i, key in enumerate(_CIDR_FIELDS + _GROUP_FIELDS)}
+_NO_SOURCES: Tuple[str, ...] = ()
+
+
+# Single-CIDR tuples are shared; a scan repeats a few thousand CIDRs across
+# millions of rules, and one container per rule noticeably slows the garbage
+# collector. The cache is dropped when it reaches this size.
+CIDR_TUPLE_CACHE_SIZE = 65536
+_CIDR_TUPLES: Dict[str, Tuple[str, ...]] = {}
+
+
+def _cidr_tuple(cidr: str) -> Tuple[str, ...]:
+    single = _CIDR_TUPLES.get(cidr)
+    if single is None:
+        if len(_CIDR_TUPLES) >= CIDR_TUPLE_CACHE_SIZE:
+            _CIDR_TUPLES.clear()
+        single = _CIDR_TUPLES[cidr] = (cidr,)
+    return single
+
+
+def _is_group_reference(value: str) -> bool:
+    return value.startswith("sg-")
+
+
+def _rule_sources(rule: Dict[str, Any]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    # (CIDRs, referenced security groups) of a rule. Group ids written into a
+    # CIDR field (e.g. "cidr": "sg-0abc") count as group references.
+    value = rule.get("cidr")
+    # Fast path for the common shape: a single "cidr" string.
+    if value.__class__ is str and value and not _is_group_reference(value) and _OTHER_SOURCE_KEYS.isdisjoint(rule):
+        single = _CIDR_TUPLES.get(value)
+        return (single if single is not None else _cidr_tuple(value)), _NO_SOURCES
+    present = _SOURCE_KEYS.intersection(rule)
+    if not present:
+        return _NO_SOURCES, _NO_SOURCES
+    values: List[str] = []
+    groups: List[str] = []
+    for key in (present if len(present) == 1 else sorted(present, key=_SOURCE_KEY_ORDER.get)):
+        value = rule[key]
+        if key in _CIDR_RANGE_FIELDS:
+            field = _CIDR_RANGE_FIELDS[key]
+            values.extend(e[field] for e in _safe_list(value) if isinstance(e, dict) and e.get(field))
+        elif key == "UserIdGroupPairs":
+            for pair in _safe_list(value):
+                if isinstance(pair, dict) and (pair.get("GroupId") or pair.get("GroupName")):
+                    groups.append(pair.get("GroupId") or pair.get("GroupName"))
+        elif key in _GROUP_FIELDS:
+            groups.extend(v for v in _safe_list(value) if isinstance(v, str) and v)
+        else:
+            values.extend(v for v in _safe_list(value) if isinstance(v, str) and v)
+    cidrs = [v for v in values if not _is_group_reference(v)]
+    groups.extend(v for v in values if _is_group_reference(v))
+    groups_tuple = tuple(dict.fromkeys(groups)) if groups else _NO_SOURCES
+    if len(cidrs) != 1:
+        return tuple(dict.fromkeys(cidrs)), groups_tuple
+    return _cidr_tuple(cidrs[0]), groups_tuple
+
+
+def _vpc_cidrs(sg: Dict[str, Any]) -> Tuple[str, ...]:
+    # Address ranges of the group's VPC, when the export includes them.
+    values: List[Any] = []
+    for key in ("vpc_cidrs", "vpc_cidr", "VpcCidrBlock", "vpc_cidr_block"):
+        values.extend(_safe_list(sg.get(key)))
+    if not values:
+        return _NO_SOURCES
+    return tuple(dict.fromkeys(v for v in values if isinstance(v, str) and v))
+
+
+def _normalize_security_group(sg: Dict[str, Any]) -> SecurityGroup:
+    # Support various inbound rule field names (e.g., 'rules', 'InboundRules', 'inbound_rules') and
+    # the DescribeSecurityGroups shape ('IpPermissions', 'GroupId', 'GroupName', 'VpcId').
+    rules = sg.get("rules") or sg.get("InboundRules") or sg.get("inbound_rules") or sg.get("IpPermissions") or []
+    if isinstance(rules, dict):
+        rules = [rules]
+
+    normalized_rules = []
+    for rule in rules:
+        if not isinstance(rule, dict):
+            continue
+
+        # Keep every CIDR (IPv4 and IPv6) from the supported field names and
+        # AWS API shaped IpRanges/Ipv6Ranges; "cidr" stays the first of them.
+        # A rule without any source is treated as open to everyone.
+        cidrs, source_groups = _rule_sources(rule)
+        if not cidrs and not source_groups:
+            cidrs = _DEFAULT_CIDRS
+        cidr = cidrs[0] if cidrs else None
+
+        # Normalize ports and direction/protocol from various schemas
+        direction = rule.get("direction") or rule.get("Direction") or "ingress"
+        protocol = rule.get("protocol") or rule.get("IpProtocol") or "tcp"
+        # Port 0 is valid, so take the first field that is present rather than truthy.
+        from_port = rule.get("from_port")
+        if from_port is None:
+            from_port = rule.get("FromPort", rule.get("port"))
+        to_port = rule.get("to_port")
+        if to_port is None:
+            to_port = rule.get("ToPort", rule.get("port"))
+
+        normalized_rules.append(SecurityGroupRule(
+            _word(direction.lower()),
+            _word(str(protocol).lower()),
+            from_port,
+            to_port,
+            cidr,
+            cidrs,
+            source_groups,
+            rule.get("description") or rule.get("Description") or "",
+        ))
+
+    return SecurityGroup(
+        sg.get("group_id") or sg.get("GroupId") or sg.get("id") or "sg-unknown",
+        sg.get("group_name") or sg.get("GroupName") or sg.get("name") or "unnamed-sg",
+        sg.get("vpc_id") or sg.get("VpcId") or "unknown",
+        _vpc_cidrs(sg),
+        _word(sg.get("environment") or sg.get("Environment") or "unknown"),
+        tuple(normalized_rules),
+        sg.get("tags") or sg.get("Tags") or {},
+    )
+
+
+def parse_security_groups(raw: Any) -> Tuple[List[SecurityGroup], List[str]]:
     errors: List[str] = []
-    groups: List[Dict[str, Any]] = []
+    groups: List[SecurityGroup] = []
 
     if raw is None:
         return groups, errors
@@ -160,50 +504,12 @@ def parse_security_groups(raw: Any) -> Tuple[List[Dict[str, Any]], List[str]]:
         errors.append("Security groups must be a list or a dict with 'security_groups'")
         return groups, errors
 
-    for sg in raw_groups:
-        if not isinstance(sg, dict):
-            errors.append("Security group entry is not an object")
-            continue
-
-        # Support various inbound rule field names (e.g., 'rules', 'InboundRules', 'inbound_rules')
-        rules = sg.get("rules") or sg.get("InboundRules") or sg.get("inbound_rules") or []
-        if isinstance(rules, dict):
-            rules = [rules]
-
-        normalized_rules = []
-        for rule in rules:
-            if not isinstance(rule, dict):
+    with gc_paused():
+        for sg in raw_groups:
+            if not isinstance(sg, dict):
+                errors.append("Security group entry is not an object")
                 continue
 
-            # Normalize CIDR that may be in several fields or list forms
-            cidr_raw = rule.get("cidr") or rule.get("cidr_blocks") or rule.get("cidr_ip") or rule.get("CidrIp") or rule.get("CidrIpRanges") or None
-            if isinstance(cidr_raw, (list, tuple)):
-                cidr = cidr_raw[0] if cidr_raw else "0.0.0.0/0"
-            else:
-                cidr = cidr_raw or "0.0.0.0/0"
-
-            # Normalize ports and direction/protocol from various schemas
-            direction = rule.get("direction") or rule.get("Direction") or "ingress"
-            protocol = rule.get("protocol") or rule.get("IpProtocol") or "tcp"
-            from_port = rule.get("from_port") or rule.get("FromPort") or rule.get("port")
-            to_port = rule.get("to_port") or rule.get("ToPort") or rule.get("port")
-
-            normalized_rules.append({
-                "direction": direction.lower(),
-                "protocol": protocol.lower(),
-                "from_port": from_port,
-                "to_port": to_port,
-                "cidr": cidr,
-                "description": rule.get("description") or rule.get("Description") or "",
-            })
-
-        groups.append({
-            "group_id": sg.get("group_id") or sg.get("id") or "sg-unknown",
-            "group_name": sg.get("group_name") or sg.get("name") or "unnamed-sg",
-            "vpc_id": sg.get("vpc_id") or "unknown",
-            "environment": sg.get("environment") or "unknown",
-            "rules": normalized_rules,
-            "tags": sg.get("tags") or {},
-        })
+            groups.append(_normalize_security_group(sg))
 
     return groups, errors
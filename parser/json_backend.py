@@ -0,0 +1,101 @@
+import gc
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+try:  # Optional: several times faster decoding when installed.
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:  # Optional: used when orjson is not installed.
+    import msgspec
+except ImportError:  # pragma: no cover - depends on the environment
+    msgspec = None
+
+# Decoding of whole JSON documents (uploads, the sample data, stored
+# findings). orjson or msgspec is used when installed, falling back to the
+# standard library; SCANNER_JSON_BACKEND ("orjson", "msgspec" or "json")
+# forces one. Documents the fast decoder rejects are decoded again with the
+# standard library, so the accepted input (NaN, integers beyond 64 bits) and
+# the error messages stay those of json.loads.
+JSON_BACKEND = os.environ.get("SCANNER_JSON_BACKEND", "auto")
+BACKENDS = ("orjson", "msgspec", "json")
+
+Decoder = Callable[[Union[bytes, str]], Any]
+
+_DECODERS: Dict[str, Optional[Decoder]] = {
+    "orjson": orjson.loads if orjson is not None else None,
+    "msgspec": msgspec.json.decode if msgspec is not None else None,
+    "json": json.loads,
+}
+_FAST_ERRORS: Tuple[type, ...] = (ValueError,) + ((msgspec.DecodeError,) if msgspec is not None else ())
+# Whether gc_paused() pauses the cyclic collector. The collector is
+# process-wide, so this is off by default: in the dashboard, scan jobs and
+# requests share the process. Single-scan processes (the benchmarks, or any
+# with SCANNER_PAUSE_GC=1) turn it on.
+PAUSE_GC = os.environ.get("SCANNER_PAUSE_GC") == "1"
+
+
+def backend_name() -> str:
+    # The backend loads() uses: JSON_BACKEND if it is available, else the
+    # first installed one.
+    if JSON_BACKEND in _DECODERS:
+        if _DECODERS[JSON_BACKEND] is None:
+            raise ValueError(f"JSON backend {JSON_BACKEND} is not installed")
+        return JSON_BACKEND
+    if JSON_BACKEND != "auto":
+        raise ValueError(f"Unknown JSON backend {JSON_BACKEND}; expected auto or one of {', '.join(BACKENDS)}")
+    return next(name for name in BACKENDS if _DECODERS[name] is not None)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    name = backend_name()
+    if name == "json":
+        return json.loads(data)
+    try:
+        return _DECODERS[name](data)  # type: ignore[misc]
+    except _FAST_ERRORS:
+        return json.loads(data)
+
+
+def load_path(path: str) -> Any:
+    # Reads the file as bytes: the fast decoders take UTF-8 directly, which
+    # skips decoding the whole document to str first.
+    with open(path, "rb") as f:
+        data = f.read()
+    with gc_paused():
+        return loads(data)
+
+
+_PAUSE_LOCK = threading.Lock()
+_pauses = 0
+_reenable = False
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    # Decoding or normalizing a batch allocates millions of containers that
+    # all survive, so the cyclic collector's runs over them find nothing and
+    # take about half of the time. Pause it for a bounded call (never around
+    # a generator that may not be exhausted); it is enabled again once the
+    # last of any nested or concurrent pauses ends, if it was enabled before.
+    # Does nothing unless PAUSE_GC is set.
+    global _pauses, _reenable
+    if not PAUSE_GC:
+        yield
+        return
+    with _PAUSE_LOCK:
+        if _pauses == 0:
+            _reenable = gc.isenabled()
+            gc.disable()
+        _pauses += 1
+    try:
+        yield
+    finally:
+        with _PAUSE_LOCK:
+            _pauses -= 1
+            if _pauses == 0 and _reenable:
+                gc.enable()
@@ -0,0 +1,214 @@
+import csv
+import gzip
+import io
+import json
+import re
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from compliance.catalog import compliance
+from engine.records import Finding
+
+try:  # Optional: Parquet output when pyarrow is installed.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pq = None
+
+# Flat, fixed column set shared by every export format: per-finding columns
+# first, then the columns that only depend on the rule. Compliance mappings
+# are lists in JSON Lines and Parquet and "; "-joined in CSV.
+_FINDING_FIELDS = (
+    "fix_priority",
+    "resource_type",
+    "resource_id",
+    "severity",
+    "risk_category",
+    "risk_score",
+    "impact_score",
+    "likelihood_score",
+)
+_RULE_FIELDS = ("id", "title", "service", "description", "remediation")
+_LIST_FIELDS = ("cis", "owasp", "mitre")
+EXPORT_FIELDS = _FINDING_FIELDS + _RULE_FIELDS + _LIST_FIELDS
+EXPORT_BATCH_ROWS = 5000
+# gzip level 1 is several times faster than the default and the repeated
+# rule text still compresses well.
+GZIP_LEVEL = 1
+_CSV_SPECIAL = re.compile(r'[",\r\n]')
+
+_encode = json.JSONEncoder(separators=(",", ":"), default=str).encode
+_encode_string = json.encoder.encode_basestring
+# JSON object prefix of each per-finding field, e.g. '{"fix_priority":'.
+_JSON_KEYS = tuple(("{" if i == 0 else ",") + _encode_string(name) + ":" for i, name in enumerate(_FINDING_FIELDS))
+_record_values = attrgetter(*_FINDING_FIELDS)
+
+
+def _finding_values(finding: Finding) -> Sequence[Any]:
+    # Per-finding columns: one attribute lookup for Finding records, by key
+    # for plain dicts (e.g. findings read back from the scan store).
+    if type(finding) is Finding:
+        return _record_values(finding)
+    get = finding.get
+    return [get(name) for name in _FINDING_FIELDS]
+
+
+def export_record(finding: Finding) -> Dict[str, Any]:
+    record = {name: finding.get(name) for name in _FINDING_FIELDS + _RULE_FIELDS}
+    record.update(compliance(finding.get("id")))
+    return record
+
+
+class _RuleColumns:
+    # Rule-level columns are the same for every finding of a rule, so their
+    # serialized form is built once per rule id and reused.
+    def __init__(self, render: Callable[[Dict[str, Any]], Any]):
+        self._render = render
+        self._cache: Dict[Any, Any] = {}
+
+    def __call__(self, finding: Finding) -> Any:
+        rule_id = finding.get("id")
+        value = self._cache.get(rule_id)
+        if value is None:
+            columns = {name: finding.get(name) for name in _RULE_FIELDS}
+            columns.update(compliance(rule_id))
+            value = self._cache[rule_id] = self._render(columns)
+        return value
+
+
+def _json_value(value: Any) -> str:
+    # Fast paths for the scalar types findings carry; json.dumps per row is
+    # the dominant export cost otherwise.
+    if type(value) is str:
+        return _encode_string(value)
+    if type(value) is int:
+        return str(value)
+    if value is None:
+        return "null"
+    return _encode(value)
+
+
+def iter_jsonl(findings: Iterable[Finding]) -> Iterator[str]:
+    rule_json = _RuleColumns(lambda columns: "," + _encode(columns)[1:] + "\n")
+    template = "".join(key + "%s" for key in _JSON_KEYS)
+    for finding in findings:
+        yield template % tuple([_json_value(value) for value in _finding_values(finding)]) + rule_json(finding)
+
+
+def _write_lines(f: Any, lines: Iterable[str]) -> None:
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, EXPORT_BATCH_ROWS))
+        if not batch:
+            return
+        f.write("".join(batch))
+
+
+def write_jsonl(findings: Iterable[Finding], path: str) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        _write_lines(f, iter_jsonl(findings))
+    return path
+
+
+def write_jsonl_gz(findings: Iterable[Finding], path: str) -> str:
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=GZIP_LEVEL) as f:
+        _write_lines(f, iter_jsonl(findings))
+    return path
+
+
+def _csv_line(values: List[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def _csv_value(value: Any) -> str:
+    if type(value) is int:
+        return str(value)
+    if value is None:
+        return ""
+    text = str(value)
+    if _CSV_SPECIAL.search(text):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def iter_csv(findings: Iterable[Finding]) -> Iterator[str]:
+    # Same output as csv.writer with the default dialect; the rule columns
+    # are quoted once per rule instead of once per row.
+    rule_csv = _RuleColumns(
+        lambda columns: "," + _csv_line(
+            [columns[name] for name in _RULE_FIELDS] + ["; ".join(columns[name]) for name in _LIST_FIELDS]
+        )
+    )
+    yield _csv_line(list(EXPORT_FIELDS))
+    for finding in findings:
+        yield ",".join([_csv_value(value) for value in _finding_values(finding)]) + rule_csv(finding)
+
+
+def write_csv(findings: Iterable[Finding], path: str) -> str:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        _write_lines(f, iter_csv(findings))
+    return path
+
+
+def _parquet_schema() -> "pa.Schema":
+    strings = pa.list_(pa.string())
+    types = {"fix_priority": pa.int32(), "risk_score": pa.int32(), "impact_score": pa.int32(), "likelihood_score": pa.int32()}
+    return pa.schema([(name, strings if name in _LIST_FIELDS else types.get(name, pa.string())) for name in EXPORT_FIELDS])
+
+
+def write_parquet(findings: Iterable[Finding], path: str) -> str:
+    # Written one row group per EXPORT_BATCH_ROWS findings so memory stays
+    # bounded for large scans.
+    schema = _parquet_schema()
+    records = (export_record(f) for f in findings)
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        while True:
+            batch = list(islice(records, EXPORT_BATCH_ROWS))
+            if not batch:
+                break
+            columns = {name: [r[name] for r in batch] for name in EXPORT_FIELDS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+    return path
+
+
+def columnar_extension() -> str:
+    return ".parquet" if pq is not None else ".jsonl.gz"
+
+
+def write_columnar(findings: Iterable[Finding], path: str) -> str:
+    # Parquet when pyarrow is available, otherwise gzip-compressed JSON Lines.
+    if pq is not None:
+        return write_parquet(findings, path)
+    return write_jsonl_gz(findings, path)
+
+
+EXPORT_FORMATS: Dict[str, Callable[[Iterable[Finding], str], str]] = {
+    "jsonl": write_jsonl,
+    "csv": write_csv,
+    "columnar": write_columnar,
+}
+
+
+def export_extension(fmt: str) -> str:
+    if fmt == "columnar":
+        return columnar_extension()
+    return f".{fmt}"
+
+
+def export_findings(findings: Iterable[Finding], fmt: str, stem: str) -> str:
+    # Writes findings (in fix-priority order) to `stem` plus the format's
+    # extension and returns the path written.
+    writer: Optional[Callable[[Iterable[Finding], str], str]] = EXPORT_FORMATS.get(fmt)
+    if writer is None:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return writer(findings, stem + export_extension(fmt))
+
+
+def parse_formats(values: Iterable[str]) -> List[str]:
+    # Keeps known formats in EXPORT_FORMATS order and drops duplicates.
+    requested = set(values)
+    return [fmt for fmt in EXPORT_FORMATS if fmt in requested]
@@ -1,48 +1,121 @@
 import datetime
-from typing import Any, Dict, List, Tuple
+import hashlib
+import os
+import time
+from itertools import islice
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from compliance.cis_mapping import CIS_MAPPING
-from compliance.mitre_mapping import MITRE_MAPPING
-from compliance.owasp_cloud import OWASP_CLOUD_MAPPING
+from compliance.catalog import compliance_text
+from engine.records import Finding
 
+REPORT_CHUNK_ROWS = 500
+FOLLOW_CHUNK_SIZE = 64 * 1024
+PARTIAL_SUFFIX = ".part"
+# New and resolved findings listed in the drift section; the counts cover all.
+DRIFT_ROWS = 25
 
-def _count_by_category(findings: List[Dict[str, Any]]) -> Dict[str, int]:
+_ROW_FIELDS = (
+    "fix_priority", "id", "title", "resource_type", "resource_id", "risk_category", "risk_score", "description",
+    "remediation",
+)
+# Finding records are read through their attributes, plain dicts by key.
+_record_row = attrgetter(*_ROW_FIELDS)
+_dict_row = itemgetter(*_ROW_FIELDS)
+
+
+def _count_by_category(findings: Iterable[Finding]) -> Dict[str, int]:
     counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
     for f in findings:
-        counts[f.get("risk_category", "Low")] += 1
+        counts[f.risk_category if type(f) is Finding else f.get("risk_category", "Low")] += 1
     return counts
 
 
-def _render_findings(findings: List[Dict[str, Any]]) -> str:
+def _render_row(f: Finding) -> str:
+    priority, rule_id, title, resource_type, resource_id, category, score, description, remediation = (
+        _record_row(f) if type(f) is Finding else _dict_row(f)
+    )
+    cis, owasp, mitre = compliance_text(rule_id)
+    return (
+        f"<tr>"
+        f"<td>{priority}</td>"
+        f"<td>{rule_id}</td>"
+        f"<td>{title}</td>"
+        f"<td>{resource_type}::{resource_id}</td>"
+        f"<td>{category} ({score})</td>"
+        f"<td>{description}</td>"
+        f"<td>{remediation}</td>"
+        f"<td>{cis}</td>"
+        f"<td>{owasp}</td>"
+        f"<td>{mitre}</td>"
+        f"</tr>"
+    )
+
+
+def _render_drift_rows(change: str, findings: Iterable[Finding]) -> List[str]:
     rows = []
-    for f in findings:
-        cis = ", ".join(CIS_MAPPING.get(f["id"], []))
-        owasp = ", ".join(OWASP_CLOUD_MAPPING.get(f["id"], []))
-        mitre = ", ".join(MITRE_MAPPING.get(f["id"], []))
+    for f in islice(findings, DRIFT_ROWS):
+        priority, rule_id, title, resource_type, resource_id, category, score, _, _ = (
+            _record_row(f) if type(f) is Finding else _dict_row(f)
+        )
         rows.append(
-            f"<tr>"
-            f"<td>{f['fix_priority']}</td>"
-            f"<td>{f['id']}</td>"
-            f"<td>{f['title']}</td>"
-            f"<td>{f['resource_type']}::{f['resource_id']}</td>"
-            f"<td>{f['risk_category']} ({f['risk_score']})</td>"
-            f"<td>{f['description']}</td>"
-            f"<td>{f['remediation']}</td>"
-            f"<td>{cis}</td>"
-            f"<td>{owasp}</td>"
-            f"<td>{mitre}</td>"
-            f"</tr>"
+            f"<tr><td>{change}</td><td>{rule_id}</td><td>{title}</td>"
+            f"<td>{resource_type}::{resource_id}</td><td>{category} ({score})</td></tr>"
         )
-    return "\n".join(rows)
+    return rows
 
 
-def generate_report(findings: List[Dict[str, Any]], overall_posture: Tuple[str, int]) -> str:
-    posture, score = overall_posture
-    counts = _count_by_category(findings)
-    date_str = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+def _render_drift(drift: Optional[Dict[str, Any]]) -> str:
+    # "Changes Since Previous Scan": counts from scan_diff.drift_summary() and
+    # the first DRIFT_ROWS of the optional new_findings / resolved_findings.
+    if not drift:
+        return ""
+    counts = drift["counts"]
+    new = drift["new"]["by_category"]
+    resolved = drift["resolved"]["by_category"]
+    rows = _render_drift_rows("New", drift.get("new_findings", ())) + _render_drift_rows(
+        "Resolved", drift.get("resolved_findings", ())
+    )
+    table = ""
+    if rows:
+        body = "\n".join(rows)
+        table = f"""
+            <table>
+                <thead>
+                    <tr><th>Change</th><th>ID</th><th>Title</th><th>Resource</th><th>Risk</th></tr>
+                </thead>
+                <tbody>
+{body}
+                </tbody>
+            </table>"""
+    return f"""
+        <section class="section">
+            <h2>Changes Since Previous Scan</h2>
+            <div class="grid">
+                <div class="card">
+                    <h3>New Findings</h3>
+                    <div class="pill">{counts['new']}</div>
+                    <p class="muted">Critical: {new.get('Critical', 0)}<br/>High: {new.get('High', 0)}<br/>Medium: {new.get('Medium', 0)}<br/>Low: {new.get('Low', 0)}</p>
+                </div>
+                <div class="card">
+                    <h3>Resolved Findings</h3>
+                    <div class="pill">{counts['resolved']}</div>
+                    <p class="muted">Critical: {resolved.get('Critical', 0)}<br/>High: {resolved.get('High', 0)}<br/>Medium: {resolved.get('Medium', 0)}<br/>Low: {resolved.get('Low', 0)}</p>
+                </div>
+                <div class="card">
+                    <h3>Persisting Findings</h3>
+                    <div class="pill">{counts['unchanged']}</div>
+                    <p class="muted">Compared with the scan of {drift.get('base_timestamp') or drift.get('base_scan')}.</p>
+                </div>
+            </div>{table}
+        </section>
+"""
 
-    findings_html = _render_findings(findings) if findings else ""
 
+def _render_header(
+    overall_posture: Tuple[str, int], counts: Dict[str, int], drift: Optional[Dict[str, Any]], date_str: str
+) -> str:
+    posture, score = overall_posture
     return f"""
     <!DOCTYPE html>
     <html lang='en'>
@@ -151,7 +224,7 @@ def generate_report(findings: List[Dict[str, Any]], overall_posture: Tuple[str,
                 <p class="muted">Critical: {counts['Critical']}<br/>High: {counts['High']}<br/>Medium: {counts['Medium']}<br/>Low: {counts['Low']}</p>
             </div>
         </section>
-
+{_render_drift(drift)}
         <section class="section">
             <h2>Detailed Findings</h2>
             <table>
@@ -170,7 +243,10 @@ def generate_report(findings: List[Dict[str, Any]], overall_posture: Tuple[str,
                     </tr>
                 </thead>
                 <tbody>
-                    {findings_html}
+                    """
+
+
+_FOOTER = """
                 </tbody>
             </table>
         </section>
@@ -189,3 +265,111 @@ def generate_report(findings: List[Dict[str, Any]], overall_posture: Tuple[str,
     </body>
     </html>
     """
+
+
+def iter_report(
+    findings: Iterable[Finding],
+    overall_posture: Tuple[str, int],
+    counts: Optional[Dict[str, int]] = None,
+    chunk_rows: Optional[int] = None,
+    drift: Optional[Dict[str, Any]] = None,
+    generated_at: Optional[datetime.datetime] = None,
+) -> Iterator[str]:
+    # Yields the report as header, batches of `chunk_rows` table rows and
+    # footer, so only one batch is held in memory. The header shows the
+    # category counts, so pass them when `findings` is a one-shot iterator,
+    # and the changes since a previous scan when `drift` is given.
+    if counts is None:
+        findings = list(findings)
+        counts = _count_by_category(findings)
+    chunk_rows = chunk_rows or REPORT_CHUNK_ROWS
+    generated_at = generated_at or datetime.datetime.utcnow()
+    yield _render_header(overall_posture, counts, drift, generated_at.strftime("%Y-%m-%d %H:%M UTC"))
+    rows = (_render_row(f) for f in findings)
+    separator = ""
+    while True:
+        batch = list(islice(rows, chunk_rows))
+        if not batch:
+            break
+        yield separator + "\n".join(batch)
+        separator = "\n"
+    yield _FOOTER
+
+
+def report_digest(
+    findings: Iterable[Finding],
+    overall_posture: Tuple[str, int],
+    counts: Dict[str, int],
+    drift: Optional[Dict[str, Any]] = None,
+) -> str:
+    # SHA-256 of what iter_report() shows apart from when: the generation time
+    # and the base scan of the drift are left out, so rescans that find the
+    # same things get the same digest. A store keyed by it keeps one report
+    # for them, showing the times of the scan that first produced it.
+    if drift:
+        drift = dict(drift, base_scan=None, base_timestamp=None)
+    hasher = hashlib.sha256(_render_header(overall_posture, counts, drift, "").encode("utf-8"))
+    for f in findings:
+        row = _record_row(f) if type(f) is Finding else _dict_row(f)
+        hasher.update(repr((row, compliance_text(row[1]))).encode("utf-8"))
+    hasher.update(_FOOTER.encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def generate_report(
+    findings: List[Finding], overall_posture: Tuple[str, int], drift: Optional[Dict[str, Any]] = None
+) -> str:
+    return "".join(iter_report(findings, overall_posture, drift=drift))
+
+
+def write_report(
+    findings: Iterable[Finding],
+    overall_posture: Tuple[str, int],
+    path: str,
+    counts: Optional[Dict[str, int]] = None,
+    drift: Optional[Dict[str, Any]] = None,
+) -> int:
+    # Streams the report to `<path>.part` and renames it to `path` once
+    # complete, so `path` never holds half a report. Returns bytes written.
+    part = path + PARTIAL_SUFFIX
+    written = 0
+    try:
+        with open(part, "w", encoding="utf-8") as f:
+            for chunk in iter_report(findings, overall_posture, counts, drift=drift):
+                f.write(chunk)
+                written += len(chunk)
+        os.replace(part, path)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    return written
+
+
+def follow_file(
+    f: Any,
+    finished: Callable[[], bool],
+    chunk_size: int = FOLLOW_CHUNK_SIZE,
+    poll_interval: float = 0.2,
+    stale_after: float = 60.0,
+) -> Iterator[bytes]:
+    # Yields bytes from an open file as a writer appends them, until
+    # finished() reports the writer done (everything left is then read from
+    # the handle) or the file stops growing for `stale_after` seconds.
+    idle = 0.0
+    while True:
+        chunk = f.read(chunk_size)
+        if chunk:
+            idle = 0.0
+            yield chunk
+            continue
+        if finished():
+            rest = f.read()
+            if rest:
+                yield rest
+            return
+        if idle >= stale_after:
+            return
+        time.sleep(poll_interval)
+        idle += poll_interval
+
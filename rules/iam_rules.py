@@ -1,63 +1,165 @@
-from typing import Any, Dict, List
-
-
-def _normalize_actions(action: Any) -> List[str]:
-    if action is None:
-        return []
-    if isinstance(action, str):
-        return [action]
-    if isinstance(action, list):
-        return [a for a in action if isinstance(a, str)]
-    return []
-
-
-def run_iam_rules(policies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    print("IAM RULES: received", len(policies), "policies")
-    findings: List[Dict[str, Any]] = []
-
-    for policy in policies:
-        # Support both raw upload shape and parser-normalized shape
-        policy_name = policy.get("policy_name") or policy.get("PolicyName") or "UnknownPolicy"
-        statements = policy.get("statements")
-        if statements is None:
-            statements = policy.get("PolicyDocument", {}).get("Statement", [])
-
-        if isinstance(statements, dict):
-            statements = [statements]
-
-        for stmt in statements:
-            # Support both normalized keys (lowercase) and raw keys
-            effect = (stmt.get("effect") or stmt.get("Effect") or "").lower()
-            if effect != "allow":
-                continue
-
-            actions = _normalize_actions(stmt.get("actions") or stmt.get("Action"))
-            # normalize actions to lowercase strings for comparison
-            actions_norm = [a.lower() for a in actions]
-
-            resources = stmt.get("resources") or stmt.get("Resource") or []
-            if isinstance(resources, str):
-                resources = [resources]
-
-            resources_norm = [r for r in resources]
-
-            action_wild = ("*" in actions_norm) or any(a.endswith(":*") for a in actions_norm)
-            resource_wild = ("*" in resources_norm)
-
-            if action_wild and resource_wild:
-                findings.append({
-                    "id": "IAM_WILDCARD_ADMIN",
-                    "title": "Over-permissive IAM policy",
-                    "service": "IAM",
-                    "severity": "Critical",
-                    "issue": "Wildcard IAM permissions",
-                    "resource_type": "iam_policy",
-                    "resource_id": policy_name,
-                    "resource": policy_name,
-                    "description": "IAM policy allows all actions on all resources (wildcard '*').",
-                    "explanation": "IAM policy allows all actions on all resources, enabling full account compromise.",
-                    "remediation": "Restrict actions and resources explicitly and follow least-privilege principles.",
-                })
-
-    print("IAM RULES EXECUTED: produced", len(findings))
+from typing import Any, Dict, Iterable, List, Tuple
+
+from engine import instrumentation
+from engine.iam_actions import default_index, statement_actions
+from engine.iam_graph import PermissionGraph
+from engine.records import MAPPINGS, Finding
+from rules.registry import Derived, Rule, evaluate_resources, register_fields, register_rule
+
+
+def _policy_name(policy: Dict[str, Any]) -> str:
+    # Support both raw upload shape and parser-normalized shape
+    return policy.get("policy_name") or policy.get("PolicyName") or "UnknownPolicy"
+
+
+def _statements(policy: Dict[str, Any]) -> List[Dict[str, Any]]:
+    statements = policy.get("statements")
+    if statements is None:
+        statements = policy.get("PolicyDocument", {}).get("Statement", [])
+    if isinstance(statements, MAPPINGS):
+        statements = [statements]
+    return [stmt for stmt in statements if isinstance(stmt, MAPPINGS)]
+
+
+def _is_allow(stmt: Dict[str, Any]) -> bool:
+    # Support both normalized keys (lowercase) and raw keys
+    return (stmt.get("effect") or stmt.get("Effect") or "").lower() == "allow"
+
+
+def _resources(stmt: Dict[str, Any]) -> List[Any]:
+    resources = stmt.get("resources") or stmt.get("Resource") or []
+    if isinstance(resources, str):
+        resources = [resources]
+    return list(resources)
+
+
+def _allow_statements(policy: Dict[str, Any]) -> List[Tuple[List[str], List[Any]]]:
+    # (lowercased action patterns, resources) per Allow statement. Lowercased
+    # patterns come from the action index's interned pattern cache.
+    index = default_index()
+    allowed = []
+    for stmt in _statements(policy):
+        if not _is_allow(stmt):
+            continue
+        actions, _ = statement_actions(stmt)
+        allowed.append(([index.compile(a).text for a in actions], _resources(stmt)))
+    return allowed
+
+
+def _allow_grants(policy: Dict[str, Any]) -> List[Tuple[int, List[Any], Dict[str, Any]]]:
+    # (granted action mask, resources, conditions) per Allow statement, for
+    # rules that query the action index, e.g.
+    #   index.mask(["iam:PassRole"]) & mask
+    index = default_index()
+    grants = []
+    for stmt in _statements(policy):
+        if not _is_allow(stmt):
+            continue
+        actions, not_actions = statement_actions(stmt)
+        mask = index.grants(actions, index.all_mask, not_actions)
+        conditions = stmt.get("conditions") or stmt.get("Condition") or {}
+        grants.append((mask, _resources(stmt), conditions))
+    return grants
+
+
+def _granted_actions(view: Dict[str, Any]) -> int:
+    # Union of the known actions any Allow statement grants, from the
+    # view's allow_grants.
+    mask = 0
+    for statement_mask, _, _ in view["allow_grants"]:
+        mask |= statement_mask
+    return mask
+
+
+register_fields("iam_policy", {
+    "resource_id": _policy_name,
+    "allow_statements": _allow_statements,
+    "allow_grants": _allow_grants,
+    "granted_actions": Derived(_granted_actions, ("allow_grants",)),
+})
+
+
+def _wildcard_admin_statements(view: Dict[str, Any]) -> List[None]:
+    index = default_index()
+    matches = []
+    for actions_norm, resources in view["allow_statements"]:
+        action_wild = any(index.is_service_wildcard(a) for a in actions_norm)
+        resource_wild = ("*" in resources)
+        if action_wild and resource_wild:
+            matches.append(None)
+    return matches
+
+
+register_rule(Rule(
+    id="IAM_WILDCARD_ADMIN",
+    resource_type="iam_policy",
+    fields=("allow_statements",),
+    predicate=_wildcard_admin_statements,
+    title="Over-permissive IAM policy",
+    service="IAM",
+    severity="Critical",
+    issue="Wildcard IAM permissions",
+    description="IAM policy allows all actions on all resources (wildcard '*').",
+    explanation="IAM policy allows all actions on all resources, enabling full account compromise.",
+    remediation="Restrict actions and resources explicitly and follow least-privilege principles.",
+))
+
+
+class _EscalationAnalyzer:
+    # Builds the permission graph from every policy in the scan and yields
+    # one view per principal that can escalate.
+    def __init__(self):
+        self.graph = PermissionGraph()
+
+    def add(self, policy: Dict[str, Any]) -> None:
+        self.graph.set_policy(policy)
+
+    def views(self) -> Iterable[Dict[str, Any]]:
+        for escalation in self.graph.escalations():
+            if escalation.admin:
+                summary = "acting as " + " -> ".join(escalation.path[1:]) + ", which has full IAM access"
+            else:
+                summary = ", ".join(escalation.techniques)
+            yield {
+                "resource_id": escalation.principal,
+                "escalation": escalation,
+                "summary": summary,
+            }
+
+
+def _escalation_evidence(view: Dict[str, Any]) -> Dict[str, Any]:
+    escalation = view["escalation"]
+    return {
+        "principal": escalation.principal,
+        "policies": list(escalation.policies),
+        "techniques": list(escalation.techniques),
+        "reaches_admin": escalation.admin,
+        "via": list(escalation.via),
+        "path": list(escalation.path),
+    }
+
+
+register_rule(Rule(
+    id="IAM_PRIV_ESCALATION",
+    resource_type="iam_policy",
+    fields=(),
+    predicate=lambda view: True,
+    title="IAM privilege escalation path",
+    service="IAM",
+    severity=lambda view: "Critical" if view["escalation"].admin else "High",
+    issue="Privilege escalation",
+    description="A principal can grant itself more permissions or act as a more privileged principal.",
+    explanation="Principal {resource_id} can escalate privileges: {summary}.",
+    remediation=(
+        "Remove IAM write actions and iam:PassRole/sts:AssumeRole on '*' from non-admin principals, "
+        "scope PassRole to specific roles, and add conditions or permission boundaries."
+    ),
+    evidence=_escalation_evidence,
+    analyzer=_EscalationAnalyzer,
+))
+
+
+def run_iam_rules(policies: Iterable[Dict[str, Any]]) -> List[Finding]:
+    findings = evaluate_resources("iam_policy", policies)
+    instrumentation.count("scanner_findings_total", len(findings), resource_type="iam_policy")
     return findings
@@ -1,74 +1,165 @@
-from typing import Any, Dict, List
-
-
-def run_network_rules(security_groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    print("NETWORK RULES: received", len(security_groups), "security groups")
-    findings: List[Dict[str, Any]] = []
-
-    for sg in security_groups:
-        sg_name = sg.get("group_name") or sg.get("GroupName") or "UnknownSG"
-        environment = sg.get("environment") or sg.get("Environment") or "unknown"
-
-        # Accept multiple inbound shapes: parsed 'rules' (with direction) or raw 'InboundRules'
-        inbound_rules = sg.get("InboundRules") or sg.get("Inbound") or sg.get("rules") or []
-
-        for rule in inbound_rules:
-            # If parser uses 'rules' with direction key, skip non-ingress entries
-            if isinstance(rule, dict) and rule.get("direction") and rule.get("direction") != "ingress":
-                continue
-
-            cidr = rule.get("CidrIp") or rule.get("cidr") or rule.get("Cidr")
-            # Some inputs might provide a list or dict of cidr blocks - normalize to string if possible
-            if isinstance(cidr, list):
-                cidr_list = cidr
-            elif isinstance(cidr, str):
-                cidr_list = [cidr]
-            else:
-                cidr_list = []
-
-            # normalize port field
-            port = rule.get("FromPort") or rule.get("from_port") or rule.get("port") or rule.get("From")
-            try:
-                port = int(port) if port is not None else None
-            except Exception:
-                port = None
-
-            # check for public cidr
-            if "0.0.0.0/0" not in cidr_list:
-                continue
-
-            if port == 3389:
-                findings.append({
-                    "id": "NET_PUBLIC_RDP",
-                    "title": "RDP exposed to the internet",
-                    "service": "Network",
-                    "severity": "Critical",
-                    "issue": "Public RDP access",
-                    "resource_type": "security_group",
-                    "resource_id": sg_name,
-                    "resource": sg_name,
-                    "description": "RDP (TCP/3389) is open to 0.0.0.0/0.",
-                    "explanation": f"RDP is publicly accessible in {environment} environment.",
-                    "remediation": "Remove public RDP and use VPN or SSM Session Manager."
-                })
-
-            if port == 22:
-                findings.append({
-                    "id": "NET_PUBLIC_SSH",
-                    "title": "SSH exposed to the internet",
-                    "service": "Network",
-                    "severity": "High",
-                    "issue": "Public SSH access",
-                    "resource_type": "security_group",
-                    "resource_id": sg_name,
-                    "resource": sg_name,
-                    "description": "SSH (TCP/22) is open to 0.0.0.0/0.",
-                    "explanation": f"SSH is publicly accessible in {environment} environment.",
-                    "remediation": "Restrict SSH to trusted IPs or use bastion hosts."
-                })
-
-    print("NETWORK RULES EXECUTED: produced", len(findings))
-    return findings
-# IAM rule helpers were duplicated here previously and have been removed to avoid confusion.
-# Use the canonical implementation in rules/iam_rules.py
+from typing import Any, Callable, Dict, Iterable, List
+
+from engine import instrumentation
+from engine.network_ranges import ALL_PORTS, IngressRule, ingress_rules, sensitive_ports
+from engine.network_reachability import SegmentationIndex
+from engine.records import Finding
+from rules.registry import Rule, evaluate_resources, register_fields, register_rule
+
+# A public inbound rule spanning more ports than this is NET_EXCESSIVE_PORTS.
+EXCESSIVE_PORT_SPAN = 16
+
+
+def _group_name(sg: Dict[str, Any]) -> str:
+    return sg.get("group_name") or sg.get("GroupName") or "UnknownSG"
+
+
+def _environment(sg: Dict[str, Any]) -> str:
+    return sg.get("environment") or sg.get("Environment") or "unknown"
+
+
+def _public_ingress(sg: Dict[str, Any]) -> List[IngressRule]:
+    # Inbound rules that open ports to any internet-routable range.
+    return [rule for rule in ingress_rules(sg, public_only=True) if rule.ports is not None]
+
+
+def _exposing(port: int) -> Callable[[Dict[str, Any]], List[Dict[str, Any]]]:
+    # One match per public inbound rule whose port range includes `port`.
+    def predicate(view: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [{"rule": rule} for rule in view["public_ingress"] if rule.ports[0] <= port <= rule.ports[1]]
+    return predicate
+
+
+def _excessive_ports(view: Dict[str, Any]) -> List[Dict[str, Any]]:
+    span = EXCESSIVE_PORT_SPAN
+    matches = []
+    for rule in view["public_ingress"]:
+        lo, hi = rule.ports
+        if hi - lo + 1 > span:
+            matches.append({"rule": rule, "port_range": f"{lo}-{hi}"})
+    return matches
+
+
+def _exposure_evidence(context: Dict[str, Any]) -> Dict[str, Any]:
+    rule = context["rule"]
+    return {
+        "protocol": rule.protocol,
+        "ports": list(rule.ports),
+        "public_cidrs": list(rule.public),
+        "sensitive_ports": sensitive_ports(rule.ports),
+    }
+
 
+register_fields("security_group", {
+    "resource_id": _group_name,
+    "environment": _environment,
+    "public_ingress": _public_ingress,
+})
+
+
+register_rule(Rule(
+    id="NET_PUBLIC_RDP",
+    resource_type="security_group",
+    fields=("environment", "public_ingress"),
+    predicate=_exposing(3389),
+    title="RDP exposed to the internet",
+    service="Network",
+    severity="Critical",
+    issue="Public RDP access",
+    description="RDP (TCP/3389) is open to an internet-routable range such as 0.0.0.0/0.",
+    explanation="RDP is publicly accessible in {environment} environment.",
+    remediation="Remove public RDP and use VPN or SSM Session Manager.",
+    evidence=_exposure_evidence,
+))
+
+register_rule(Rule(
+    id="NET_PUBLIC_SSH",
+    resource_type="security_group",
+    fields=("environment", "public_ingress"),
+    predicate=_exposing(22),
+    title="SSH exposed to the internet",
+    service="Network",
+    severity="High",
+    issue="Public SSH access",
+    description="SSH (TCP/22) is open to an internet-routable range such as 0.0.0.0/0.",
+    explanation="SSH is publicly accessible in {environment} environment.",
+    remediation="Restrict SSH to trusted IPs or use bastion hosts.",
+    evidence=_exposure_evidence,
+))
+
+register_rule(Rule(
+    id="NET_EXCESSIVE_PORTS",
+    resource_type="security_group",
+    fields=("environment", "public_ingress"),
+    predicate=_excessive_ports,
+    title="Wide port range exposed to the internet",
+    service="Network",
+    severity=lambda context: "Critical" if context["rule"].ports == ALL_PORTS else "High",
+    issue="Excessive public port range",
+    description="An inbound rule opens a wide port range to an internet-routable range.",
+    explanation="Ports {port_range} are publicly accessible in {environment} environment.",
+    remediation="Open only the specific ports the service needs, and restrict sources to known ranges.",
+    evidence=_exposure_evidence,
+))
+
+
+class _SegmentationAnalyzer:
+    # Indexes every security group in the scan and yields one view per
+    # production group that accepts non-production traffic.
+    def __init__(self):
+        self.index = SegmentationIndex()
+
+    def add(self, sg: Dict[str, Any]) -> None:
+        self.index.add(sg)
+
+    def views(self) -> Iterable[Dict[str, Any]]:
+        for violation in self.index.violations():
+            parts = []
+            if violation.group_count:
+                parts.append(f"{violation.group_count} non-production security group(s)")
+            if violation.range_count:
+                parts.append(f"{violation.range_count} non-production VPC range(s)")
+            yield {
+                "resource_id": violation.group_name,
+                "environment": violation.environment,
+                "violation": violation,
+                "sources": " and ".join(parts),
+            }
+
+
+def _segmentation_evidence(view: Dict[str, Any]) -> Dict[str, Any]:
+    violation = view["violation"]
+    return {
+        "group_id": violation.group_id,
+        "vpc_id": violation.vpc_id,
+        "source_groups": [{"group": group, "environment": env} for group, env in violation.groups],
+        "source_ranges": [
+            {"cidr": cidr, "vpc_id": vpc_id, "environments": list(envs)} for cidr, vpc_id, envs in violation.ranges
+        ],
+    }
+
+
+register_rule(Rule(
+    id="NET_PROD_NO_SEGMENT",
+    resource_type="security_group",
+    fields=(),
+    predicate=lambda view: True,
+    title="Production not segmented from non-production",
+    service="Network",
+    severity=lambda view: "High" if view["violation"].group_count else "Medium",
+    issue="Missing production segmentation",
+    description="A production security group accepts traffic from non-production groups or VPC ranges.",
+    explanation="Production group {resource_id} ({environment}) accepts traffic from {sources}.",
+    remediation=(
+        "Allow production ingress only from production groups and ranges; move shared services "
+        "behind dedicated endpoints and keep non-production workloads in separate VPCs."
+    ),
+    evidence=_segmentation_evidence,
+    analyzer=_SegmentationAnalyzer,
+))
+
+
+def run_network_rules(security_groups: Iterable[Dict[str, Any]]) -> List[Finding]:
+    findings = evaluate_resources("security_group", security_groups)
+    instrumentation.count("scanner_findings_total", len(findings), resource_type="security_group")
+    return findings
@@ -0,0 +1,372 @@
+import hashlib
+import time
+from dataclasses import dataclass, fields as dataclass_fields, is_dataclass
+from itertools import islice
+from types import CodeType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from engine.records import Finding, RuleInfo, rule_info
+
+# Rules are declared once with the resource type they apply to, the
+# normalized fields they read and a predicate over those fields. For each
+# resource type the registry compiles a single evaluator that extracts the
+# union of required fields once per resource and then runs every applicable
+# predicate against that view, so adding rules does not add passes over the
+# input or repeat the field alias handling. Findings are compact Finding
+# records that share their rule's interned RuleInfo.
+
+# Bump when a change in rule behavior is not visible in the rule definitions
+# themselves (e.g. a shared constant used by a predicate), so cached findings
+# keyed by ruleset_version() are invalidated.
+RULESET_REVISION = 1
+# Distinct explanation strings kept for reuse; explanations mostly repeat
+# (one per rule and environment), so equal ones are stored once. The cache
+# is cleared when full rather than tracking recency.
+EXPLANATION_CACHE_SIZE = 4096
+# Resources per batch when collecting per-rule timings.
+PROFILE_BATCH = 64
+
+FieldExtractor = Callable[[Dict[str, Any]], Any]
+View = Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class Derived:
+    # A field computed from other fields of the view instead of from the
+    # resource, e.g. a summary of a costlier field. The fields it requires are
+    # extracted first (once) whenever it is needed.
+    compute: Callable[[View], Any]
+    requires: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    resource_type: str
+    fields: Tuple[str, ...]
+    # Returns a falsy value for no match, True for a single finding, or a list
+    # with one entry per match (e.g. per statement); dict entries are merged
+    # into the view when formatting the explanation.
+    predicate: Callable[[View], Any]
+    title: str
+    service: str
+    severity: Union[str, Callable[[View], str]]
+    issue: str
+    description: str
+    explanation: str
+    remediation: str
+    evidence: Optional[Callable[[View], Dict[str, Any]]] = None
+    # Factory for an object with add(resource) and views() -> Iterable[View];
+    # such rules are skipped by the per-resource evaluator.
+    analyzer: Optional[Callable[[], Any]] = None
+
+
+_FIELDS: Dict[str, Dict[str, Union[FieldExtractor, Derived]]] = {}
+_RULES: Dict[str, Rule] = {}
+_INFOS: Dict[str, RuleInfo] = {}
+_COMPILED: Dict[str, Callable[[Dict[str, Any]], List[Finding]]] = {}
+_PLANS: Dict[str, Tuple[
+    List[Tuple[str, FieldExtractor]], List[Tuple[str, Callable[[View], Any]]], List[Tuple[Rule, Callable[[View], Any]]]
+]] = {}
+_VERSION: Dict[str, str] = {}
+_EXPLANATIONS: Dict[str, str] = {}
+
+
+def register_fields(resource_type: str, extractors: Dict[str, Union[FieldExtractor, Derived]]) -> None:
+    # Every resource type must provide a "resource_id" extractor.
+    _FIELDS.setdefault(resource_type, {}).update(extractors)
+    _COMPILED.pop(resource_type, None)
+    _PLANS.pop(resource_type, None)
+    _VERSION.clear()
+
+
+def unregister_fields(resource_type: str, names: Iterable[str]) -> None:
+    extractors = _FIELDS.get(resource_type, {})
+    for name in names:
+        extractors.pop(name, None)
+    _COMPILED.pop(resource_type, None)
+    _PLANS.pop(resource_type, None)
+    _VERSION.clear()
+
+
+def register_rule(rule: Rule) -> Rule:
+    known = _FIELDS.get(rule.resource_type, {})
+    missing = [name for name in rule.fields if name not in known]
+    if missing:
+        raise ValueError(f"Rule {rule.id} reads unknown {rule.resource_type} fields: {', '.join(missing)}")
+    _RULES[rule.id] = rule
+    _INFOS[rule.id] = _rule_info(rule)
+    _COMPILED.pop(rule.resource_type, None)
+    _PLANS.pop(rule.resource_type, None)
+    _VERSION.clear()
+    return rule
+
+
+def unregister_rule(rule_id: str) -> None:
+    rule = _RULES.pop(rule_id, None)
+    _INFOS.pop(rule_id, None)
+    if rule is not None:
+        _COMPILED.pop(rule.resource_type, None)
+        _PLANS.pop(rule.resource_type, None)
+        _VERSION.clear()
+
+
+def get_rule(rule_id: str) -> Optional[Rule]:
+    return _RULES.get(rule_id)
+
+
+def get_rule_info(rule_id: Any) -> Optional[RuleInfo]:
+    # The shared metadata of a registered rule, as carried by its findings.
+    return _INFOS.get(rule_id)
+
+
+def rules_for(resource_type: str) -> List[Rule]:
+    return [r for r in _RULES.values() if r.resource_type == resource_type and r.analyzer is None]
+
+
+def analyzer_rules(resource_type: str) -> List[Rule]:
+    return [r for r in _RULES.values() if r.resource_type == resource_type and r.analyzer is not None]
+
+
+def _value_digest(value: Any, seen: set) -> bytes:
+    # Stable across processes: code objects are reduced to their bytecode,
+    # names and constants (their repr holds a memory address) and objects
+    # without a repr of their own to their type name.
+    if isinstance(value, CodeType):
+        return _code_bytes(value, seen)
+    if isinstance(getattr(value, "__code__", None), CodeType):
+        return _code_digest(value, seen)
+    if isinstance(value, dict):
+        return b"{" + b",".join(_value_digest(item, seen) for item in value.items()) + b"}"
+    if is_dataclass(value) and not isinstance(value, type):
+        fields = tuple(getattr(value, field.name) for field in dataclass_fields(value))
+        return type(value).__qualname__.encode("utf-8") + _value_digest(fields, seen)
+    if isinstance(value, (tuple, list)):
+        return b"(" + b",".join(_value_digest(item, seen) for item in value) + b")"
+    if isinstance(value, (set, frozenset)):
+        return b"{" + b",".join(sorted(_value_digest(item, seen) for item in value)) + b"}"
+    if type(value).__repr__ is object.__repr__:
+        return type(value).__qualname__.encode("utf-8")
+    return repr(value).encode("utf-8")
+
+
+def _code_bytes(code: CodeType, seen: set) -> bytes:
+    return b"|".join((
+        code.co_code,
+        repr(code.co_names).encode("utf-8"),
+        _value_digest(code.co_consts, seen),
+    ))
+
+
+def _code_digest(fn: Any, seen: Optional[set] = None) -> bytes:
+    # Bytecode and constants of `fn` and of the functions and values it
+    # closes over, so _exposing(22) and _exposing(3389) differ.
+    code = getattr(fn, "__code__", None)
+    if not isinstance(code, CodeType):
+        return _value_digest(fn, set())
+    seen = set() if seen is None else seen
+    if id(fn) in seen:
+        return b"<recursive>"
+    seen.add(id(fn))
+    parts = [_code_bytes(code, seen), _value_digest(fn.__defaults__, seen)]
+    for cell in fn.__closure__ or ():
+        try:
+            parts.append(_value_digest(cell.cell_contents, seen))
+        except ValueError:  # empty cell
+            parts.append(b"<empty>")
+    return b"|".join(parts)
+
+
+def ruleset_version() -> str:
+    # Stable identifier of the registered rules and field extractors; changes
+    # whenever a rule is added, removed or its definition or code changes.
+    version = _VERSION.get("current")
+    if version is not None:
+        return version
+    digest = hashlib.sha256(f"revision:{RULESET_REVISION}".encode("utf-8"))
+    for resource_type in sorted(_FIELDS):
+        for name in sorted(_FIELDS[resource_type]):
+            digest.update(f"field:{resource_type}:{name}".encode("utf-8"))
+            digest.update(_code_digest(_FIELDS[resource_type][name]))
+    for rule_id in sorted(_RULES):
+        rule = _RULES[rule_id]
+        digest.update(repr((
+            rule.id, rule.resource_type, rule.fields, rule.title, rule.service, rule.issue,
+            rule.description, rule.explanation, rule.remediation,
+        )).encode("utf-8"))
+        for fn in (rule.predicate, rule.severity, rule.evidence, rule.analyzer):
+            digest.update(_code_digest(fn))
+    version = digest.hexdigest()[:16]
+    _VERSION["current"] = version
+    return version
+
+
+def _rule_info(rule: Rule) -> RuleInfo:
+    return rule_info(
+        rule.id, rule.title, rule.service, rule.issue, rule.resource_type, rule.description, rule.remediation
+    )
+
+
+def _build_finding(rule: Rule, view: View, match: Any) -> Finding:
+    context = dict(view, **match) if isinstance(match, dict) else view
+    severity = rule.severity(context) if callable(rule.severity) else rule.severity
+    info = _INFOS.get(rule.id)
+    if info is None:
+        info = _rule_info(rule)
+    explanation = rule.explanation.format(**context)
+    shared = _EXPLANATIONS.get(explanation)
+    if shared is None:
+        if len(_EXPLANATIONS) >= EXPLANATION_CACHE_SIZE:
+            _EXPLANATIONS.clear()
+        shared = _EXPLANATIONS[explanation] = explanation
+    return Finding(
+        info,
+        severity,
+        view["resource_id"],
+        shared,
+        rule.evidence(context) if rule.evidence is not None else None,
+    )
+
+
+def _plan(resource_type: str):
+    # (field extractors to run, derived fields to compute after them in
+    # dependency order, (rule, predicate) checks) for a resource type.
+    plan = _PLANS.get(resource_type)
+    if plan is not None:
+        return plan
+    rules = rules_for(resource_type)
+    extractors = _FIELDS.get(resource_type, {})
+    needed: List[str] = []
+
+    def need(name: str, chain: Tuple[str, ...] = ()) -> None:
+        if name in needed:
+            return
+        if name in chain or name not in extractors:
+            raise ValueError(f"Cannot resolve {resource_type} field {' -> '.join(chain + (name,))}")
+        extractor = extractors[name]
+        if isinstance(extractor, Derived):
+            for required in extractor.requires:
+                need(required, chain + (name,))
+        needed.append(name)
+
+    need("resource_id")
+    for rule in rules:
+        for name in rule.fields:
+            need(name)
+    plan = (
+        [(name, extractors[name]) for name in needed if not isinstance(extractors[name], Derived)],
+        [(name, extractors[name].compute) for name in needed if isinstance(extractors[name], Derived)],
+        [(rule, rule.predicate) for rule in rules],
+    )
+    _PLANS[resource_type] = plan
+    return plan
+
+
+def compile_rules(resource_type: str) -> Callable[[Dict[str, Any]], List[Finding]]:
+    compiled = _COMPILED.get(resource_type)
+    if compiled is not None:
+        return compiled
+
+    plan, derived, checks = _plan(resource_type)
+
+    def evaluate(resource: Dict[str, Any]) -> List[Finding]:
+        view = {name: extract(resource) for name, extract in plan}
+        for name, compute in derived:
+            view[name] = compute(view)
+        findings: List[Finding] = []
+        for rule, predicate in checks:
+            result = predicate(view)
+            if not result:
+                continue
+            if result is True:
+                findings.append(_build_finding(rule, view, None))
+            else:
+                for match in result:
+                    findings.append(_build_finding(rule, view, match))
+        return findings
+
+    _COMPILED[resource_type] = evaluate
+    return evaluate
+
+
+def evaluate_each_profiled(
+    resource_type: str,
+    resources: Iterable[Dict[str, Any]],
+    stats: Dict[str, List[int]],
+) -> List[List[Finding]]:
+    # Same result as evaluate_each, additionally accumulating per-rule
+    # [resources evaluated, findings produced, nanoseconds] into `stats`.
+    # Each rule runs over a small batch of resources so the clock is read
+    # twice per rule and batch rather than per resource; batches stay small
+    # because holding many views alive makes the garbage collector run more
+    # often. Field extraction is shared by all rules and recorded as
+    # "<type>:fields".
+    plan, derived, checks = _plan(resource_type)
+    clock = time.perf_counter_ns
+    field_stats = stats.setdefault(f"{resource_type}:fields", [0, 0, 0])
+    rule_stats = [(rule, predicate, stats.setdefault(rule.id, [0, 0, 0])) for rule, predicate in checks]
+    grouped: List[List[Finding]] = []
+    it = iter(resources)
+    while True:
+        start = clock()
+        views = [{name: extract(resource) for name, extract in plan} for resource in islice(it, PROFILE_BATCH)]
+        if not views:
+            return grouped
+        for view in views:
+            for name, compute in derived:
+                view[name] = compute(view)
+        field_stats[0] += len(views)
+        field_stats[2] += clock() - start
+        batch: List[List[Finding]] = [[] for _ in views]
+        for rule, predicate, entry in rule_stats:
+            start = clock()
+            produced = 0
+            for findings, view in zip(batch, views):
+                result = predicate(view)
+                if not result:
+                    continue
+                if result is True:
+                    findings.append(_build_finding(rule, view, None))
+                    produced += 1
+                else:
+                    for match in result:
+                        findings.append(_build_finding(rule, view, match))
+                        produced += 1
+            entry[0] += len(views)
+            entry[1] += produced
+            entry[2] += clock() - start
+        grouped.extend(batch)
+
+
+def evaluate_each(resource_type: str, resources: Iterable[Dict[str, Any]]) -> List[List[Finding]]:
+    # Findings grouped per resource, in input order.
+    evaluate = compile_rules(resource_type)
+    return [evaluate(resource) for resource in resources]
+
+
+def evaluate_views(rule: Rule, views: Iterable[View]) -> List[Finding]:
+    # Findings for an analyzer rule from the views its analyzer produced.
+    findings: List[Finding] = []
+    for view in views:
+        result = rule.predicate(view)
+        if not result:
+            continue
+        if result is True:
+            findings.append(_build_finding(rule, view, None))
+        else:
+            for match in result:
+                findings.append(_build_finding(rule, view, match))
+    return findings
+
+
+def evaluate_resources(resource_type: str, resources: Iterable[Dict[str, Any]]) -> List[Finding]:
+    evaluate = compile_rules(resource_type)
+    analyzers = [(rule, rule.analyzer()) for rule in analyzer_rules(resource_type)]
+    findings: List[Finding] = []
+    for resource in resources:
+        findings.extend(evaluate(resource))
+        for _, analyzer in analyzers:
+            analyzer.add(resource)
+    for rule, analyzer in analyzers:
+        findings.extend(evaluate_views(rule, analyzer.views()))
+    return findings
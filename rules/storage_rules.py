@@ -1,63 +1,85 @@
-from typing import Any, Dict, List
-
-
-def run_storage_rules(buckets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    print("S3 RULES: received", len(buckets), "buckets")
-    findings: List[Dict[str, Any]] = []
-
-    for bucket in buckets:
-        # Support both parser-normalized keys and raw uploaded variants
-        name = bucket.get("bucket_name") or bucket.get("BucketName") or bucket.get("name") or "unnamed-bucket"
-
-        # Normalize public access (parser -> public_access dict, uploads -> PublicAccess boolean)
-        public_access = False
-        pa = bucket.get("public_access") or bucket.get("PublicAccess")
-        if isinstance(pa, dict):
-            public_access = bool(pa.get("read") or pa.get("write"))
-        else:
-            public_access = bool(pa)
-
-        # Normalize encryption
-        enc = bucket.get("encryption") or bucket.get("EncryptionAtRest")
-        if isinstance(enc, dict):
-            encrypted = bool(enc.get("enabled"))
-        else:
-            encrypted = bool(enc)
-
-        # Normalize sensitivity/classification
-        classification = bucket.get("data_classification") or bucket.get("DataSensitivity") or bucket.get("data_sensitivity") or "unknown"
-
-        if public_access:
-            findings.append({
-                "id": "S3_PUBLIC_BUCKET",
-                "title": "Public S3 bucket",
-                "service": "Storage",
-                "severity": "Critical" if str(classification).lower() in {"pii","credentials","secrets"} else "Medium",
-                "issue": "Publicly accessible S3 bucket",
-                "resource_type": "s3_bucket",
-                "resource_id": name,
-                "resource": name,
-                "description": "Public access increases the likelihood of data exposure or tampering, especially for sensitive data.",
-                "explanation": f"S3 bucket is public and stores {classification} data.",
-                "evidence": {"public_access": public_access},
-                "remediation": "Block public access and review bucket policies."
-            })
-
-        if not encrypted:
-            findings.append({
-                "id": "S3_NO_ENCRYPTION",
-                "title": "Unencrypted S3 bucket",
-                "service": "Storage",
-                "severity": "Medium",
-                "issue": "S3 bucket encryption disabled",
-                "resource_type": "s3_bucket",
-                "resource_id": name,
-                "resource": name,
-                "description": "Unencrypted buckets increase exposure if data is exfiltrated or copied.",
-                "explanation": "S3 bucket does not have encryption at rest enabled.",
-                "evidence": {"encryption": enc},
-                "remediation": "Enable SSE-S3 or SSE-KMS encryption."
-            })
-
-    print("S3 RULES EXECUTED: produced", len(findings))
+# IAM rule helpers were duplicated here previously and have been removed to avoid confusion.
+# Use the canonical implementation in rules/iam_rules.py
+
+from typing import Any, Dict, Iterable, List
+
+from engine import instrumentation
+from engine.records import Finding
+from rules.registry import Rule, evaluate_resources, register_fields, register_rule
+
+SENSITIVE_CLASSIFICATIONS = {"pii", "credentials", "secrets"}
+
+
+def _bucket_name(bucket: Dict[str, Any]) -> str:
+    # Support both parser-normalized keys and raw uploaded variants
+    return bucket.get("bucket_name") or bucket.get("BucketName") or bucket.get("name") or "unnamed-bucket"
+
+
+def _public_access(bucket: Dict[str, Any]) -> bool:
+    # Normalize public access (parser -> public_access dict, uploads -> PublicAccess boolean)
+    pa = bucket.get("public_access") or bucket.get("PublicAccess")
+    if isinstance(pa, dict):
+        return bool(pa.get("read") or pa.get("write"))
+    return bool(pa)
+
+
+def _encryption(bucket: Dict[str, Any]) -> Any:
+    return bucket.get("encryption") or bucket.get("EncryptionAtRest")
+
+
+def _encrypted(bucket: Dict[str, Any]) -> bool:
+    enc = _encryption(bucket)
+    if isinstance(enc, dict):
+        return bool(enc.get("enabled"))
+    return bool(enc)
+
+
+def _classification(bucket: Dict[str, Any]) -> Any:
+    # Normalize sensitivity/classification
+    return bucket.get("data_classification") or bucket.get("DataSensitivity") or bucket.get("data_sensitivity") or "unknown"
+
+
+register_fields("s3_bucket", {
+    "resource_id": _bucket_name,
+    "public_access": _public_access,
+    "encryption": _encryption,
+    "encrypted": _encrypted,
+    "classification": _classification,
+})
+
+
+register_rule(Rule(
+    id="S3_PUBLIC_BUCKET",
+    resource_type="s3_bucket",
+    fields=("public_access", "classification"),
+    predicate=lambda view: view["public_access"],
+    title="Public S3 bucket",
+    service="Storage",
+    severity=lambda view: "Critical" if str(view["classification"]).lower() in SENSITIVE_CLASSIFICATIONS else "Medium",
+    issue="Publicly accessible S3 bucket",
+    description="Public access increases the likelihood of data exposure or tampering, especially for sensitive data.",
+    explanation="S3 bucket is public and stores {classification} data.",
+    evidence=lambda view: {"public_access": view["public_access"]},
+    remediation="Block public access and review bucket policies.",
+))
+
+register_rule(Rule(
+    id="S3_NO_ENCRYPTION",
+    resource_type="s3_bucket",
+    fields=("encrypted", "encryption"),
+    predicate=lambda view: not view["encrypted"],
+    title="Unencrypted S3 bucket",
+    service="Storage",
+    severity="Medium",
+    issue="S3 bucket encryption disabled",
+    description="Unencrypted buckets increase exposure if data is exfiltrated or copied.",
+    explanation="S3 bucket does not have encryption at rest enabled.",
+    evidence=lambda view: {"encryption": view["encryption"]},
+    remediation="Enable SSE-S3 or SSE-KMS encryption.",
+))
+
+
+def run_storage_rules(buckets: Iterable[Dict[str, Any]]) -> List[Finding]:
+    findings = evaluate_resources("s3_bucket", buckets)
+    instrumentation.count("scanner_findings_total", len(findings), resource_type="s3_bucket")
     return findings
@@ -0,0 +1,343 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+from reports.report_generator import FOLLOW_CHUNK_SIZE, PARTIAL_SUFFIX, follow_file
+
+try:  # Optional: zstd-compressed reports.
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Reports are stored compressed under the SHA-256 of their content, so
+# identical reports share one file. Names (what /report/<name> serves) map to
+# content hashes in SQLite. Files are served in their stored encoding to
+# clients that accept it.
+REPORT_CODEC = os.environ.get("SCANNER_REPORT_CODEC", "gzip")
+CODECS = ("gzip", "zstd")
+EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+# Reports are written once and served many times, so these favour ratio
+# over speed more than the export levels do.
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+SWEEP_INTERVAL = 600.0
+# Partial files this old are left over from a writer that died.
+STALE_PARTIAL_SECONDS = 24 * 3600
+# Longest wait for a writer to record a report it has just filed.
+PUBLISH_WAIT_SECONDS = 1.0
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS objects ("
+    " digest TEXT PRIMARY KEY,"
+    " encoding TEXT NOT NULL,"
+    " size INTEGER NOT NULL,"
+    " raw_size INTEGER NOT NULL,"
+    " created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS reports ("
+    " name TEXT PRIMARY KEY,"
+    " digest TEXT NOT NULL,"
+    " created_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS reports_by_created ON reports (created_at)",
+    "CREATE INDEX IF NOT EXISTS reports_by_digest ON reports (digest)",
+)
+
+
+@dataclass(frozen=True)
+class StoredReport:
+    name: str
+    digest: str
+    encoding: str
+    path: str
+    # Stored (compressed) and original sizes in bytes.
+    size: int
+    raw_size: int
+    created_at: float
+
+
+class _Compressor:
+    # Streaming compressor that flushes after every write, so a reader
+    # following the partial file can decode everything written so far.
+    def __init__(self, codec: str):
+        if codec == "gzip":
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+        else:
+            self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+
+    def write(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(self._flush_mode)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+def decode(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    # Decompresses a stored report for clients that do not accept its encoding.
+    if encoding == "gzip":
+        decoder = zlib.decompressobj(31)
+    else:
+        if zstandard is None:
+            raise ValueError("zstandard is not installed")
+        decoder = zstandard.ZstdDecompressor().decompressobj()
+    for chunk in chunks:
+        data = decoder.decompress(chunk)
+        if data:
+            yield data
+
+
+def read_chunks(path: str, chunk_size: int = FOLLOW_CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class ReportStore:
+    def __init__(self, root: str, codec: Optional[str] = None, max_age_days: float = 0, max_bytes: int = 0):
+        # max_age_days / max_bytes of 0 disable that retention limit; they
+        # are enforced by sweep(), run periodically by start_sweeper().
+        codec = codec or REPORT_CODEC
+        if codec not in CODECS:
+            raise ValueError(f"Unknown report codec {codec}; expected one of {', '.join(CODECS)}")
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("Report codec zstd needs the zstandard package")
+        self.root = root
+        self.codec = codec
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.path = os.path.join(root, "reports.sqlite3")
+        self._partials = os.path.join(root, "tmp")
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        os.makedirs(self._partials, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _object_path(self, digest: str, encoding: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + EXTENSIONS[encoding])
+
+    def partial_path(self, name: str) -> Optional[str]:
+        # None for names that are not a plain file name.
+        if not name or os.path.basename(name) != name or name.startswith("."):
+            return None
+        return os.path.join(self._partials, name + PARTIAL_SUFFIX)
+
+    def write(self, name: str, chunks: Iterable[Union[str, bytes]], digest: Optional[str] = None) -> StoredReport:
+        # Compresses `chunks` into a partial file (flushed per chunk, so it can
+        # be followed), then files it under its content hash, or drops it if
+        # that content is already stored, and points `name` at it. `digest`
+        # replaces the hash of the bytes for content that varies in ways that
+        # should not defeat deduplication (see report_digest()); if it is
+        # already stored, `chunks` is not read at all.
+        partial = self.partial_path(name)
+        if partial is None:
+            raise ValueError(f"Invalid report name {name!r}")
+        if digest is not None:
+            stored = self._link(name, digest)
+            if stored is not None:
+                return stored
+        hasher = hashlib.sha256()
+        compressor = _Compressor(self.codec)
+        raw_size = 0
+        try:
+            with open(partial, "wb") as f:
+                for chunk in chunks:
+                    data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                    if digest is None:
+                        hasher.update(data)
+                    raw_size += len(data)
+                    f.write(compressor.write(data))
+                    f.flush()
+                f.write(compressor.finish())
+            size = os.path.getsize(partial)
+            digest = digest or hasher.hexdigest()
+            now = time.time()
+            with closing(self._connect()) as conn, conn:
+                # Held across the file moves so sweep() cannot delete an
+                # object between the check and the new reference to it.
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT encoding, size FROM objects WHERE digest = ?", (digest,)).fetchone()
+                if row is None:
+                    encoding = self.codec
+                    path = self._object_path(digest, encoding)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(partial, path)
+                    conn.execute("INSERT INTO objects VALUES (?, ?, ?, ?, ?)", (digest, encoding, size, raw_size, now))
+                else:
+                    encoding, size = row
+                    os.remove(partial)
+                conn.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, ?)", (name, digest, now))
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return StoredReport(name, digest, encoding, self._object_path(digest, encoding), size, raw_size, now)
+
+    def _link(self, name: str, digest: str) -> Optional[StoredReport]:
+        # Points `name` at already stored content; None if it is not stored.
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT encoding, size, raw_size FROM objects WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, ?)", (name, digest, now))
+        encoding, size, raw_size = row
+        return StoredReport(name, digest, encoding, self._object_path(digest, encoding), size, raw_size, now)
+
+    def lookup(self, name: str) -> Optional[StoredReport]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT r.digest, o.encoding, o.size, o.raw_size, r.created_at FROM reports r"
+                " JOIN objects o ON o.digest = r.digest WHERE r.name = ?",
+                (name,),
+            ).fetchone()
+        if row is None:
+            return None
+        digest, encoding, size, raw_size, created_at = row
+        return StoredReport(name, digest, encoding, self._object_path(digest, encoding), size, raw_size, created_at)
+
+    def writing(self, name: str) -> bool:
+        partial = self.partial_path(name)
+        return partial is not None and os.path.exists(partial)
+
+    def follow(
+        self, name: str, poll_interval: float = 0.2, stale_after: float = 60.0
+    ) -> Optional[Iterator[bytes]]:
+        # The compressed bytes (in self.codec) of a report that is being
+        # written, as they appear, or None once the partial file is gone; the
+        # finished report is then found by lookup(). The writer moves or
+        # removes the partial file it holds open, which this handle keeps
+        # readable.
+        partial = self.partial_path(name)
+        try:
+            f = open(partial, "rb") if partial else None
+        except FileNotFoundError:
+            f = None
+        if f is None:
+            # The writer moves the file before it commits the name, so wait
+            # briefly until lookup() can see the report (or the write failed).
+            deadline = time.monotonic() + PUBLISH_WAIT_SECONDS
+            while time.monotonic() < deadline and self.lookup(name) is None:
+                time.sleep(min(poll_interval, 0.05))
+            return None
+        return self._follow(f, name, poll_interval, stale_after)
+
+    def _follow(self, f: Any, name: str, poll_interval: float, stale_after: float) -> Iterator[bytes]:
+        with f:
+            yield from follow_file(
+                f, lambda: self.lookup(name) is not None, poll_interval=poll_interval, stale_after=stale_after
+            )
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        # Applies the retention limits: names older than max_age_days are
+        # dropped, then the content with the oldest newest-reference goes until
+        # the stored bytes fit max_bytes, then unreferenced content is
+        # deleted. Returns the number of files removed.
+        now = time.time() if now is None else now
+        removed = 0
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if self.max_age_days > 0:
+                conn.execute("DELETE FROM reports WHERE created_at < ?", (now - self.max_age_days * 86400,))
+            if self.max_bytes > 0:
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+                rows = conn.execute(
+                    "SELECT o.digest, o.size FROM objects o LEFT JOIN reports r ON r.digest = o.digest"
+                    " GROUP BY o.digest ORDER BY COALESCE(MAX(r.created_at), 0), o.created_at"
+                ).fetchall()
+                evicted: List[str] = []
+                for digest, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append(digest)
+                    total -= size
+                conn.executemany("DELETE FROM reports WHERE digest = ?", [(digest,) for digest in evicted])
+            removed += self._remove_orphans(conn)
+        for entry in os.scandir(self._partials):
+            try:
+                if now - entry.stat().st_mtime > STALE_PARTIAL_SECONDS:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def _remove_orphans(self, conn: sqlite3.Connection) -> int:
+        # Deletes the content no name refers to any more; the caller holds the
+        # write lock. Returns the number of files removed.
+        removed = 0
+        orphans = conn.execute(
+            "SELECT digest, encoding FROM objects WHERE digest NOT IN (SELECT digest FROM reports)"
+        ).fetchall()
+        for digest, encoding in orphans:
+            try:
+                os.remove(self._object_path(digest, encoding))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        conn.executemany("DELETE FROM objects WHERE digest = ?", [(digest,) for digest, _ in orphans])
+        return removed
+
+    def delete(self, names: Iterable[str]) -> int:
+        # Drops the given names and any content left unreferenced by them.
+        # Returns the number of files removed.
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("DELETE FROM reports WHERE name = ?", [(name,) for name in names])
+            return self._remove_orphans(conn)
+
+    def start_sweeper(self, interval: float = SWEEP_INTERVAL) -> None:
+        # Sweeps now and then every `interval` seconds on a daemon thread.
+        if self._sweeper is not None:
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, args=(interval,), name="report-sweeper", daemon=True
+        )
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        if self._sweeper is None:
+            return
+        self._stop.set()
+        self._sweeper.join()
+        self._sweeper = None
+
+    def _sweep_loop(self, interval: float) -> None:
+        while True:
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.info("Report sweep removed %d files", removed)
+            except Exception:
+                logger.exception("Report sweep failed")
+            if self._stop.wait(interval):
+                return
+
+    def stats(self) -> Tuple[int, int, int, int]:
+        # (names, stored objects, stored bytes, original bytes)
+        with closing(self._connect()) as conn:
+            names = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+            objects, size, raw_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM objects"
+            ).fetchone()
+        return names, objects, size, raw_size
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from engine.records import json_default
+from parser import json_backend
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Eviction frees space down to this fraction of max_bytes so a full cache does
+# not evict on every write.
+EVICTION_LOW_WATERMARK = 0.9
+_SQLITE_MAX_VARIABLES = 900
+
+
+def resource_fingerprint(resource_type: str, resource: Dict[str, Any], ruleset: str) -> str:
+    # Stable content hash of a normalized resource: key order and whitespace do
+    # not matter, any value change does.
+    payload = json.dumps(resource, sort_keys=True, separators=(",", ":"), default=json_default)
+    digest = hashlib.sha256(f"{ruleset}|{resource_type}|".encode("utf-8"))
+    digest.update(payload.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    # Persistent per-resource findings cache backed by SQLite. Entries are keyed
+    # by resource_fingerprint() and evicted least-recently-used first once the
+    # stored findings exceed max_bytes.
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS findings_cache ("
+                " key TEXT PRIMARY KEY,"
+                " findings TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_used INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS findings_cache_lru ON findings_cache (last_used)")
+            # Running total of findings_cache.size, kept by every write so
+            # eviction checks do not sum the table. Caches created before it
+            # existed are summed once here.
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS findings_cache_meta ("
+                " id INTEGER PRIMARY KEY CHECK (id = 0),"
+                " bytes INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO findings_cache_meta (id, bytes)"
+                " SELECT 0, COALESCE(SUM(size), 0) FROM findings_cache"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[Dict[str, Any]]]:
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        unique = list(dict.fromkeys(keys))
+        now = time.time_ns()
+        with closing(self._connect()) as conn, conn:
+            for start in range(0, len(unique), _SQLITE_MAX_VARIABLES):
+                batch = unique[start:start + _SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, findings FROM findings_cache WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, payload in rows:
+                    found[key] = json_backend.loads(payload)
+            if found:
+                conn.executemany(
+                    "UPDATE findings_cache SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+        with self._lock:
+            hit_count = sum(1 for key in keys if key in found)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        return found
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Sequence[Tuple[str, List[Dict[str, Any]]]]) -> None:
+        if not items:
+            return
+        now = time.time_ns()
+        rows = {}
+        for key, findings in items:
+            payload = json.dumps(findings, separators=(",", ":"), default=json_default)
+            rows[key] = (key, payload, len(payload), now)
+        with closing(self._connect()) as conn, conn:
+            # Taken before reading the sizes being replaced, so the running
+            # total stays exact with concurrent writers.
+            conn.execute("BEGIN IMMEDIATE")
+            replaced = 0
+            keys = list(rows)
+            for start in range(0, len(keys), _SQLITE_MAX_VARIABLES):
+                batch = keys[start:start + _SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(batch))
+                replaced += conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM findings_cache WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+            conn.executemany(
+                "INSERT OR REPLACE INTO findings_cache (key, findings, size, last_used) VALUES (?, ?, ?, ?)",
+                rows.values(),
+            )
+            total = self._add_bytes(conn, sum(row[2] for row in rows.values()) - replaced)
+            if total > self.max_bytes:
+                self._evict(conn, total)
+
+    def put(self, key: str, findings: List[Dict[str, Any]]) -> None:
+        self.put_many([(key, findings)])
+
+    @staticmethod
+    def _add_bytes(conn: sqlite3.Connection, delta: int) -> int:
+        # Adjusts the running total and returns the new one.
+        conn.execute("UPDATE findings_cache_meta SET bytes = bytes + ? WHERE id = 0", (delta,))
+        return conn.execute("SELECT bytes FROM findings_cache_meta WHERE id = 0").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection, total: int) -> None:
+        target = total - int(self.max_bytes * EVICTION_LOW_WATERMARK)
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM findings_cache ORDER BY last_used"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany("DELETE FROM findings_cache WHERE key = ?", victims)
+        self._add_bytes(conn, -freed)
+
+    def clear(self) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM findings_cache")
+            conn.execute("UPDATE findings_cache_meta SET bytes = 0 WHERE id = 0")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM findings_cache").fetchone()[0]
+            size = conn.execute("SELECT bytes FROM findings_cache_meta WHERE id = 0").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
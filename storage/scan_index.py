@@ -0,0 +1,201 @@
+import datetime
+import json
+import os
+import re
+import sqlite3
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# History of completed scans shown on /reports. Entries are appended, one
+# INSERT per scan, so concurrent scans (threads or processes) never overwrite
+# each other's entries; SQLite serializes the writers. Retention is opt-in:
+# entries beyond max_entries or older than max_age_days are pruned as new
+# ones are appended.
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS scan_index ("
+    " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " scan_id TEXT,"
+    # created_at is ISO 8601 UTC so it sorts and range-queries as text.
+    " created_at TEXT NOT NULL,"
+    " timestamp TEXT NOT NULL,"
+    " posture_category TEXT NOT NULL,"
+    " posture_score INTEGER NOT NULL,"
+    " report_name TEXT,"
+    " counts TEXT NOT NULL,"
+    " exports TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS scan_index_by_created ON scan_index (created_at, seq)",
+    "CREATE INDEX IF NOT EXISTS scan_index_by_posture ON scan_index (posture_category, created_at, seq)",
+)
+_COLUMNS = "seq, scan_id, created_at, timestamp, posture_category, posture_score, report_name, counts, exports"
+_LEGACY_SUMMARY = re.compile(r"^(\w+) \(Score (-?\d+)\)$")
+_LEGACY_TIMESTAMP = "%Y-%m-%d %H:%M UTC"
+
+
+class ScanIndex:
+    def __init__(self, path: str, max_entries: int = 0, max_age_days: int = 0, legacy_path: Optional[str] = None):
+        # max_entries / max_age_days of 0 keep every entry. legacy_path is a
+        # scan_index.json written by older versions; its entries are imported
+        # into an empty index once and the file is renamed to *.imported.
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+        if legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _import_legacy(self, legacy_path: str) -> None:
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        with closing(self._connect()) as conn, conn:
+            # The write lock is taken before checking, so only one process
+            # imports the file.
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT COUNT(*) FROM scan_index").fetchone()[0] == 0:
+                # The file lists the newest scan first.
+                for entry in reversed(entries):
+                    match = _LEGACY_SUMMARY.match(entry.get("summary") or "")
+                    try:
+                        created = datetime.datetime.strptime(entry.get("created_at") or "", _LEGACY_TIMESTAMP)
+                    except ValueError:
+                        continue
+                    self._insert(
+                        conn,
+                        None,
+                        created.isoformat(),
+                        entry["created_at"],
+                        (match.group(1), int(match.group(2))) if match else ("Unknown", 0),
+                        entry.get("report_name"),
+                        entry.get("counts") or {},
+                        entry.get("exports") or {},
+                    )
+        os.replace(legacy_path, legacy_path + ".imported")
+
+    @staticmethod
+    def _insert(
+        conn: sqlite3.Connection,
+        scan_id: Optional[str],
+        created_at: str,
+        timestamp: str,
+        posture: Tuple[str, int],
+        report_name: Optional[str],
+        counts: Dict[str, int],
+        exports: Dict[str, str],
+    ) -> int:
+        cursor = conn.execute(
+            "INSERT INTO scan_index (scan_id, created_at, timestamp, posture_category, posture_score, report_name,"
+            " counts, exports) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (scan_id, created_at, timestamp, posture[0], posture[1], report_name, json.dumps(counts),
+             json.dumps(exports)),
+        )
+        return cursor.lastrowid
+
+    def append(
+        self,
+        scan_id: Optional[str],
+        created_at: str,
+        timestamp: str,
+        posture: Tuple[str, int],
+        report_name: Optional[str],
+        counts: Dict[str, int],
+        exports: Dict[str, str],
+    ) -> List[str]:
+        # Returns the scan ids of the entries pruned to make room, so their
+        # stored results can be deleted too.
+        with closing(self._connect()) as conn, conn:
+            self._insert(conn, scan_id, created_at, timestamp, posture, report_name, counts, exports)
+            return self._prune(conn, created_at)
+
+    def _prune(self, conn: sqlite3.Connection, now: str) -> List[str]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if self.max_age_days > 0:
+            cutoff = datetime.datetime.fromisoformat(now) - datetime.timedelta(days=self.max_age_days)
+            clauses.append("created_at < ?")
+            params.append(cutoff.isoformat())
+        if self.max_entries > 0:
+            # Everything below the max_entries-th newest entry.
+            row = conn.execute(
+                "SELECT created_at, seq FROM scan_index ORDER BY created_at DESC, seq DESC LIMIT 1 OFFSET ?",
+                (self.max_entries - 1,),
+            ).fetchone()
+            if row is not None:
+                clauses.append("created_at < ? OR (created_at = ? AND seq < ?)")
+                params.extend((row[0], row[0], row[1]))
+        if not clauses:
+            return []
+        where = " OR ".join(f"({clause})" for clause in clauses)
+        # Entries imported from the legacy index have no scan id.
+        pruned = [
+            scan_id
+            for (scan_id,) in conn.execute(f"SELECT scan_id FROM scan_index WHERE {where}", params)
+            if scan_id is not None
+        ]
+        conn.execute(f"DELETE FROM scan_index WHERE {where}", params)
+        return pruned
+
+    @staticmethod
+    def _entry(row: Tuple[Any, ...]) -> Dict[str, Any]:
+        seq, scan_id, created_at, timestamp, category, score, report_name, counts, exports = row
+        return {
+            "seq": seq,
+            "scan_id": scan_id,
+            "created_at": created_at,
+            "timestamp": timestamp,
+            "posture": (category, score),
+            "summary": f"{category} (Score {score})",
+            "report_name": report_name,
+            "counts": json.loads(counts),
+            "exports": json.loads(exports),
+        }
+
+    def query(
+        self,
+        offset: int,
+        limit: int,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        postures: Optional[Sequence[str]] = None,
+        min_score: Optional[int] = None,
+        max_score: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        # One page of entries, newest first, plus the total match count.
+        # since is inclusive and until exclusive; both are ISO 8601 prefixes
+        # such as "2026-01-31" or "2026-01-31T12:00".
+        clauses: List[str] = []
+        params: List[Any] = []
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if postures is not None:
+            clauses.append(f"posture_category IN ({','.join('?' * len(postures))})")
+            params.extend(postures)
+        if min_score is not None:
+            clauses.append("posture_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append("posture_score <= ?")
+            params.append(max_score)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with closing(self._connect()) as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM scan_index {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM scan_index {where} ORDER BY created_at DESC, seq DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [self._entry(row) for row in rows], total
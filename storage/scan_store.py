@@ -0,0 +1,394 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from engine.records import Finding, RuleInfo, json_default
+from engine.scan_diff import key_hash
+from parser import json_backend
+
+INSERT_BATCH_SIZE = 1000
+# Bound on the positions bound into one "position IN (...)" query, below
+# SQLite's default limit of 999 host parameters.
+POSITION_BATCH_SIZE = 900
+
+# Sort keys accepted by query_findings, mapped to SQL expressions. Every sort
+# falls back to priority position so paging is stable.
+SORT_COLUMNS = {
+    "priority": "position",
+    "risk_score": "risk_score",
+    "risk_category": "risk_category",
+    "rule_id": "rule_id",
+    "resource_type": "resource_type",
+    "resource_id": "resource_id",
+}
+# Rule-level keys of a finding. They are stored once per scan and rule in
+# scan_rules and joined back into the findings read from the store.
+RULE_METADATA_FIELDS = RuleInfo.__slots__[1:]
+_FINDING_COLUMNS = (
+    "scan_id, position, rule_id, resource_type, resource_id, risk_category, risk_score, data, finding_key"
+)
+_SCAN_COLUMNS = (
+    "scan_id, created_at, timestamp, posture_category, posture_score, report_name, finding_count, errors"
+)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS scans ("
+    " scan_id TEXT PRIMARY KEY,"
+    " created_at TEXT NOT NULL,"
+    " timestamp TEXT NOT NULL,"
+    " posture_category TEXT NOT NULL,"
+    " posture_score INTEGER NOT NULL,"
+    " report_name TEXT,"
+    " finding_count INTEGER NOT NULL,"
+    " errors TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS scans_by_created ON scans (created_at)",
+    # position is the finding's 0-based index in fix-priority order.
+    "CREATE TABLE IF NOT EXISTS findings ("
+    " scan_id TEXT NOT NULL,"
+    " position INTEGER NOT NULL,"
+    " rule_id TEXT,"
+    " resource_type TEXT,"
+    " resource_id TEXT,"
+    " risk_category TEXT,"
+    " risk_score INTEGER,"
+    " data TEXT NOT NULL,"
+    # key_hash() of (rule_id, resource_type, resource_id), for scan diffs.
+    " finding_key INTEGER,"
+    " PRIMARY KEY (scan_id, position)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS findings_by_type ON findings (scan_id, resource_type, position)",
+    "CREATE INDEX IF NOT EXISTS findings_by_category ON findings (scan_id, risk_category, position)",
+    "CREATE INDEX IF NOT EXISTS findings_by_rule ON findings (scan_id, rule_id, position)",
+    "CREATE TABLE IF NOT EXISTS scan_rules ("
+    " scan_id TEXT NOT NULL,"
+    " rule_id TEXT NOT NULL,"
+    " data TEXT NOT NULL,"
+    " PRIMARY KEY (scan_id, rule_id)) WITHOUT ROWID",
+    # One row per view, so writers of different views never race on a
+    # shared value.
+    "CREATE TABLE IF NOT EXISTS scan_views ("
+    " scan_id TEXT NOT NULL,"
+    " name TEXT NOT NULL,"
+    " value TEXT NOT NULL,"
+    " PRIMARY KEY (scan_id, name)) WITHOUT ROWID",
+)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=json_default)
+
+
+class _RuleSplitter:
+    # Splits findings into rule metadata, recorded the first time a rule id
+    # is seen, and the compact per-finding remainder. A finding whose
+    # metadata differs from what was recorded for its rule (e.g. overridden
+    # by a caller) is kept whole.
+    def __init__(self):
+        self.rules: Dict[str, Any] = {}
+        self.new: List[Tuple[str, Dict[str, Any]]] = []
+
+    def __call__(self, finding: Dict[str, Any]) -> Dict[str, Any]:
+        rule_id = finding.get("id")
+        if type(finding) is Finding:
+            if rule_id is None:
+                return finding.to_dict()
+            known = self.rules.get(rule_id)
+            if known is None:
+                known = self.rules[rule_id] = finding.rule
+                self.new.append((rule_id, {key: getattr(known, key) for key in RULE_METADATA_FIELDS}))
+            return finding.compact() if known is finding.rule else finding.to_dict()
+        if rule_id is None:
+            return finding
+        metadata = {key: finding.get(key) for key in RULE_METADATA_FIELDS if key in finding}
+        known = self.rules.get(rule_id)
+        if known is None:
+            known = self.rules[rule_id] = metadata
+            self.new.append((rule_id, metadata))
+        if known != metadata:
+            return finding
+        return {key: value for key, value in finding.items() if key not in known and key != "resource"}
+
+
+class ScanStore:
+    # Keeps the findings of every scan in SQLite so any scan can be paged
+    # through without holding its findings in worker memory.
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(scans)")}
+            if "views" in columns:
+                # Views used to share one JSON object per scan; they are moved
+                # to scan_views, leaving the old column empty.
+                conn.executemany(
+                    "INSERT OR IGNORE INTO scan_views VALUES (?, ?, ?)",
+                    [
+                        (scan_id, name, json.dumps(value))
+                        for scan_id, views in conn.execute("SELECT scan_id, views FROM scans WHERE views <> '{}'")
+                        for name, value in json.loads(views).items()
+                    ],
+                )
+                conn.execute("UPDATE scans SET views = '{}' WHERE views <> '{}'")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(findings)")}
+            if "finding_key" not in columns:
+                conn.execute("ALTER TABLE findings ADD COLUMN finding_key INTEGER")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def save_scan(
+        self,
+        scan_id: str,
+        findings: Iterable[Dict[str, Any]],
+        posture: Tuple[str, int],
+        report_name: Optional[str],
+        created_at: str,
+        timestamp: str,
+        errors: List[str],
+    ) -> int:
+        # Findings must be in fix-priority order; they are written in batches so
+        # an iterator is never materialized here. Rule metadata is written once
+        # per rule to scan_rules instead of into every finding row.
+        split = _RuleSplitter()
+        rows = (
+            (
+                scan_id,
+                position,
+                f.get("id"),
+                f.get("resource_type"),
+                f.get("resource_id"),
+                f.get("risk_category"),
+                f.get("risk_score"),
+                _dumps(split(f)),
+                key_hash(f.get("id"), f.get("resource_type"), f.get("resource_id")),
+            )
+            for position, f in enumerate(findings)
+        )
+        count = 0
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM findings WHERE scan_id = ?", (scan_id,))
+            conn.execute("DELETE FROM scan_rules WHERE scan_id = ?", (scan_id,))
+            conn.execute("DELETE FROM scan_views WHERE scan_id = ?", (scan_id,))
+            while True:
+                batch = list(islice(rows, INSERT_BATCH_SIZE))
+                if not batch:
+                    break
+                conn.executemany(f"INSERT INTO findings ({_FINDING_COLUMNS}) VALUES ({', '.join('?' * 9)})", batch)
+                count += len(batch)
+                if split.new:
+                    conn.executemany(
+                        "INSERT INTO scan_rules VALUES (?, ?, ?)",
+                        [(scan_id, rule_id, _dumps(metadata)) for rule_id, metadata in split.new],
+                    )
+                    split.new.clear()
+            conn.execute(
+                f"INSERT OR REPLACE INTO scans ({_SCAN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (scan_id, created_at, timestamp, posture[0], posture[1], report_name, count, json.dumps(errors)),
+            )
+        return count
+
+    @staticmethod
+    def _scan_row(row: Optional[Tuple[Any, ...]]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        scan_id, created_at, timestamp, category, score, report_name, count, errors = row
+        return {
+            "scan_id": scan_id,
+            "created_at": created_at,
+            "timestamp": timestamp,
+            "posture": (category, score),
+            "summary": f"{category} (Score {score})",
+            "report_name": report_name,
+            "finding_count": count,
+            "errors": json.loads(errors),
+        }
+
+    def get_scan(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(f"SELECT {_SCAN_COLUMNS} FROM scans WHERE scan_id = ?", (scan_id,)).fetchone()
+        return self._scan_row(row)
+
+    def latest_scan(self) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(f"SELECT {_SCAN_COLUMNS} FROM scans ORDER BY created_at DESC LIMIT 1").fetchone()
+        return self._scan_row(row)
+
+    def previous_scan(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        # The latest scan created before scan_id, the default base of its diff.
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                f"SELECT {_SCAN_COLUMNS} FROM scans WHERE created_at < "
+                "(SELECT created_at FROM scans WHERE scan_id = ?) ORDER BY created_at DESC LIMIT 1",
+                (scan_id,),
+            ).fetchone()
+        return self._scan_row(row)
+
+    @staticmethod
+    def _rule_metadata(conn: sqlite3.Connection, scan_id: str) -> Dict[str, Dict[str, Any]]:
+        rows = conn.execute("SELECT rule_id, data FROM scan_rules WHERE scan_id = ?", (scan_id,))
+        return {rule_id: json.loads(data) for rule_id, data in rows}
+
+    @staticmethod
+    def _finding(data: str, rules: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        # Values stored with the finding win, so findings kept whole decode
+        # unchanged; scans saved before scan_rules have no metadata to join.
+        finding = json_backend.loads(data)
+        metadata = rules.get(finding.get("id"))
+        if metadata is None:
+            return finding
+        joined = dict(metadata)
+        joined.update(finding)
+        joined.setdefault("resource", finding.get("resource_id"))
+        return joined
+
+    def page_findings(self, scan_id: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rules = self._rule_metadata(conn, scan_id)
+            rows = conn.execute(
+                "SELECT data FROM findings WHERE scan_id = ? ORDER BY position LIMIT ? OFFSET ?",
+                (scan_id, limit, offset),
+            ).fetchall()
+        return [self._finding(data, rules) for (data,) in rows]
+
+    def query_findings(
+        self,
+        scan_id: str,
+        offset: int,
+        limit: int,
+        resource_types: Optional[List[str]] = None,
+        risk_category: Optional[str] = None,
+        rule_id: Optional[str] = None,
+        resource_contains: Optional[str] = None,
+        sort: str = "priority",
+        descending: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        # One page of findings matching the filters, plus the total match count.
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort findings by {sort}")
+        clauses = ["scan_id = ?"]
+        params: List[Any] = [scan_id]
+        if resource_types is not None:
+            clauses.append(f"resource_type IN ({','.join('?' * len(resource_types))})")
+            params.extend(resource_types)
+        if risk_category:
+            clauses.append("risk_category = ?")
+            params.append(risk_category)
+        if rule_id:
+            clauses.append("rule_id = ?")
+            params.append(rule_id)
+        if resource_contains:
+            escaped = resource_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("resource_id LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        where = " AND ".join(clauses)
+        direction = "DESC" if descending else "ASC"
+        order = SORT_COLUMNS[sort]
+        order_by = f"{order} {direction}" if order == "position" else f"{order} {direction}, position ASC"
+        with closing(self._connect()) as conn:
+            rules = self._rule_metadata(conn, scan_id)
+            total = conn.execute(f"SELECT COUNT(*) FROM findings WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT data FROM findings WHERE {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [self._finding(data, rules) for (data,) in rows], total
+
+    def get_view(self, scan_id: str, name: str) -> Optional[Any]:
+        # Views are derived per-scan aggregates (summary, heatmap, ...) computed
+        # once and cached alongside the scan.
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT value FROM scan_views WHERE scan_id = ? AND name = ?", (scan_id, name)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put_view(self, scan_id: str, name: str, value: Any) -> None:
+        # Ignored for scans that are not stored.
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scan_views SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM scans WHERE scan_id = ?)",
+                (scan_id, name, json.dumps(value), scan_id),
+            )
+
+    def iter_findings(self, scan_id: str) -> Iterator[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rules = self._rule_metadata(conn, scan_id)
+            cursor = conn.execute("SELECT data FROM findings WHERE scan_id = ? ORDER BY position", (scan_id,))
+            while True:
+                rows = cursor.fetchmany(INSERT_BATCH_SIZE)
+                if not rows:
+                    return
+                for (data,) in rows:
+                    yield self._finding(data, rules)
+
+    def finding_keys(self, scan_id: str) -> Dict[int, int]:
+        # key_hash -> position of the first finding with that key, read from
+        # the key column alone. Rows saved before the column existed are
+        # hashed here from their rule, resource type and resource id.
+        with closing(self._connect()) as conn:
+            # Descending, so the lowest position of a duplicate key is the
+            # one left in the dict.
+            keys = dict(
+                conn.execute(
+                    "SELECT finding_key, position FROM findings WHERE scan_id = ? ORDER BY position DESC", (scan_id,)
+                )
+            )
+            if None in keys:
+                rows = conn.execute(
+                    "SELECT position, rule_id, resource_type, resource_id FROM findings"
+                    " WHERE scan_id = ? ORDER BY position DESC",
+                    (scan_id,),
+                )
+                keys = {
+                    key_hash(rule_id, resource_type, resource_id): position
+                    for position, rule_id, resource_type, resource_id in rows
+                }
+        return keys
+
+    @staticmethod
+    def _rows_at(
+        conn: sqlite3.Connection, scan_id: str, columns: str, positions: List[int]
+    ) -> Iterator[Tuple[Any, ...]]:
+        for start in range(0, len(positions), POSITION_BATCH_SIZE):
+            batch = positions[start : start + POSITION_BATCH_SIZE]
+            yield from conn.execute(
+                f"SELECT {columns} FROM findings WHERE scan_id = ? AND position IN ({','.join('?' * len(batch))})"
+                " ORDER BY position",
+                [scan_id, *batch],
+            )
+
+    def findings_at(self, scan_id: str, positions: List[int]) -> List[Dict[str, Any]]:
+        # The findings at the given ascending positions, in that order.
+        with closing(self._connect()) as conn:
+            rules = self._rule_metadata(conn, scan_id)
+            return [self._finding(data, rules) for (data,) in self._rows_at(conn, scan_id, "data", positions)]
+
+    def labels_at(self, scan_id: str, positions: List[int]) -> List[Tuple[str, str]]:
+        # (rule_id, risk_category) of the findings at the given positions,
+        # without decoding their data.
+        with closing(self._connect()) as conn:
+            return list(self._rows_at(conn, scan_id, "rule_id, risk_category", positions))
+
+    def count_by(self, scan_id: str, column: str) -> Dict[str, int]:
+        if column not in ("rule_id", "resource_type", "risk_category"):
+            raise ValueError(f"Cannot group findings by {column}")
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {column}, COUNT(*) FROM findings WHERE scan_id = ? GROUP BY {column}", (scan_id,)
+            ).fetchall()
+        return {key: count for key, count in rows}
+
+    def delete_scan(self, scan_id: str) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM findings WHERE scan_id = ?", (scan_id,))
+            conn.execute("DELETE FROM scan_rules WHERE scan_id = ?", (scan_id,))
+            conn.execute("DELETE FROM scan_views WHERE scan_id = ?", (scan_id,))
+            conn.execute("DELETE FROM scans WHERE scan_id = ?", (scan_id,))
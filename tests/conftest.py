@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import engine.rule_engine  # noqa: F401 - registers the rules
+from parser.config_parser import parse_iam_policies, parse_s3_configs, parse_security_groups
+from rules.registry import get_rule_info
+
+# category -> (impact, likelihood, risk score)
+_SCORES = {"Critical": (5, 4, 20), "High": (4, 3, 12), "Medium": (4, 2, 8), "Low": (2, 2, 4)}
+
+
+def _make_findings(count=None, resource_ids=None, rules=("S3_NO_ENCRYPTION",), categories=("High",), prefix="r"):
+    # Scored findings in fix-priority order, as dicts with the registered
+    # metadata of their rules. Finding i is for resource f"{prefix}{i}" (or
+    # resource_ids[i]) and uses rules[i] and categories[i], both cycled.
+    if resource_ids is None:
+        resource_ids = [f"{prefix}{i}" for i in range(count)]
+    findings = []
+    for i, resource_id in enumerate(resource_ids):
+        info = get_rule_info(rules[i % len(rules)])
+        category = categories[i % len(categories)]
+        impact, likelihood, score = _SCORES[category]
+        finding = {key: getattr(info, key) for key in info.__slots__}
+        finding.update(
+            severity=category,
+            resource_id=resource_id,
+            resource=resource_id,
+            risk_category=category,
+            risk_score=score,
+            impact_score=impact,
+            likelihood_score=likelihood,
+            fix_priority=i + 1,
+        )
+        findings.append(finding)
+    return findings
+
+
+def _load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _build_inputs(copies):
+    # Parsed sample resources, repeated `copies` times under distinct names.
+    policies, _ = parse_iam_policies(_load_json('input/iam_policies/iam_policies_test.json'))
+    buckets, _ = parse_s3_configs(_load_json('input/sample/s3_configs/s3_configs_test.json'))
+    groups, _ = parse_security_groups(_load_json('input/sample/security_groups/security_groups_test.json'))
+    return {
+        'iam_policies': [dict(p, policy_name=f"{p['policy_name']}-{i}") for i in range(copies) for p in policies],
+        's3_configs': [dict(b, bucket_name=f"{b['bucket_name']}-{i}") for i in range(copies) for b in buckets],
+        'security_groups': [dict(g, group_name=f"{g['group_name']}-{i}") for i in range(copies) for g in groups],
+    }
+
+
+@pytest.fixture
+def make_findings():
+    return _make_findings
+
+
+@pytest.fixture
+def build_inputs():
+    return _build_inputs
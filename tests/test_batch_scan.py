@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from cli.batch_scan import MANIFEST_NAME, discover_units, main, run_batch
+
+SAMPLE = os.path.join("input", "sample")
+
+
+def _tree(tmp_path, accounts):
+    root = tmp_path / "accounts"
+    for account, regions in accounts.items():
+        for region in regions:
+            shutil.copytree(SAMPLE, root / account / region)
+    return str(root)
+
+
+def test_units_are_discovered_per_account_and_region(tmp_path):
+    root = _tree(tmp_path, {"111111111111": ["us-east-1", "eu-west-1"], "222222222222": ["us-east-1"]})
+    (tmp_path / "accounts" / "333333333333" / "iam_policies").mkdir(parents=True)
+    shutil.copy(os.path.join(SAMPLE, "iam_policies", "iam_policies_test.json"),
+                tmp_path / "accounts" / "333333333333" / "iam_policies" / "p.json")
+
+    units = {unit.unit_id: unit for unit in discover_units(root)}
+    assert sorted(units) == ["111111111111/eu-west-1", "111111111111/us-east-1", "222222222222/us-east-1", "333333333333"]
+    assert units["333333333333"].region == "global"
+    assert [kind for kind, _ in units["111111111111/us-east-1"].files] == ["iam_policies", "s3_configs", "security_groups"]
+
+
+def test_batch_scan_writes_per_account_and_aggregated_results(tmp_path):
+    root = _tree(tmp_path, {"111111111111": ["us-east-1", "eu-west-1"], "222222222222": ["us-east-1"]})
+    out = str(tmp_path / "out")
+    result = run_batch(root, out, workers=2, formats=["jsonl", "csv"])
+
+    assert result["units"] == 3 and result["scanned"] == 3 and not result["failed"]
+    with open(os.path.join(out, "accounts", "111111111111", "us-east-1", "scan.json")) as f:
+        unit = json.load(f)
+    assert unit["resources"] == {"iam_policies": 3, "s3_configs": 3, "security_groups": 3}
+    assert unit["finding_count"] > 0 and unit["outputs"] == {"jsonl": "findings.jsonl", "csv": "findings.csv"}
+    with open(os.path.join(out, "accounts", "111111111111", "us-east-1", "findings.jsonl")) as f:
+        assert sum(1 for _ in f) == unit["finding_count"]
+
+    with open(os.path.join(out, "accounts", "111111111111", "account.json")) as f:
+        account = json.load(f)
+    assert account["units"] == 2 and account["finding_count"] == 2 * unit["finding_count"]
+    assert sorted(account["regions"]) == ["eu-west-1", "us-east-1"]
+    assert result["finding_count"] == 3 * unit["finding_count"]
+    assert result["posture"] == unit["posture"]
+    assert sum(result["counts"].values()) == result["finding_count"]
+
+
+def test_batch_scan_resumes_from_the_manifest(tmp_path, capsys):
+    root = _tree(tmp_path, {"111111111111": ["us-east-1", "eu-west-1"]})
+    out = str(tmp_path / "out")
+    first = run_batch(root, out)
+    # A torn line from an interrupted write is ignored.
+    with open(os.path.join(out, MANIFEST_NAME), "a") as f:
+        f.write('{"unit": "111111')
+
+    again = run_batch(root, out)
+    assert (again["scanned"], again["skipped"]) == (0, 2)
+    assert again["finding_count"] == first["finding_count"]
+
+    changed = os.path.join(root, "111111111111", "eu-west-1", "s3_configs", "s3_configs_test.json")
+    with open(changed) as f:
+        buckets = json.load(f)
+    buckets["Buckets"] = buckets["Buckets"][:1]
+    with open(changed, "w") as f:
+        json.dump(buckets, f)
+    assert main([root, "--output", out, "--workers", "1"]) == 0
+    assert "scanned 1, resumed 1" in capsys.readouterr().out
+
+    assert run_batch(root, out, restart=True)["scanned"] == 2
+
+
+def test_batch_scan_applies_per_account_scoring_profiles(tmp_path):
+    root = _tree(tmp_path, {"111111111111": ["us-east-1"], "222222222222": ["us-east-1"]})
+    profiles = tmp_path / "profiles"
+    profiles.mkdir()
+    # Every finding of account 222222222222 becomes Critical.
+    (profiles / "222222222222.json").write_text(
+        json.dumps({"name": "strict", "thresholds": {"Critical": 1, "High": 1, "Medium": 1}})
+    )
+    out = str(tmp_path / "out")
+    result = run_batch(root, out, scoring_profiles=str(profiles))
+
+    def unit(account):
+        with open(os.path.join(out, "accounts", account, "us-east-1", "scan.json")) as f:
+            return json.load(f)
+
+    default, strict = unit("111111111111"), unit("222222222222")
+    assert (default["scoring_profile"], strict["scoring_profile"]) == ("default", "strict")
+    assert strict["counts"]["Critical"] == strict["finding_count"]
+    assert default["counts"]["Critical"] < default["finding_count"]
+    assert result["scanned"] == 2
+
+    # Changing a profile rescans only the accounts it applies to.
+    (profiles / "222222222222.json").write_text(json.dumps({"name": "strict", "thresholds": {"Critical": 2, "High": 1, "Medium": 1}}))
+    again = run_batch(root, out, scoring_profiles=str(profiles))
+    assert (again["scanned"], again["skipped"]) == (1, 1)
+
+
+def test_batch_scan_keeps_only_the_top_findings_without_exports(tmp_path):
+    root = _tree(tmp_path, {"111111111111": ["us-east-1"]})
+    full = run_batch(root, str(tmp_path / "full"))
+    out = str(tmp_path / "top")
+    assert main([root, "--output", out, "--workers", "1", "--exports", "", "--top", "3"]) == 0
+
+    directory = os.path.join(out, "accounts", "111111111111", "us-east-1")
+    with open(os.path.join(directory, "scan.json")) as f:
+        unit = json.load(f)
+    assert unit["outputs"] == {"top": "top.jsonl"}
+    assert not os.path.exists(os.path.join(directory, "findings.jsonl"))
+    with open(os.path.join(directory, "top.jsonl")) as f:
+        top = [json.loads(line) for line in f]
+    with open(os.path.join(tmp_path, "full", "accounts", "111111111111", "us-east-1", "findings.jsonl")) as f:
+        ordered = [json.loads(line) for line in f]
+    assert top == ordered[:3]
+    with open(os.path.join(out, "summary.json")) as f:
+        summary = json.load(f)
+    assert (summary["posture"], summary["counts"]) == (full["posture"], full["counts"])
+
+
+def test_batch_scan_resumes_in_a_new_process(tmp_path):
+    root = _tree(tmp_path, {"111111111111": ["us-east-1"]})
+    out = str(tmp_path / "out")
+    command = [sys.executable, os.path.join("cli", "batch_scan.py"), root, "--output", out, "--workers", "1"]
+    env = dict(os.environ, PYTHONHASHSEED="random")
+    first = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    assert "scanned 1, resumed 0" in first.stdout
+    again = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    assert "scanned 0, resumed 1" in again.stdout
+    with open(os.path.join(out, MANIFEST_NAME)) as f:
+        assert sum(1 for _ in f) == 1
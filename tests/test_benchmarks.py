@@ -0,0 +1,48 @@
+import io
+import json
+
+from benchmarks.generators import DatasetProfile, generate_dataset, write_dataset
+from benchmarks.run_benchmarks import compare, run_benchmarks
+from parser.config_parser import parse_iam_policies, parse_s3_configs, parse_security_groups
+
+
+def test_written_dataset_matches_generated_and_parses():
+    profile = DatasetProfile(wildcard_ratio=0.5, public_ratio=0.5, open_port_ratio=0.5, seed=7)
+    buffer = io.StringIO()
+    counts = write_dataset(buffer, 100, profile)
+    data = json.loads(buffer.getvalue())
+    assert counts == {"iam_policies": 34, "s3_configs": 33, "security_groups": 33}
+    assert data == generate_dataset(100, profile)
+
+    policies, errors = parse_iam_policies(data["iam_policies"])
+    assert not errors and len(policies) == 34
+    assert parse_s3_configs(data["s3_configs"])[0]
+    assert parse_security_groups(data["security_groups"])[0]
+
+
+def test_ratios_control_misconfiguration_rates():
+    none = generate_dataset(300, DatasetProfile(wildcard_ratio=0, public_ratio=0, open_port_ratio=0))
+    every = generate_dataset(300, DatasetProfile(wildcard_ratio=1, public_ratio=1, open_port_ratio=1))
+    assert not any(p["document"]["Statement"][0]["Action"] == "*" for p in none["iam_policies"])
+    assert all(p["document"]["Statement"][0]["Action"] == "*" for p in every["iam_policies"])
+    assert all(b["public_access"]["read"] for b in every["s3_configs"])
+    assert all(g["rules"][0]["cidr"] == "0.0.0.0/0" for g in every["security_groups"])
+
+
+def test_run_benchmarks_reports_every_stage_and_compares():
+    results = run_benchmarks([60], track_memory=False)
+    stages = [stage["stage"] for stage in results["results"][0]["stages"]]
+    assert stages == [
+        "load_json_file",
+        "load_json_stdlib",
+        "parse_iam_policies",
+        "parse_s3_configs",
+        "parse_security_groups",
+        "run_all_rules",
+        "prioritize",
+        "generate_report",
+    ]
+    assert compare(results, results) == []
+    slower = json.loads(json.dumps(results))
+    slower["results"][0]["stages"][0]["records_per_sec"] /= 2
+    assert compare(results, slower)[0].startswith("load_json_file @ 60")
@@ -0,0 +1,126 @@
+import gc
+import io
+import json
+
+import pytest
+
+from parser import config_parser, json_backend
+from parser.config_parser import (
+    load_json_file,
+    parse_iam_policies,
+    parse_s3_configs,
+    parse_security_groups,
+    stream_iam_policies,
+    stream_s3_configs,
+    stream_security_groups,
+)
+
+
+def test_streaming_matches_batch_parsers():
+    cases = [
+        ('input/iam_policies/iam_policies_test.json', parse_iam_policies, stream_iam_policies),
+        ('input/sample/s3_configs/s3_configs_test.json', parse_s3_configs, stream_s3_configs),
+        ('input/sample/security_groups/security_groups_test.json', parse_security_groups, stream_security_groups),
+    ]
+    for path, parse_fn, stream_fn in cases:
+        raw, _ = load_json_file(path)
+        expected, _ = parse_fn(raw)
+        errors = []
+        assert list(stream_fn(path, errors)) == expected
+        assert errors == []
+
+
+def test_streaming_small_chunks_and_json_lines(monkeypatch):
+    monkeypatch.setattr('parser.config_parser.STREAM_CHUNK_SIZE', 7)
+    policies = [{"PolicyName": f"p{i}", "PolicyDocument": {"Statement": {"Effect": "Allow", "Action": "*", "Resource": "*"}}} for i in range(20)]
+    wrapped = json.dumps({"meta": {"count": 20}, "Policies": policies, "Trailer": 12345})
+    lines = "\n".join(json.dumps(p) for p in policies) + "\n"
+
+    for text in (wrapped, lines):
+        errors = []
+        parsed = list(stream_iam_policies(io.BytesIO(text.encode("utf-8")), errors))
+        assert [p["policy_name"] for p in parsed] == [f"p{i}" for i in range(20)]
+        assert errors == []
+
+
+def test_streaming_reports_invalid_json():
+    errors = []
+    parsed = list(stream_s3_configs(io.StringIO('{"Buckets": [{"BucketName": "a"}, {"BucketName": '), errors))
+    assert [b["bucket_name"] for b in parsed] == ["a"]
+    assert len(errors) == 1 and errors[0].startswith("Invalid JSON")
+
+
+class CountingReader(io.StringIO):
+    def __init__(self, text):
+        super().__init__(text)
+        self.consumed = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.consumed += len(data)
+        return data
+
+
+def test_streaming_stops_at_malformed_input_without_buffering_the_rest(monkeypatch):
+    valid = json.dumps([{"BucketName": f"b{i}"} for i in range(50000)])
+    source = CountingReader('{"Buckets": [{"BucketName": "a"}, {"BucketName": "b",, "x": 1}, ' + valid[1:] + "}")
+    errors = []
+    parsed = list(stream_s3_configs(source, errors))
+    assert [b["bucket_name"] for b in parsed] == ["a"]
+    assert len(errors) == 1 and errors[0].startswith("Invalid JSON")
+    assert source.consumed <= 4 * config_parser.STREAM_CHUNK_SIZE < len(valid)
+
+    # An unterminated record is cut off at MAX_RECORD_SIZE.
+    monkeypatch.setattr(config_parser, "MAX_RECORD_SIZE", 1000)
+    source = CountingReader('[{"BucketName": "' + "x" * 200000)
+    errors = []
+    assert list(stream_s3_configs(source, errors)) == []
+    assert len(errors) == 1 and "exceeds 1000 characters" in errors[0]
+    assert source.consumed < 200000
+
+
+def test_json_backends_decode_like_the_standard_library(tmp_path, monkeypatch):
+    document = '{"a": [1, 2.5, "x", null, true], "big": 123456789012345678901234567890, "nan": NaN}'
+    path = tmp_path / "doc.json"
+    path.write_text(document, encoding="utf-8")
+    expected = json.loads(document)
+    for backend in ("auto", "json"):
+        monkeypatch.setattr("parser.json_backend.JSON_BACKEND", backend)
+        data, errors = load_json_file(str(path))
+        assert errors == [] and data["a"] == expected["a"] and data["big"] == expected["big"]
+
+    path.write_text('{"a": [1, 2', encoding="utf-8")
+    _, errors = load_json_file(str(path))
+    assert len(errors) == 1 and errors[0].startswith("Invalid JSON")
+
+    monkeypatch.setattr("parser.json_backend.JSON_BACKEND", "yaml")
+    with pytest.raises(ValueError):
+        json_backend.backend_name()
+
+
+def test_gc_pause_is_off_unless_enabled():
+    with json_backend.gc_paused():
+        assert gc.isenabled()
+
+
+def test_gc_pause_nests_and_restores_the_collector(monkeypatch):
+    monkeypatch.setattr(json_backend, "PAUSE_GC", True)
+    assert gc.isenabled()
+    with json_backend.gc_paused():
+        with json_backend.gc_paused():
+            assert not gc.isenabled()
+        assert not gc.isenabled()
+    assert gc.isenabled()
+
+
+def test_security_groups_accept_the_describe_security_groups_shape():
+    groups, errors = parse_security_groups({"SecurityGroups": [{
+        "GroupId": "sg-1", "GroupName": "web", "VpcId": "vpc-1", "Environment": "Production",
+        "IpPermissions": [{"IpProtocol": "tcp", "FromPort": 22, "ToPort": 22, "IpRanges": [{"CidrIp": "0.0.0.0/0"}]}],
+    }]})
+    assert errors == []
+    group = groups[0]
+    assert (group["group_id"], group["group_name"], group["vpc_id"], group["environment"]) == (
+        "sg-1", "web", "vpc-1", "Production",
+    )
+    assert group["rules"][0]["cidrs"] == ("0.0.0.0/0",) and group["rules"][0]["from_port"] == 22
@@ -0,0 +1,227 @@
+import datetime
+import gzip
+import importlib
+import io
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from urllib.parse import quote
+
+import pytest
+from werkzeug.http import parse_options_header
+
+from dashboard.jobs import DONE, PENDING, RUNNING, JobQueue, QueueFull
+from reports import report_generator
+from storage import report_store
+
+
+@pytest.fixture(scope="module")
+def dashboard(tmp_path_factory):
+    # A fresh dashboard.app whose stores, cache and exports live in a
+    # temporary directory instead of the checkout.
+    root = tmp_path_factory.mktemp("dashboard")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("SCANNER_DATA_DIR", str(root / "data"))
+        mp.setenv("SCANNER_REPORTS_DIR", str(root / "reports"))
+        mp.setenv("SCANNER_CACHE_PATH", str(root / "cache.sqlite3"))
+        mp.delitem(sys.modules, "dashboard.app", raising=False)
+        yield importlib.import_module("dashboard.app")
+        sys.modules.pop("dashboard.app", None)
+
+
+@pytest.fixture
+def client(dashboard):
+    return dashboard.app.test_client()
+
+
+def wait_for(client, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f"/scan/{job_id}").get_json()
+        if status["state"] in ("done", "failed") or time.monotonic() > deadline:
+            return status
+        time.sleep(0.05)
+
+
+def submit_sample(client):
+    response = client.post("/scan", data={"use_sample": "1"}, headers={"Accept": "application/json"})
+    assert response.status_code == 202
+    return response.get_json()
+
+
+def test_scan_job_runs_to_completion(client):
+    submitted = submit_sample(client)
+    assert submitted["status_url"] == f"/scan/{submitted['job_id']}"
+
+    status = wait_for(client, submitted["job_id"])
+    assert status["state"] == "done" and status["error"] is None
+    assert all(phase["state"] == "done" for phase in status["phases"].values())
+    assert status["finished_at"] is not None
+    assert status["results_url"] == submitted["results_url"]
+    assert client.get(status["results_url"]).status_code == 200
+    assert client.get(f"/api/scans/{submitted['job_id']}/summary").status_code == 200
+
+
+def test_failed_scan_job_reports_its_error(client, dashboard, monkeypatch, caplog):
+    def broken(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(dashboard, "_execute_scan", broken)
+    with caplog.at_level(logging.ERROR, logger="dashboard.jobs"):
+        status = wait_for(client, submit_sample(client)["job_id"])
+
+    assert status["state"] == "failed"
+    assert status["error"] == "RuntimeError: disk full"
+    assert status["results_url"] is None
+    assert any("failed" in record.getMessage() and record.exc_info for record in caplog.records)
+
+
+def test_scans_pruned_from_the_history_are_deleted(client, dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard.SCAN_INDEX, "max_entries", 1)
+    first = submit_sample(client)["job_id"]
+    assert wait_for(client, first)["state"] == "done"
+    first_report = dashboard.SCAN_JOBS.get(first).report_name
+    second = submit_sample(client)["job_id"]
+    assert wait_for(client, second)["state"] == "done"
+
+    assert dashboard.SCAN_STORE.get_scan(first) is None
+    assert dashboard.SCAN_STORE.page_findings(first, 0, 10) == []
+    assert client.get(f"/api/scans/{first}/summary").status_code == 404
+    assert dashboard.REPORT_STORE.lookup(first_report) is None
+    assert dashboard.SCAN_STORE.get_scan(second) is not None
+    assert dashboard.REPORT_STORE.lookup(dashboard.SCAN_JOBS.get(second).report_name) is not None
+
+
+def test_rescans_at_different_times_share_one_stored_report(client, dashboard, monkeypatch):
+    class NextDay(datetime.datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.datetime.utcnow() + datetime.timedelta(days=1)
+
+    # The first scan sets the base, so the next two show the same drift.
+    reports = []
+    for clock in (datetime.datetime, datetime.datetime, NextDay):
+        monkeypatch.setattr(report_generator, "datetime", SimpleNamespace(datetime=clock))
+        job_id = submit_sample(client)["job_id"]
+        assert wait_for(client, job_id)["state"] == "done"
+        reports.append(dashboard.REPORT_STORE.lookup(dashboard.SCAN_JOBS.get(job_id).report_name))
+
+    assert reports[1].name != reports[2].name
+    assert reports[1].digest == reports[2].digest and reports[1].path == reports[2].path
+
+
+def test_queue_refuses_past_its_pending_cap_and_evicts_only_finished_jobs():
+    queue = JobQueue(workers=1, max_jobs=2, max_pending=3)
+    release = threading.Event()
+    finished = queue.submit(lambda job: {})
+    while not finished.finished():
+        time.sleep(0.01)
+    blocked = [queue.submit(lambda job: release.wait(5) and {}) for _ in range(3)]
+    try:
+        while blocked[0].snapshot()["state"] != RUNNING:
+            time.sleep(0.01)
+        with pytest.raises(QueueFull):
+            queue.submit(lambda job: {})
+        # Over max_jobs, but only the finished job could be evicted.
+        assert queue.get(finished.id) is None
+        assert [queue.get(job.id).state for job in blocked] == [RUNNING, PENDING, PENDING]
+    finally:
+        release.set()
+    while not all(job.finished() for job in blocked):
+        time.sleep(0.01)
+    latest = queue.submit(lambda job: {})
+    assert [job.id for job in queue.jobs()] == [blocked[2].id, latest.id]
+    assert blocked[2].state == DONE
+
+
+def test_scan_is_refused_when_the_queue_is_full(client, dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard, "SCAN_JOBS", JobQueue(workers=1, max_pending=0))
+    os.makedirs(dashboard.UPLOAD_DIR, exist_ok=True)
+    spooled = set(os.listdir(dashboard.UPLOAD_DIR))
+    response = client.post(
+        "/scan", data={"s3_file": (io.BytesIO(b"[]"), "s3.json")}, headers={"Accept": "application/json"}
+    )
+    assert response.status_code == 503
+    assert set(os.listdir(dashboard.UPLOAD_DIR)) == spooled
+
+
+def test_unknown_job_is_not_found(client):
+    assert client.get("/scan/nope").status_code == 404
+
+
+REPORT = ["<html><body>", "<p>finding</p>" * 500, "</body></html>"]
+
+
+def test_stored_report_is_served_compressed_with_its_etag(client, dashboard):
+    stored = dashboard.REPORT_STORE.write("served.html", REPORT)
+    response = client.get("/report/served.html", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == f'"{stored.digest}"'
+    assert gzip.decompress(response.data) == "".join(REPORT).encode()
+
+    cached = client.get(
+        "/report/served.html", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{stored.digest}"'}
+    )
+    assert cached.status_code == 304
+
+
+def test_stored_report_is_decompressed_for_clients_without_gzip(client, dashboard):
+    dashboard.REPORT_STORE.write("plain.html", REPORT)
+    response = client.get("/report/plain.html", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.data == "".join(REPORT).encode()
+
+
+def test_report_names_are_quoted_in_content_disposition(client, dashboard):
+    name = "q3 résumé; final.html"
+    dashboard.REPORT_STORE.write(name, REPORT)
+    url = "/report/" + quote(name)
+    passthrough = client.get(url, headers={"Accept-Encoding": "gzip"}).headers["Content-Disposition"]
+    decoded = client.get(url, headers={"Accept-Encoding": "identity"}).headers["Content-Disposition"]
+    assert decoded == passthrough
+    disposition, options = parse_options_header(decoded)
+    assert disposition == "attachment" and options["filename"] == name
+
+
+def test_report_being_written_is_followed_until_it_finishes(client, dashboard):
+    release = threading.Event()
+
+    def chunks():
+        yield REPORT[0]
+        release.wait(5)
+        yield from REPORT[1:]
+
+    writer = threading.Thread(target=dashboard.REPORT_STORE.write, args=("live.html", chunks()))
+    writer.start()
+    while not dashboard.REPORT_STORE.writing("live.html"):
+        time.sleep(0.01)
+    timer = threading.Timer(0.3, release.set)
+    timer.start()
+    try:
+        response = client.get("/report/live.html", headers={"Accept-Encoding": "gzip"})
+        body = response.data
+    finally:
+        release.set()
+        writer.join()
+        timer.cancel()
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "ETag" not in response.headers
+    assert zlib.decompress(body, 31) == "".join(REPORT).encode()
+
+
+def test_report_whose_writer_vanished_is_looked_up_or_not_found(client, dashboard, monkeypatch):
+    # writing() saw the partial file, but it is gone by the time it is opened.
+    monkeypatch.setattr(dashboard.REPORT_STORE, "writing", lambda name: True)
+    monkeypatch.setattr(report_store, "PUBLISH_WAIT_SECONDS", 0.1)
+    dashboard.REPORT_STORE.write("done.html", REPORT)
+    response = client.get("/report/done.html", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200 and "ETag" in response.headers
+    assert client.get("/report/failed.html").status_code == 404
@@ -0,0 +1,44 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from reports import exporters
+from reports.exporters import EXPORT_FIELDS, export_findings, parse_formats
+
+SSH = {"rules": ("NET_PUBLIC_SSH",), "prefix": "sg-"}
+
+
+def test_jsonl_export_attaches_compliance_mappings(tmp_path, make_findings):
+    path = export_findings(iter(make_findings(3, **SSH)), "jsonl", str(tmp_path / "scan"))
+    assert path.endswith("scan.jsonl")
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["resource_id"] for r in records] == ["sg-0", "sg-1", "sg-2"]
+    assert list(records[0]) == list(EXPORT_FIELDS)
+    assert records[0]["cis"][0].startswith("CIS AWS Foundations Benchmark 4.1")
+    assert records[0]["mitre"]
+
+
+def test_csv_export_joins_list_columns(tmp_path, make_findings):
+    path = export_findings(make_findings(2, **SSH), "csv", str(tmp_path / "scan"))
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 2
+    assert rows[1]["fix_priority"] == "2"
+    assert "CIS AWS Foundations Benchmark 4.1" in rows[0]["cis"]
+
+
+def test_columnar_export_falls_back_to_gzip_jsonl(tmp_path, monkeypatch, make_findings):
+    monkeypatch.setattr(exporters, "pq", None)
+    path = export_findings(make_findings(1000, **SSH), "columnar", str(tmp_path / "scan"))
+    assert path.endswith(".jsonl.gz")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert sum(1 for _ in f) == 1000
+
+
+def test_unknown_formats_are_rejected(tmp_path):
+    assert parse_formats(["csv", "xml", "jsonl", "csv"]) == ["jsonl", "csv"]
+    with pytest.raises(ValueError):
+        export_findings([], "xml", str(tmp_path / "scan"))
@@ -0,0 +1,60 @@
+from engine.iam_actions import ALL, GLOB, LITERAL, PREFIX, SERVICE, ActionIndex, default_index
+from parser.config_parser import parse_iam_policies
+from rules import iam_rules
+from rules.registry import compile_rules
+
+CATALOG = {
+    "s3": ("GetObject", "GetObjectAcl", "GetBucketPolicy", "PutObject", "ListBucket"),
+    "iam": ("PassRole", "CreateUser", "GetRole"),
+    "s3control": ("GetJobTagging",),
+}
+
+
+def test_patterns_expand_with_wildcard_semantics():
+    index = ActionIndex(CATALOG)
+    assert index.compile("*").kind == ALL
+    assert sorted(index.actions(index.expand(["s3:*"]))) == sorted(f"s3:{a}" for a in CATALOG["s3"])
+    assert index.compile("S3:Get*").kind == PREFIX
+    assert index.actions(index.expand(["s3:Get*"])) == ["s3:GetBucketPolicy", "s3:GetObject", "s3:GetObjectAcl"]
+    assert index.compile("s3:*Object").kind == GLOB
+    assert index.actions(index.expand(["s3:*Object"])) == ["s3:GetObject", "s3:PutObject"]
+    assert index.actions(index.expand(["*:Get*"])) == [
+        "iam:GetRole", "s3:GetBucketPolicy", "s3:GetObject", "s3:GetObjectAcl", "s3control:GetJobTagging",
+    ]
+    assert index.compile("iam:passrole").kind == LITERAL
+    assert index.compile("iam:*").kind == SERVICE
+
+
+def test_grants_queries_sensitive_sets_including_not_action():
+    index = ActionIndex(CATALOG)
+    sensitive = index.mask(["iam:PassRole", "s3:GetObject"])
+    assert index.actions(index.grants(["s3:Get*"], sensitive)) == ["s3:GetObject"]
+    assert index.grants(["s3:List*"], sensitive) == 0
+    assert index.actions(index.grants([], sensitive, not_patterns=["s3:*"])) == ["iam:PassRole"]
+
+
+def test_matches_handles_actions_outside_the_catalog():
+    index = ActionIndex(CATALOG)
+    assert index.matches("ec2:Describe*", "ec2:DescribeVpcs")
+    assert index.matches("iam:Pass*", "IAM:PassRole")
+    assert not index.matches("iam:Get*", "iam:PassRole")
+    assert index.matches("custom:DoThing", "custom:dothing")
+
+
+def test_policy_fields_expose_granted_actions():
+    policies, _ = parse_iam_policies({"policies": [{
+        "PolicyName": "ops",
+        "PolicyDocument": {"Statement": [
+            {"Effect": "Allow", "Action": ["iam:Pass*", "s3:GetObject"], "Resource": "*"},
+            {"Effect": "Deny", "Action": "*", "Resource": "*"},
+            {"Effect": "Allow", "NotAction": "s3:*", "Resource": "arn:aws:iam::1:role/x"},
+        ]},
+    }]})
+    index = default_index()
+    evaluate = compile_rules("iam_policy")
+    assert evaluate(policies[0]) == []
+    grants = iam_rules._allow_grants(policies[0])
+    assert len(grants) == 2
+    assert index.actions(grants[0][0]) == ["iam:PassRole", "s3:GetObject"]
+    assert index.grants(["s3:*"], grants[1][0]) == 0
+    assert iam_rules._granted_actions({"allow_grants": grants}) & index.mask(["sts:AssumeRole"])
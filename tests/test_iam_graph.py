@@ -0,0 +1,97 @@
+import random
+
+from engine.iam_graph import PermissionGraph
+from engine.rule_engine import run_all_rules
+from parser.config_parser import parse_iam_policies
+
+
+def _policy(name, attached_to, *statements):
+    return {"PolicyName": name, "AttachedTo": attached_to, "PolicyDocument": {"Statement": list(statements)}}
+
+
+def _allow(actions, resource="*", **extra):
+    return dict({"Effect": "Allow", "Action": actions, "Resource": resource}, **extra)
+
+
+def _escalations(graph):
+    return {e.principal: e for e in graph.escalations()}
+
+
+def _summary(graph):
+    return {e.principal: (e.policies, e.techniques, e.admin) for e in graph.escalations()}
+
+
+def test_pass_role_to_launched_compute_reaches_the_passed_role():
+    policies, _ = parse_iam_policies({"Policies": [
+        _policy("Admin", "AdminRole", _allow("iam:*")),
+        _policy("Deployer", "CiUser", _allow(["iam:PassRole"], "arn:aws:iam::123456789012:role/AdminRole"),
+                _allow(["lambda:CreateFunction", "lambda:InvokeFunction"])),
+        _policy("PassOnly", "OtherUser", _allow("iam:PassRole", "arn:aws:iam::123456789012:role/AdminRole")),
+    ]})
+    findings = [f for f in run_all_rules({"iam_policies": policies}) if f["id"] == "IAM_PRIV_ESCALATION"]
+
+    assert [f["resource_id"] for f in findings] == ["CiUser"]
+    assert findings[0]["severity"] == "Critical"
+    assert findings[0]["evidence"]["path"] == ["CiUser", "AdminRole"]
+    assert "PassRole+Lambda" in findings[0]["evidence"]["techniques"]
+
+
+def test_self_escalation_ignores_conditions_and_honours_deny():
+    graph = PermissionGraph()
+    graph.set_policy(_policy("A", "Alice", _allow("iam:CreatePolicyVersion")))
+    graph.set_policy(_policy("B", "Bob", _allow("iam:AttachUserPolicy", Condition={"Bool": {"aws:MultiFactorAuthPresent": "true"}})))
+    graph.set_policy(_policy("C", "Carol", _allow("iam:Put*"), {"Effect": "Deny", "Action": "iam:*", "Resource": "*"}))
+
+    escalations = _escalations(graph)
+    assert list(escalations) == ["Alice"]
+    assert escalations["Alice"].techniques == ("CreatePolicyVersion",)
+    assert not escalations["Alice"].admin
+
+
+def test_assume_role_chains_are_transitive():
+    graph = PermissionGraph()
+    graph.set_policy(_policy("A", "RoleA", _allow("sts:AssumeRole", "arn:aws:iam::1:role/RoleB")))
+    graph.set_policy(_policy("B", "RoleB", _allow("sts:AssumeRole", "arn:aws:iam::1:role/team/Role*")))
+    graph.set_policy(_policy("C", "RoleC", _allow("*")))
+
+    assert graph.reachable("RoleA") == ["RoleB", "RoleC"]
+    assert graph.effective_actions("RoleA") == graph.index.all_mask
+    assert _escalations(graph)["RoleA"].path == ("RoleA", "RoleB", "RoleC")
+
+
+def test_incremental_updates_match_a_full_rebuild():
+    rng = random.Random(7)
+    size = 300
+    policies = []
+    for i in range(size):
+        statements = [_allow("s3:GetObject")]
+        if rng.random() < 0.5:
+            statements.append(_allow("sts:AssumeRole", f"arn:aws:iam::1:role/r{rng.randrange(size)}"))
+        if rng.random() < 0.05:
+            statements.append(_allow(rng.choice(["iam:*", "iam:PutRolePolicy", "sts:AssumeRole"]), "*"))
+        policies.append(_policy(f"p{i}", f"r{i}", *statements))
+
+    graph = PermissionGraph()
+    for policy in policies:
+        graph.set_policy(policy)
+    list(graph.escalations())
+
+    for _ in range(40):
+        i = rng.randrange(size)
+        if rng.random() < 0.3:
+            graph.remove_policy(f"p{i}")
+            policies[i] = None
+        else:
+            target = rng.choice(["*", f"arn:aws:iam::1:role/r{rng.randrange(size)}", "arn:aws:iam::1:role/new"])
+            policies[i] = _policy(f"p{i}", f"r{i}", _allow(["sts:AssumeRole", "s3:PutObject"], target))
+            graph.set_policy(policies[i])
+        rebuilt = PermissionGraph()
+        for policy in policies:
+            if policy is not None:
+                rebuilt.set_policy(policy)
+        # Principal ids (and so tie-breaks in via/path) depend on insertion order.
+        assert _summary(graph) == _summary(rebuilt)
+        if policies[i] is not None:
+            # Removed principals stay in the incremental graph as empty nodes.
+            known = set(rebuilt.principals())
+            assert set(graph.reachable(f"r{i}")) & known == set(rebuilt.reachable(f"r{i}"))
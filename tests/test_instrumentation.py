@@ -0,0 +1,54 @@
+from engine import instrumentation
+from engine.instrumentation import MetricsRegistry
+from engine.rule_engine import run_all_rules
+from rules.registry import evaluate_each, evaluate_each_profiled
+
+
+def test_profiled_evaluation_matches_plain_and_counts_rules(build_inputs):
+    buckets = build_inputs(150)["s3_configs"]
+    stats = {}
+    assert evaluate_each_profiled("s3_bucket", buckets, stats) == evaluate_each("s3_bucket", buckets)
+    plain = evaluate_each("s3_bucket", buckets)
+    assert stats["s3_bucket:fields"][0] == len(buckets)
+    assert stats["S3_NO_ENCRYPTION"][0] == len(buckets)
+    assert stats["S3_NO_ENCRYPTION"][1] == sum(
+        1 for findings in plain for f in findings if f["id"] == "S3_NO_ENCRYPTION"
+    )
+
+
+def test_scan_profile_collects_stages_and_rules(build_inputs):
+    inputs = build_inputs(30)
+    with instrumentation.profiling() as profile:
+        with instrumentation.stage("rules"):
+            findings = run_all_rules(inputs)
+    data = profile.to_dict()
+    assert "rules" in data["stages"]
+    assert sum(entry["findings"] for entry in data["rules"].values()) == len(findings)
+    assert data["counters"]["scanner_resources_total{resource_type=s3_bucket}"] == len(inputs["s3_configs"])
+
+
+def test_disabled_instrumentation_records_nothing(monkeypatch, build_inputs):
+    monkeypatch.setattr(instrumentation, "REGISTRY", MetricsRegistry())
+    instrumentation.set_enabled(False)
+    try:
+        with instrumentation.profiling() as profile:
+            with instrumentation.stage("rules"):
+                run_all_rules(build_inputs(10))
+            records = [1, 2, 3]
+            assert instrumentation.timed_iter("parse", records) is records
+    finally:
+        instrumentation.set_enabled(True)
+    assert profile.to_dict() == {"stages": {}, "counters": {}, "rules": {}}
+    assert instrumentation.REGISTRY.render() == "\n"
+
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry()
+    registry.inc("scanner_findings_total", 3, (("resource_type", "s3_bucket"),))
+    registry.observe("scanner_stage_seconds", 0.5, (("stage", "rules"),))
+    registry.observe("scanner_stage_seconds", 0.25, (("stage", "rules"),))
+    text = registry.render()
+    assert "# TYPE scanner_findings_total counter" in text
+    assert 'scanner_findings_total{resource_type="s3_bucket"} 3' in text
+    assert 'scanner_stage_seconds_count{stage="rules"} 2' in text
+    assert 'scanner_stage_seconds_sum{stage="rules"} 0.750000' in text
@@ -0,0 +1,77 @@
+from engine.network_ranges import ALL_PORTS, RangeSet, is_public, parse_cidr, port_range, sensitive_ports
+from parser.config_parser import parse_security_groups
+from rules.network_rules import run_network_rules
+
+
+def test_cidrs_are_classified_by_address_range():
+    assert is_public("0.0.0.0/0")
+    assert is_public("0.0.0.0/1")
+    assert is_public("128.0.0.0/1")
+    assert is_public("::/0")
+    assert is_public("2600:1f18::/32")
+    assert not is_public("10.0.0.0/8")
+    assert not is_public("172.16.4.0/24")
+    assert not is_public("fd00::/8")
+    assert not is_public("sg-0123456789abcdef0")
+    assert parse_cidr("::ffff:10.0.0.1") == parse_cidr("10.0.0.1/32")
+
+
+def test_port_ranges_and_range_sets():
+    assert port_range("-1", None, None) == ALL_PORTS
+    assert port_range("tcp", 0, 65535) == ALL_PORTS
+    assert port_range("tcp", 3390, 3380) == (3380, 3390)
+    assert port_range("icmp", -1, -1) is None
+    assert port_range("tcp", None, None) is None
+    assert sensitive_ports((20, 25)) == [20, 21, 22, 23, 25]
+
+    ranges = RangeSet([(10, 20), (21, 30), (50, 60)])
+    assert len(ranges) == 2
+    assert ranges.covers(12, 30)
+    assert not ranges.covers(25, 55)
+    assert ranges.overlaps(40, 50)
+    assert ranges.within(0, 55) == [(10, 30), (50, 55)]
+
+
+def test_parser_keeps_every_cidr_and_port_zero():
+    groups, _ = parse_security_groups({"SecurityGroups": [{
+        "group_name": "aws-shaped",
+        "rules": [{
+            "IpProtocol": "tcp", "FromPort": 0, "ToPort": 65535,
+            "IpRanges": [{"CidrIp": "10.0.0.0/8"}, {"CidrIp": "0.0.0.0/1"}],
+            "Ipv6Ranges": [{"CidrIpv6": "::/0"}],
+        }, {
+            "protocol": "tcp", "from_port": 22, "to_port": 22, "cidr": ["10.1.0.0/16", "10.2.0.0/16"],
+        }],
+    }]})
+    first, second = groups[0]["rules"]
+    assert first["cidrs"] == ("10.0.0.0/8", "0.0.0.0/1", "::/0")
+    assert first["cidr"] == "10.0.0.0/8"
+    assert (first["from_port"], first["to_port"]) == (0, 65535)
+    assert second["cidrs"] == ("10.1.0.0/16", "10.2.0.0/16")
+
+
+def test_rules_catch_split_ranges_and_wide_port_ranges():
+    groups, _ = parse_security_groups([
+        {"group_name": "half-internet", "environment": "prod", "rules": [
+            {"protocol": "tcp", "from_port": 0, "to_port": 65535, "cidr": ["10.0.0.0/8", "0.0.0.0/1"]},
+        ]},
+        {"group_name": "ipv6-ssh", "environment": "dev", "rules": [
+            {"protocol": "tcp", "from_port": 20, "to_port": 23, "cidr": "::/0"},
+        ]},
+        {"group_name": "private", "environment": "prod", "rules": [
+            {"protocol": "-1", "cidr": "10.0.0.0/8"},
+        ]},
+    ])
+    findings = run_network_rules(groups)
+    found = sorted((f["resource_id"], f["id"]) for f in findings)
+    assert found == [
+        ("half-internet", "NET_EXCESSIVE_PORTS"),
+        ("half-internet", "NET_PUBLIC_RDP"),
+        ("half-internet", "NET_PUBLIC_SSH"),
+        ("ipv6-ssh", "NET_PUBLIC_SSH"),
+    ]
+    excessive = next(f for f in findings if f["id"] == "NET_EXCESSIVE_PORTS")
+    assert excessive["severity"] == "Critical"
+    assert excessive["explanation"] == "Ports 0-65535 are publicly accessible in prod environment."
+    assert excessive["evidence"]["public_cidrs"] == ["0.0.0.0/1"]
+    assert 3306 in excessive["evidence"]["sensitive_ports"]
@@ -0,0 +1,70 @@
+import random
+
+from engine.network_ranges import IntervalTree
+from engine.network_reachability import SegmentationIndex
+from parser.config_parser import parse_security_groups
+from rules.network_rules import run_network_rules
+
+
+def test_interval_tree_matches_brute_force_overlaps():
+    rng = random.Random(11)
+    intervals = []
+    for i in range(500):
+        lo = rng.randrange(10_000)
+        intervals.append((lo, lo + rng.randrange(300), i))
+    tree = IntervalTree(intervals)
+    for _ in range(200):
+        lo = rng.randrange(10_000)
+        hi = lo + rng.randrange(50)
+        expected = {i for start, end, i in intervals if start <= hi and end >= lo}
+        assert set(tree.overlapping(lo, hi)) == expected
+    assert list(IntervalTree([]).overlapping(0, 10)) == []
+
+
+def _group(group_id, environment, vpc_id, vpc_cidr, *rules):
+    return {
+        "group_id": group_id, "group_name": group_id + "-name", "environment": environment,
+        "vpc_id": vpc_id, "vpc_cidr": vpc_cidr, "rules": list(rules),
+    }
+
+
+def _from(**source):
+    return dict({"protocol": "tcp", "from_port": 5432, "to_port": 5432}, **source)
+
+
+def test_production_groups_accepting_non_production_sources_are_reported():
+    groups, _ = parse_security_groups([
+        _group("sg-dev", "dev", "vpc-dev", "10.20.0.0/16"),
+        _group("sg-web", "prod", "vpc-prod", "10.10.0.0/16"),
+        _group("sg-db", "prod", "vpc-prod", "10.10.0.0/16",
+               _from(source_group="sg-web"), _from(cidr="10.10.0.0/16")),
+        _group("sg-trusts-dev", "Production", "vpc-prod", "10.10.0.0/16",
+               _from(UserIdGroupPairs=[{"GroupId": "sg-dev"}])),
+        _group("sg-dev-range", "prod", "vpc-prod", "10.10.0.0/16", _from(cidr=["0.0.0.0/0", "10.20.5.0/24"])),
+        _group("sg-unknown-env", "unknown", "vpc-prod", "10.10.0.0/16", _from(source_group="sg-dev")),
+    ])
+    findings = [f for f in run_network_rules(groups) if f["id"] == "NET_PROD_NO_SEGMENT"]
+
+    by_group = {f["evidence"]["group_id"]: f for f in findings}
+    assert sorted(by_group) == ["sg-dev-range", "sg-trusts-dev"]
+    assert by_group["sg-trusts-dev"]["severity"] == "High"
+    assert by_group["sg-trusts-dev"]["evidence"]["source_groups"] == [{"group": "sg-dev", "environment": "dev"}]
+    assert by_group["sg-dev-range"]["severity"] == "Medium"
+    assert by_group["sg-dev-range"]["evidence"]["source_ranges"] == [
+        {"cidr": "10.20.5.0/24", "vpc_id": "vpc-dev", "environments": ["dev"]},
+    ]
+    assert by_group["sg-dev-range"]["explanation"] == (
+        "Production group sg-dev-range-name (prod) accepts traffic from 1 non-production VPC range(s)."
+    )
+
+
+def test_shared_vpc_ranges_count_as_non_production():
+    index = SegmentationIndex()
+    for sg in parse_security_groups([
+        _group("sg-app", "prod", "vpc-shared", "10.30.0.0/16", _from(cidr="10.30.0.0/16")),
+        _group("sg-test", "staging", "vpc-shared", "10.30.0.0/16"),
+    ])[0]:
+        index.add(sg)
+    assert index.non_production_vpcs("10.30.1.0/24") == ["vpc-shared"]
+    assert index.non_production_vpcs("10.31.0.0/16") == []
+    assert [v.group_id for v in index.violations()] == ["sg-app"]
@@ -0,0 +1,71 @@
+import json
+import pickle
+
+import pytest
+
+from engine.records import Finding, SecurityGroup, json_default
+from engine.risk_engine import prioritize
+from engine.rule_engine import run_all_rules
+from parser.config_parser import parse_security_groups
+from rules.registry import get_rule_info
+
+
+def _open_groups(count):
+    groups, _ = parse_security_groups([
+        {"group_name": f"web-{i}", "environment": "prod", "rules": [{"protocol": "tcp", "port": 22, "cidr": "0.0.0.0/0"}]}
+        for i in range(count)
+    ])
+    return groups
+
+
+def test_findings_share_interned_rule_metadata():
+    findings = [f for f in run_all_rules({"security_groups": _open_groups(3)}) if f["id"] == "NET_PUBLIC_SSH"]
+    assert len(findings) == 3
+    assert all(type(f) is Finding and f.rule is findings[0].rule for f in findings)
+
+    # Decoded copies (result cache, scan store, worker processes) point at the same metadata.
+    decoded = Finding.from_dict(json.loads(json.dumps(findings[0], default=json_default)))
+    assert decoded.rule is findings[0].rule
+    assert decoded == findings[0]
+    assert pickle.loads(pickle.dumps(findings[1])).rule is findings[0].rule
+
+
+def test_findings_keep_the_dict_interface():
+    finding = prioritize(run_all_rules({"security_groups": _open_groups(1)}))[0]
+    assert list(finding.to_dict())[:4] == ["id", "title", "service", "severity"]
+    assert finding["resource"] == finding["resource_id"] == "web-0"
+    assert finding["fix_priority"] == 1 and finding.get("missing", "x") == "x"
+    assert finding["impact_factors"] == {}
+    with pytest.raises(TypeError):
+        finding["impact_factors"]["privilege"] = "admin"
+
+    finding["cis"] = ["4.1"]
+    finding["title"] = "Renamed"
+    assert finding.setdefault("cis", []) == ["4.1"] and "cis" in finding
+    assert finding.to_dict()["cis"] == ["4.1"]
+    # Overriding rule metadata on one finding does not change the others.
+    assert finding.rule.title == "Renamed"
+    assert prioritize(run_all_rules({"security_groups": _open_groups(1)}))[0]["title"] != "Renamed"
+
+
+def test_parsed_resources_are_records_with_dict_views():
+    group = _open_groups(1)[0]
+    assert type(group) is SecurityGroup
+    assert group.get("GroupName") is None and "rules" in group
+    assert group["rules"][0]["cidrs"] == ("0.0.0.0/0",)
+    plain = group.to_dict()
+    assert plain["rules"][0]["protocol"] == "tcp"
+    assert group == plain == pickle.loads(pickle.dumps(group))
+    assert json.loads(json.dumps(group, default=json_default))["rules"][0]["cidrs"] == ["0.0.0.0/0"]
+
+
+def test_compact_findings_rejoin_the_registered_rule():
+    findings = prioritize(run_all_rules({"security_groups": _open_groups(2)}))
+    compact = findings[0].compact()
+    assert "title" not in compact and "resource" not in compact
+    assert compact["id"] == findings[0]["id"] and compact["resource_id"] == findings[0]["resource_id"]
+
+    decoded = Finding.from_dict(json.loads(json.dumps(compact)), get_rule_info(compact["id"]))
+    assert decoded == findings[0] and decoded.rule is findings[0].rule
+    # Repeated explanations are stored once.
+    assert findings[0].explanation is findings[1].explanation
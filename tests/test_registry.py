@@ -0,0 +1,90 @@
+from engine.rule_engine import run_all_rules
+from rules.registry import (
+    Derived,
+    Rule,
+    compile_rules,
+    register_fields,
+    register_rule,
+    ruleset_version,
+    unregister_fields,
+    unregister_rule,
+)
+
+
+def test_registered_rules_share_one_field_extraction_per_resource():
+    calls = []
+    version = ruleset_version()
+    register_fields("s3_bucket", {"tag_count": lambda bucket: calls.append(1) or len(bucket.get("tags") or {})})
+    rule_ids = [f"TEST_UNTAGGED_{i}" for i in range(50)]
+    try:
+        for rule_id in rule_ids:
+            register_rule(Rule(
+                id=rule_id,
+                resource_type="s3_bucket",
+                fields=("tag_count",),
+                predicate=lambda view: view["tag_count"] == 0,
+                title="Untagged bucket",
+                service="Storage",
+                severity="Low",
+                issue="Missing tags",
+                description="Bucket has no tags.",
+                explanation="Bucket {resource_id} has no tags.",
+                remediation="Tag the bucket.",
+            ))
+        findings = run_all_rules({"s3_configs": [{"bucket_name": "a"}, {"bucket_name": "b", "tags": {"k": "v"}}]})
+    finally:
+        for rule_id in rule_ids:
+            unregister_rule(rule_id)
+        unregister_fields("s3_bucket", ["tag_count"])
+
+    assert ruleset_version() == version
+    assert len(calls) == 2
+    untagged = [f for f in findings if f["id"].startswith("TEST_UNTAGGED_")]
+    assert len(untagged) == 50
+    assert {f["explanation"] for f in untagged} == {"Bucket a has no tags."}
+
+
+def test_rule_with_unknown_field_is_rejected():
+    try:
+        register_rule(Rule(
+            id="TEST_BAD_FIELD", resource_type="iam_policy", fields=("nope",), predicate=bool,
+            title="", service="IAM", severity="Low", issue="", description="", explanation="", remediation="",
+        ))
+    except ValueError as exc:
+        assert "nope" in str(exc)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_per_statement_matches_produce_one_finding_each():
+    evaluate = compile_rules("iam_policy")
+    statement = {"effect": "allow", "actions": ["*"], "resources": ["*"]}
+    findings = evaluate({"policy_name": "two", "statements": [statement, statement]})
+    assert [f["id"] for f in findings] == ["IAM_WILDCARD_ADMIN", "IAM_WILDCARD_ADMIN"]
+
+
+def test_derived_fields_reuse_the_fields_they_require():
+    calls = []
+    register_fields("s3_bucket", {
+        "tag_keys": lambda bucket: calls.append(1) or sorted(bucket.get("tags") or {}),
+        "tag_count": Derived(lambda view: len(view["tag_keys"]), ("tag_keys",)),
+    })
+    try:
+        for rule_id, fields, predicate in (
+            ("TEST_UNTAGGED", ("tag_count",), lambda view: view["tag_count"] == 0),
+            ("TEST_NO_OWNER", ("tag_keys",), lambda view: "owner" not in view["tag_keys"]),
+        ):
+            register_rule(Rule(
+                id=rule_id, resource_type="s3_bucket", fields=fields, predicate=predicate, title="", service="Storage",
+                severity="Low", issue="", description="", explanation="", remediation="",
+            ))
+        findings = run_all_rules({"s3_configs": [{"bucket_name": "a"}, {"bucket_name": "b", "tags": {"k": "v"}}]})
+    finally:
+        unregister_rule("TEST_UNTAGGED")
+        unregister_rule("TEST_NO_OWNER")
+        unregister_fields("s3_bucket", ["tag_keys", "tag_count"])
+
+    assert len(calls) == 2
+    assert sorted((f["id"], f["resource_id"]) for f in findings if f["id"].startswith("TEST_")) == [
+        ("TEST_NO_OWNER", "a"), ("TEST_NO_OWNER", "b"), ("TEST_UNTAGGED", "a"),
+    ]
@@ -0,0 +1,65 @@
+import datetime
+import os
+
+from reports import report_generator
+from reports.report_generator import PARTIAL_SUFFIX, generate_report, iter_report, report_digest, write_report
+
+BUCKETS = {"categories": ("Medium", "High"), "prefix": "bucket-"}
+
+
+def test_streamed_report_matches_single_render(make_findings):
+    findings = make_findings(23, **BUCKETS)
+    expected = generate_report(findings, ("High", 12))
+    counts = report_generator._count_by_category(findings)
+    chunks = list(iter_report(iter(findings), ("High", 12), counts=counts, chunk_rows=5))
+    assert "".join(chunks) == expected
+    # Header, five row batches, footer.
+    assert len(chunks) == 7
+    assert expected.count("<tr><td>") == 23
+
+
+def test_write_report_renames_partial_file(tmp_path, make_findings):
+    path = str(tmp_path / "report.html")
+    written = write_report(make_findings(3, **BUCKETS), ("Medium", 8), path)
+    assert not os.path.exists(path + PARTIAL_SUFFIX)
+    with open(path, encoding="utf-8") as f:
+        assert len(f.read()) == written
+
+
+def test_report_shows_drift_since_previous_scan(make_findings):
+    findings = make_findings(3, **BUCKETS)
+    drift = {
+        "counts": {"new": 30, "resolved": 1, "unchanged": 2},
+        "new": {"by_category": {"Critical": 0, "High": 30, "Medium": 0, "Low": 0}, "by_rule": {}},
+        "resolved": {"by_category": {"Critical": 1, "High": 0, "Medium": 0, "Low": 0}, "by_rule": {}},
+        "base_timestamp": "2026-01-01 00:00 UTC",
+        "new_findings": make_findings(30, **BUCKETS),
+        "resolved_findings": [dict(make_findings(1, **BUCKETS)[0], resource_id="gone")],
+    }
+    html = generate_report(findings, ("High", 12), drift=drift)
+    assert "Changes Since Previous Scan" in html
+    assert "2026-01-01 00:00 UTC" in html
+    assert html.count("<td>New</td>") == report_generator.DRIFT_ROWS
+    assert "<td>Resolved</td><td>S3_NO_ENCRYPTION</td><td>Unencrypted S3 bucket</td><td>s3_bucket::gone</td>" in html
+    assert "Changes Since Previous Scan" not in generate_report(findings, ("High", 12))
+
+
+def test_report_digest_leaves_out_when_the_report_was_made(make_findings):
+    findings = make_findings(5, **BUCKETS)
+    counts = report_generator._count_by_category(findings)
+    drift = {
+        "counts": {"new": 0, "resolved": 0, "unchanged": 5},
+        "new": {"by_category": {}, "by_rule": {}},
+        "resolved": {"by_category": {}, "by_rule": {}},
+        "base_scan": "a",
+        "base_timestamp": "2026-01-01 00:00 UTC",
+    }
+    monday = "".join(iter_report(findings, ("High", 12), counts, generated_at=datetime.datetime(2026, 1, 5, 9)))
+    assert "Generated 2026-01-05 09:00 UTC" in monday
+
+    digest = report_digest(findings, ("High", 12), counts, drift)
+    rescan = dict(drift, base_scan="b", base_timestamp="2026-01-02 00:00 UTC")
+    assert report_digest(iter(findings), ("High", 12), counts, rescan) == digest
+    assert report_digest(findings[:4], ("High", 12), counts, drift) != digest
+    assert report_digest(findings, ("Low", 2), counts, drift) != digest
+    assert report_digest(findings, ("High", 12), counts) != digest
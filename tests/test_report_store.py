@@ -0,0 +1,129 @@
+import gzip
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import pytest
+
+from storage.report_store import ReportStore, decode, read_chunks
+
+REPORT = ["<html><body>", "<p>finding</p>" * 500, "</body></html>"]
+
+
+def test_reports_are_compressed_and_deduplicated_by_content(tmp_path):
+    store = ReportStore(str(tmp_path), codec="gzip")
+    first = store.write("a.html", REPORT)
+    second = store.write("b.html", iter(REPORT))
+    other = store.write("c.html", ["<html>other</html>"])
+
+    assert first.digest == second.digest != other.digest
+    assert first.path == second.path and first.encoding == "gzip"
+    assert gzip.decompress(open(first.path, "rb").read()) == "".join(REPORT).encode()
+    assert first.size < first.raw_size / 10
+    assert b"".join(decode(read_chunks(store.lookup("b.html").path), "gzip")) == "".join(REPORT).encode()
+    assert store.stats()[:2] == (3, 2)
+    assert store.lookup("missing.html") is None
+    assert not store.writing("a.html")
+    with pytest.raises(ValueError):
+        store.write("../escape.html", REPORT)
+    with pytest.raises(ValueError):
+        ReportStore(str(tmp_path), codec="brotli")
+
+
+def test_reports_with_the_same_digest_share_one_object_without_rendering_again(tmp_path):
+    store = ReportStore(str(tmp_path))
+    first = store.write("monday.html", ["<p>Generated Monday</p>"] + REPORT, digest="same")
+
+    def unread():
+        raise AssertionError("stored content rendered again")
+        yield
+
+    second = store.write("tuesday.html", unread(), digest="same")
+    assert second.digest == first.digest == "same" and second.path == first.path
+    assert store.lookup("tuesday.html").path == first.path
+    assert store.stats()[:2] == (2, 1)
+
+
+def test_failed_write_leaves_nothing_behind(tmp_path):
+    store = ReportStore(str(tmp_path))
+
+    def chunks():
+        yield "<html>"
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        store.write("a.html", chunks())
+    assert store.lookup("a.html") is None and not store.writing("a.html")
+
+
+def test_follow_streams_a_report_while_it_is_written(tmp_path):
+    store = ReportStore(str(tmp_path))
+    release = threading.Event()
+
+    def chunks():
+        yield "<html>" + "x" * 1000
+        release.wait(5)
+        yield "y" * 1000 + "</html>"
+
+    writer = threading.Thread(target=store.write, args=("a.html", chunks()))
+    writer.start()
+    while not store.writing("a.html"):
+        pass
+    follower = decode(store.follow("a.html", poll_interval=0.01), "gzip")
+    assert next(follower).startswith(b"<html>xxx")
+    release.set()
+    body = b"".join(follower)
+    writer.join()
+    assert body.endswith(b"y</html>")
+    assert store.follow("a.html") is None
+    stored = store.lookup("a.html")
+    assert b"".join(decode(read_chunks(stored.path), "gzip")) == b"<html>" + b"x" * 1000 + b"y" * 1000 + b"</html>"
+
+
+def test_sweep_enforces_age_and_size_and_drops_unreferenced_content(tmp_path):
+    store = ReportStore(str(tmp_path), max_age_days=1)
+    old = store.write("old.html", ["old"])
+    shared = store.write("shared-old.html", ["shared"])
+    store.write("shared-new.html", ["shared"])
+    now = old.created_at + 2 * 86400
+    with closing(sqlite3.connect(store.path)) as conn, conn:
+        conn.execute("UPDATE reports SET created_at = ? WHERE name <> 'shared-new.html'", (old.created_at,))
+        conn.execute("UPDATE reports SET created_at = ? WHERE name = 'shared-new.html'", (now,))
+    stale = os.path.join(str(tmp_path), "tmp", "dead.html.part")
+    open(stale, "w").close()
+    os.utime(stale, (0, 0))
+
+    assert store.sweep(now) == 2
+    assert store.lookup("old.html") is None and not os.path.exists(old.path)
+    assert store.lookup("shared-new.html").path == shared.path and os.path.exists(shared.path)
+    assert not os.path.exists(stale)
+
+    store = ReportStore(str(tmp_path / "sized"), max_bytes=1)
+    for i in range(3):
+        store.write(f"r{i}.html", [f"report {i}" * 100])
+    store.max_bytes = store.lookup("r2.html").size
+    store.sweep()
+    assert [store.lookup(f"r{i}.html") is not None for i in range(3)] == [False, False, True]
+
+
+def test_delete_drops_names_and_content_no_other_name_shares(tmp_path):
+    store = ReportStore(str(tmp_path))
+    shared = store.write("a.html", REPORT)
+    store.write("b.html", REPORT)
+    own = store.write("c.html", ["<html>other</html>"])
+
+    assert store.delete(["a.html", "c.html"]) == 1
+    assert store.lookup("a.html") is None and store.lookup("c.html") is None
+    assert not os.path.exists(own.path) and os.path.exists(shared.path)
+    assert store.lookup("b.html").path == shared.path
+
+
+def test_sweeper_thread_runs_until_stopped(tmp_path, monkeypatch):
+    store = ReportStore(str(tmp_path))
+    swept = threading.Event()
+    monkeypatch.setattr(store, "sweep", lambda: swept.set() or 0)
+    store.start_sweeper(interval=60)
+    assert swept.wait(5)
+    store.stop_sweeper()
+    assert store._sweeper is None
@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from contextlib import closing
+
+from engine.rule_engine import run_all_rules
+from rules import network_rules
+from rules.registry import _code_digest, ruleset_version
+from storage.result_cache import ResultCache, resource_fingerprint
+
+
+def sample_inputs():
+    with open('sample_data/realistic_examples.json') as f:
+        data = json.load(f)
+    from parser.config_parser import parse_iam_policies, parse_s3_configs, parse_security_groups
+    return {
+        'iam_policies': parse_iam_policies(data['iam_policies'])[0],
+        's3_configs': parse_s3_configs(data['s3_configs'])[0],
+        'security_groups': parse_security_groups(data['security_groups'])[0],
+    }
+
+
+def test_fingerprint_ignores_key_order():
+    a = resource_fingerprint('s3_bucket', {'a': 1, 'b': [1, 2]}, 'v1')
+    assert a == resource_fingerprint('s3_bucket', {'b': [1, 2], 'a': 1}, 'v1')
+    assert a != resource_fingerprint('s3_bucket', {'a': 1, 'b': [1, 2]}, 'v2')
+    assert a != resource_fingerprint('s3_bucket', {'a': 2, 'b': [1, 2]}, 'v1')
+
+
+def test_rescan_reuses_cached_findings(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'))
+    expected = run_all_rules(sample_inputs())
+
+    first = run_all_rules(sample_inputs(), cache=cache)
+    assert cache.hits == 0 and cache.misses > 0
+    misses = cache.misses
+
+    inputs = sample_inputs()
+    inputs['s3_configs'][0]['encryption']['enabled'] = True
+    second = run_all_rules(inputs, cache=cache)
+    assert cache.misses == misses + 1
+    assert cache.hits == misses - 1
+
+    assert first == expected
+    assert [f['id'] for f in second] == [f['id'] for f in expected if f['id'] != 'S3_NO_ENCRYPTION' or f['resource_id'] != 'prod-customer-pii']
+
+
+def test_lru_eviction_respects_size_limit(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite3'), max_bytes=2000)
+    findings = [{'id': 'X', 'explanation': 'x' * 100}]
+    for i in range(10):
+        cache.put(f'k{i}', findings)
+    cache.get('k0')
+    for i in range(10, 20):
+        cache.put(f'k{i}', findings)
+    stats = cache.stats()
+    assert stats['bytes'] <= 2000
+    assert cache.get('k0') == findings
+    assert cache.get('k1') is None
+
+
+def test_running_byte_total_tracks_replacements_evictions_and_old_caches(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+
+    def stored_bytes():
+        with closing(sqlite3.connect(path)) as conn:
+            return conn.execute('SELECT COALESCE(SUM(size), 0) FROM findings_cache').fetchone()[0]
+
+    cache = ResultCache(path, max_bytes=2000)
+    cache.put_many([('a', [{'id': 'X'}]), ('b', [{'id': 'Y'}]), ('a', [{'id': 'X', 'n': 1}])])
+    cache.put('b', [{'id': 'Y', 'explanation': 'y' * 50}])
+    assert cache.stats()['bytes'] == stored_bytes() > 0
+    for i in range(30):
+        cache.put(f'k{i}', [{'id': 'X', 'explanation': 'x' * 100}])
+    assert cache.stats()['bytes'] == stored_bytes() <= 2000
+
+    # A cache written before the running total existed is summed once.
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute('DROP TABLE findings_cache_meta')
+    assert ResultCache(path, max_bytes=2000).stats()['bytes'] == stored_bytes()
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'entries': 0, 'bytes': 0}
+
+
+def test_ruleset_version_is_stable_across_processes():
+    # Cached findings are keyed by the ruleset version, so it must not
+    # depend on the process (e.g. on memory addresses of code objects).
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), PYTHONHASHSEED="random")
+    result = subprocess.run(
+        [sys.executable, "-c", "import engine.rule_engine; from rules.registry import ruleset_version; "
+                               "print(ruleset_version())"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == ruleset_version()
+
+
+def test_rule_digest_covers_closure_values():
+    assert _code_digest(network_rules._exposing(22)) != _code_digest(network_rules._exposing(3389))
+    assert _code_digest(network_rules._exposing(22)) == _code_digest(network_rules._exposing(22))
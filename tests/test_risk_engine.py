@@ -0,0 +1,144 @@
+import copy
+import itertools
+import pickle
+import random
+
+import pytest
+
+from engine import risk_engine
+from engine.risk_engine import (
+    ATTACK_MAP,
+    BLAST_MAP,
+    EASE_MAP,
+    EXPOSURE_MAP,
+    IMPACT_MAP,
+    PRIVILEGE_MAP,
+    PriorityStream,
+    ScoringProfile,
+    calculate_impact,
+    calculate_likelihood,
+    categorize,
+    overall_posture,
+    prioritize,
+    prioritize_columnar,
+    score_findings,
+)
+
+
+def random_findings(count, seed=7):
+    rng = random.Random(seed)
+
+    def pick(mapping):
+        return rng.choice(list(mapping) + ["bogus", None])
+
+    findings = []
+    for i in range(count):
+        finding = {"id": f"F{i}", "resource_id": f"r{i}"}
+        if rng.random() < 0.8:
+            finding["impact_factors"] = {
+                "data_sensitivity": pick(IMPACT_MAP),
+                "privilege": pick(PRIVILEGE_MAP),
+                "blast_radius": pick(BLAST_MAP),
+            }
+            finding["likelihood_factors"] = {
+                "internet_exposure": pick(EXPOSURE_MAP),
+                "ease_of_exploit": pick(EASE_MAP),
+                "common_attack_pattern": pick(ATTACK_MAP),
+            }
+        findings.append(finding)
+    return findings
+
+
+def scalar_prioritize(findings):
+    scored = score_findings(findings)
+    scored.sort(key=lambda f: (f.get("risk_score", 0), f.get("impact_score", 0)), reverse=True)
+    for idx, finding in enumerate(scored, start=1):
+        finding["fix_priority"] = idx
+    return scored
+
+
+def test_columnar_path_matches_scalar_path():
+    findings = random_findings(3000)
+    assert prioritize_columnar(copy.deepcopy(findings)) == scalar_prioritize(copy.deepcopy(findings))
+
+
+def test_columnar_limit_materializes_only_top_findings():
+    findings = random_findings(500)
+    expected = scalar_prioritize(copy.deepcopy(findings))[:10]
+    top = prioritize_columnar(findings, limit=10)
+    assert top == expected
+    assert sum(1 for f in findings if "fix_priority" in f) == 10
+
+
+def test_prioritize_switches_to_columnar_for_large_inputs(monkeypatch):
+    monkeypatch.setattr(risk_engine, "COLUMNAR_THRESHOLD", 100)
+    findings = random_findings(400, seed=3)
+    assert prioritize(copy.deepcopy(findings)) == scalar_prioritize(copy.deepcopy(findings))
+
+
+def test_default_table_matches_the_factor_maps():
+    table = ScoringProfile().table
+    names = ["data_sensitivity", "privilege", "blast_radius", "internet_exposure", "ease_of_exploit",
+             "common_attack_pattern"]
+    maps = [IMPACT_MAP, PRIVILEGE_MAP, BLAST_MAP, EXPOSURE_MAP, EASE_MAP, ATTACK_MAP]
+    assert len(table) == len(list(itertools.product(*maps)))
+    for key, (impact, likelihood, score, category) in table.items():
+        factors = dict(zip(names, key))
+        assert impact == calculate_impact({name: factors[name] for name in names[:3]})
+        assert likelihood == calculate_likelihood({name: factors[name] for name in names[3:]})
+        assert (score, category) == (impact * likelihood, categorize(impact * likelihood))
+
+
+def test_custom_profile_rescores_findings_on_both_paths():
+    profile = ScoringProfile(
+        "tenant", weights={"internet_exposure": {"internet": 10, "bogus": 9}}, thresholds={"Critical": 30}
+    )
+    findings = random_findings(3000, seed=11)
+    scalar = score_findings(copy.deepcopy(findings), profile)
+    default = score_findings(copy.deepcopy(findings))
+    assert scalar != default
+    assert all(f["risk_category"] == profile.categorize(f["risk_score"]) for f in scalar)
+    assert not any(f["risk_category"] == "Critical" and f["risk_score"] < 30 for f in scalar)
+
+    scalar.sort(key=lambda f: (f["risk_score"], f["impact_score"]), reverse=True)
+    columnar = prioritize_columnar(copy.deepcopy(findings), profile=profile)
+    assert [(f["id"], f["risk_category"]) for f in columnar] == [(f["id"], f["risk_category"]) for f in scalar]
+
+    rebuilt = pickle.loads(pickle.dumps(profile))
+    assert rebuilt.fingerprint() == profile.fingerprint()
+    assert all(profile.table[key] == entry for key, entry in rebuilt.table.items())
+
+
+@pytest.mark.parametrize("data", [
+    {"weights": {"privilege": {"admin": 11}}},
+    {"weights": {"privilege": {"admin": "high"}}},
+    {"weights": {"colour": {"red": 3}}},
+    {"thresholds": {"High": 25}},
+    {"thresholds": {"Severe": 30}},
+])
+def test_invalid_profiles_are_rejected(data):
+    with pytest.raises(ValueError):
+        ScoringProfile.from_dict(data)
+
+
+def test_priority_stream_matches_full_prioritization():
+    findings = random_findings(2000, seed=5)
+    expected = scalar_prioritize(copy.deepcopy(findings))
+    expected_counts = {category: 0 for category in ("Critical", "High", "Medium", "Low")}
+    for finding in expected:
+        expected_counts[finding["risk_category"]] += 1
+
+    streams = [PriorityStream(25), PriorityStream(25, full_order=True), PriorityStream()]
+    for stream in streams:
+        batches = copy.deepcopy(findings)
+        for start in range(0, len(batches), 300):
+            stream.extend(batches[start:start + 300])
+        assert stream.count == len(findings)
+        assert stream.counts() == expected_counts
+        assert stream.posture() == overall_posture(expected)
+    assert streams[0].top() == expected[:25]
+    assert streams[1].top() == expected[:25]
+    assert streams[1].ordered() == expected
+    assert streams[2].top() == []
+    with pytest.raises(ValueError):
+        streams[0].ordered()
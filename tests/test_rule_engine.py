@@ -0,0 +1,48 @@
+import json
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from engine import rule_engine
+from engine.records import json_default
+from engine.risk_engine import prioritize
+from engine.rule_engine import run_all_rules
+
+
+def test_parallel_run_matches_serial_order(build_inputs):
+    serial = prioritize(run_all_rules(build_inputs(40)))
+    for use_processes in (True, False):
+        parallel = prioritize(run_all_rules(build_inputs(40), workers=3, chunk_size=7, use_processes=use_processes))
+        assert json.dumps(parallel, sort_keys=True, default=json_default) == json.dumps(serial, sort_keys=True, default=json_default)
+
+
+class BrokenPool(ProcessPoolExecutor):
+    # A process pool whose workers cannot run: submit() fails outright or
+    # (after the first chunk) its futures fail.
+    def __init__(self, fail_on_submit):
+        super().__init__(max_workers=1)
+        self.fail_on_submit = fail_on_submit
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        if self.fail_on_submit and self.submitted > 1:
+            raise BrokenProcessPool("cannot start workers")
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+
+@pytest.mark.parametrize("fail_on_submit", [False, True])
+def test_broken_process_pool_falls_back_to_threads(monkeypatch, fail_on_submit, build_inputs):
+    expected = run_all_rules(build_inputs(10))
+    monkeypatch.setattr(rule_engine, "_create_executor", lambda workers, use_processes: BrokenPool(fail_on_submit))
+    assert run_all_rules(build_inputs(10), workers=3, chunk_size=4) == expected
+
+
+def test_parallel_run_accepts_iterators(build_inputs):
+    inputs = build_inputs(5)
+    expected = run_all_rules(inputs)
+    streamed = run_all_rules({k: iter(v) for k, v in inputs.items()}, workers=2, chunk_size=2, use_processes=False)
+    assert streamed == expected
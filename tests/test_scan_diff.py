@@ -0,0 +1,27 @@
+from engine.records import Finding
+from engine.scan_diff import diff_findings, drift_summary, finding_key, key_hash
+
+
+def test_key_hash_is_stable_and_separates_fields():
+    assert key_hash("R", "s3_bucket", "a") == key_hash("R", "s3_bucket", "a")
+    assert key_hash("R", "s3_bucket", "a") != key_hash("R", "s3_bucketa", "")
+    assert -(2**63) <= key_hash("R", "t", "a") < 2**63
+    record = Finding.from_dict({"id": "R", "resource_type": "t", "resource_id": "a"})
+    assert finding_key(record) == finding_key({"id": "R", "resource_type": "t", "resource_id": "a"})
+
+
+def test_diff_reports_new_resolved_and_unchanged_positions(make_findings):
+    base = make_findings(resource_ids=["a", "b", "c", "c"])
+    head = make_findings(resource_ids=["c", "d", "a"]) + make_findings(resource_ids=["a"], rules=("S3_PUBLIC_BUCKET",))
+    diff = diff_findings(base, head)
+
+    assert diff.new == [1, 3]
+    assert diff.resolved == [1]
+    # Duplicate keys collapse onto their first (highest priority) finding.
+    assert diff.unchanged == [0, 2]
+    assert diff.counts() == {"new": 2, "resolved": 1, "unchanged": 2}
+
+    summary = drift_summary(diff, [("S3_PUBLIC_BUCKET", "Critical"), ("S3_NO_ENCRYPTION", "High")], [])
+    assert summary["new"]["by_category"] == {"Critical": 1, "High": 1, "Medium": 0, "Low": 0}
+    assert summary["new"]["by_rule"] == {"S3_PUBLIC_BUCKET": 1, "S3_NO_ENCRYPTION": 1}
+    assert summary["resolved"]["by_rule"] == {}
@@ -0,0 +1,83 @@
+import json
+import threading
+
+from storage.scan_index import ScanIndex
+
+COUNTS = {"Critical": 0, "High": 1, "Medium": 0, "Low": 0}
+
+
+def append(index, day, hour, posture=("High", 12), name=None):
+    created = f"2026-01-{day:02d}T{hour:02d}:00:00"
+    return index.append(name, created, created, posture, f"{name}.html", COUNTS, {})
+
+
+def test_query_pages_newest_first_and_filters_by_time_and_posture(tmp_path):
+    index = ScanIndex(str(tmp_path / "index.sqlite3"))
+    for day in range(1, 11):
+        append(index, day, 0, ("Critical", 20) if day % 3 == 0 else ("Low", 2), name=f"s{day}")
+
+    rows, total = index.query(0, 4)
+    assert total == 10
+    assert [r["scan_id"] for r in rows] == ["s10", "s9", "s8", "s7"]
+    assert rows[0]["summary"] == "Low (Score 2)" and rows[0]["counts"] == COUNTS
+
+    rows, total = index.query(4, 4)
+    assert [r["scan_id"] for r in rows] == ["s6", "s5", "s4", "s3"]
+
+    rows, total = index.query(0, 50, since="2026-01-03", until="2026-01-07")
+    assert [r["scan_id"] for r in rows] == ["s6", "s5", "s4", "s3"]
+
+    rows, total = index.query(0, 50, postures=["Critical"])
+    assert [r["scan_id"] for r in rows] == ["s9", "s6", "s3"]
+    assert index.query(0, 50, min_score=3)[1] == 3
+    assert index.query(0, 50, max_score=2, since="2026-01-09")[1] == 1
+
+
+def test_retention_by_count_and_age(tmp_path):
+    index = ScanIndex(str(tmp_path / "count.sqlite3"), max_entries=3)
+    pruned = [append(index, day, 0, name=f"s{day}") for day in range(1, 6)]
+    assert [r["scan_id"] for r in index.query(0, 50)[0]] == ["s5", "s4", "s3"]
+    assert pruned == [[], [], [], ["s1"], ["s2"]]
+
+    index = ScanIndex(str(tmp_path / "age.sqlite3"), max_age_days=2)
+    pruned = [append(index, day, 0, name=f"s{day}") for day in range(1, 6)]
+    assert [r["scan_id"] for r in index.query(0, 50)[0]] == ["s5", "s4", "s3"]
+    assert pruned == [[], [], [], ["s1"], ["s2"]]
+
+
+def test_concurrent_appends_keep_every_entry(tmp_path):
+    path = str(tmp_path / "index.sqlite3")
+    ScanIndex(path)
+
+    def worker(day):
+        # One index object per thread, as separate processes would have.
+        index = ScanIndex(path)
+        for hour in range(20):
+            append(index, day, hour, name=f"{day}-{hour}")
+
+    threads = [threading.Thread(target=worker, args=(day,)) for day in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rows, total = ScanIndex(path).query(0, 100)
+    assert total == 80
+    assert len({r["scan_id"] for r in rows}) == 80
+
+
+def test_legacy_json_index_is_imported_once(tmp_path):
+    legacy = tmp_path / "scan_index.json"
+    legacy.write_text(json.dumps([
+        {"report_name": "b.html", "created_at": "2026-01-02 10:00 UTC", "summary": "High (Score 12)",
+         "counts": COUNTS, "exports": {"csv": "b.csv"}},
+        {"report_name": "a.html", "created_at": "2026-01-01 09:30 UTC", "summary": "Low (Score 2)", "counts": COUNTS},
+    ]))
+    path = str(tmp_path / "index.sqlite3")
+    index = ScanIndex(path, legacy_path=str(legacy))
+
+    rows, total = index.query(0, 10)
+    assert [r["report_name"] for r in rows] == ["b.html", "a.html"]
+    assert rows[0]["posture"] == ("High", 12) and rows[0]["exports"] == {"csv": "b.csv"}
+    assert rows[1]["created_at"] == "2026-01-01T09:30:00"
+    assert not legacy.exists() and (tmp_path / "scan_index.json.imported").exists()
+    assert ScanIndex(path, legacy_path=str(legacy)).query(0, 10)[1] == 2
@@ -0,0 +1,154 @@
+import json
+import sqlite3
+import threading
+from contextlib import closing
+
+from engine.risk_engine import prioritize
+from engine.rule_engine import run_all_rules
+from engine.scan_diff import diff_indexes
+from parser.config_parser import parse_security_groups
+from storage.scan_store import ScanStore
+
+# Finding i: NET_PUBLIC_SSH when i % 3 == 0, else S3_NO_ENCRYPTION; High for odd i, else Low.
+MIXED = {"rules": ("NET_PUBLIC_SSH", "S3_NO_ENCRYPTION", "S3_NO_ENCRYPTION"), "categories": ("Low", "High")}
+
+
+def test_store_keeps_multiple_scans_and_pages_in_priority_order(tmp_path, make_findings):
+    store = ScanStore(str(tmp_path / "scans.sqlite3"))
+    store.save_scan("a", iter(make_findings(25, **MIXED)), ("High", 12), "a.html", "2026-01-01T00:00:00", "t1", [])
+    store.save_scan("b", make_findings(3, **MIXED), ("Low", 4), "b.html", "2026-01-02T00:00:00", "t2", ["warn"])
+
+    assert store.latest_scan()["scan_id"] == "b"
+    assert store.get_scan("a")["finding_count"] == 25
+    assert store.get_scan("b")["errors"] == ["warn"]
+
+    page = store.page_findings("a", 10, 10)
+    assert [f["fix_priority"] for f in page] == list(range(11, 21))
+    assert [f["resource_id"] for f in store.iter_findings("b")] == ["r0", "r1", "r2"]
+
+    assert store.count_by("a", "risk_category") == {"High": 12, "Low": 13}
+    assert store.count_by("a", "resource_type") == {"s3_bucket": 16, "security_group": 9}
+
+
+def test_delete_scan_removes_findings(tmp_path, make_findings):
+    store = ScanStore(str(tmp_path / "scans.sqlite3"))
+    store.save_scan("a", make_findings(5, **MIXED), ("High", 12), None, "2026-01-01T00:00:00", "t1", [])
+    store.delete_scan("a")
+    assert store.get_scan("a") is None
+    assert store.page_findings("a", 0, 10) == []
+
+
+def test_query_findings_filters_sorts_and_counts(tmp_path, make_findings):
+    store = ScanStore(str(tmp_path / "scans.sqlite3"))
+    store.save_scan("a", make_findings(30, **MIXED), ("High", 12), None, "2026-01-01T00:00:00", "t1", [])
+
+    rows, total = store.query_findings("a", 0, 5, resource_types=["security_group"])
+    assert total == 10
+    assert [f["resource_id"] for f in rows] == ["r0", "r3", "r6", "r9", "r12"]
+
+    rows, total = store.query_findings("a", 0, 50, risk_category="High", rule_id="NET_PUBLIC_SSH")
+    assert total == 5
+    assert all(f["id"] == "NET_PUBLIC_SSH" and f["risk_category"] == "High" for f in rows)
+
+    rows, total = store.query_findings("a", 0, 50, resource_contains="r2")
+    assert [f["resource_id"] for f in rows] == ["r2"] + [f"r2{i}" for i in range(10)]
+
+    rows, _ = store.query_findings("a", 0, 3, sort="risk_score", descending=True)
+    assert [f["risk_score"] for f in rows] == [12, 12, 12]
+    assert [f["fix_priority"] for f in rows] == [2, 4, 6]
+
+    _, total = store.query_findings("a", 0, 5, resource_contains="%")
+    assert total == 0
+
+
+def test_views_are_cached_per_scan(tmp_path, make_findings):
+    store = ScanStore(str(tmp_path / "scans.sqlite3"))
+    store.save_scan("a", make_findings(2, **MIXED), ("Low", 4), None, "2026-01-01T00:00:00", "t1", [])
+    assert store.get_view("a", "summary") is None
+    store.put_view("a", "summary", {"counts": {"Low": 1}})
+    assert store.get_view("a", "summary") == {"counts": {"Low": 1}}
+    assert store.get_view("missing", "summary") is None
+    store.put_view("missing", "summary", {})
+    assert store.get_view("missing", "summary") is None
+
+
+def test_concurrent_view_writers_keep_each_others_views(tmp_path, make_findings):
+    path = str(tmp_path / "scans.sqlite3")
+    ScanStore(path).save_scan("a", make_findings(2, **MIXED), ("Low", 4), None, "2026-01-01T00:00:00", "t1", [])
+
+    def writer(name):
+        store = ScanStore(path)
+        for i in range(20):
+            store.put_view("a", f"{name}-{i}", i)
+
+    threads = [threading.Thread(target=writer, args=(name,)) for name in ("drift", "summary", "heatmap")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store = ScanStore(path)
+    assert all(store.get_view("a", f"{name}-19") == 19 for name in ("drift", "summary", "heatmap"))
+    store.delete_scan("a")
+    assert store.get_view("a", "drift-0") is None
+
+
+def test_views_of_older_stores_are_moved_to_their_own_rows(tmp_path, make_findings):
+    path = str(tmp_path / "scans.sqlite3")
+    ScanStore(path).save_scan("a", make_findings(2, **MIXED), ("Low", 4), None, "2026-01-01T00:00:00", "t1", [])
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute("ALTER TABLE scans ADD COLUMN views TEXT NOT NULL DEFAULT '{}'")
+        conn.execute("UPDATE scans SET views = ?", (json.dumps({"summary": {"counts": {"Low": 2}}, "drift": None}),))
+    store = ScanStore(path)
+    assert store.get_view("a", "summary") == {"counts": {"Low": 2}}
+    assert store.get_view("a", "heatmap") is None
+    store.put_view("a", "summary", {"counts": {}})
+    assert ScanStore(path).get_view("a", "summary") == {"counts": {}}
+
+
+def test_rule_metadata_is_stored_once_per_rule_and_joined_back(tmp_path):
+    groups, _ = parse_security_groups([
+        {"group_name": f"web-{i}", "environment": "prod", "rules": [{"protocol": "tcp", "port": 22, "cidr": "0.0.0.0/0"}]}
+        for i in range(20)
+    ])
+    findings = prioritize(run_all_rules({"security_groups": groups}))
+    findings[-1]["title"] = "Overridden"
+    path = str(tmp_path / "scans.sqlite3")
+    store = ScanStore(path)
+    store.save_scan("a", findings, ("High", 12), None, "2026-01-01T00:00:00", "t1", [])
+
+    assert list(store.iter_findings("a")) == [f.to_dict() for f in findings]
+    rows, _ = store.query_findings("a", 0, 5, rule_id="NET_PUBLIC_SSH")
+    assert rows[0]["remediation"] == findings[0]["remediation"] and rows[0]["resource"] == rows[0]["resource_id"]
+
+    with closing(sqlite3.connect(path)) as conn:
+        rules = conn.execute("SELECT rule_id FROM scan_rules WHERE scan_id = 'a'").fetchall()
+        stored = [json.loads(data) for (data,) in conn.execute("SELECT data FROM findings ORDER BY position")]
+    assert sorted(rule_id for (rule_id,) in rules) == sorted({f["id"] for f in findings})
+    assert all("description" not in data for data in stored[:-1])
+    assert stored[-1]["title"] == "Overridden"
+
+    store.delete_scan("a")
+    with closing(sqlite3.connect(path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM scan_rules").fetchone()[0] == 0
+
+
+def test_finding_keys_diff_scans_and_fetch_findings_by_position(tmp_path, make_findings):
+    path = str(tmp_path / "scans.sqlite3")
+    store = ScanStore(path)
+    store.save_scan("a", make_findings(2000, **MIXED), ("High", 12), None, "2026-01-01T00:00:00", "t1", [])
+    head = make_findings(2000, **MIXED)[5:] + [dict(make_findings(1, **MIXED)[0], resource_id="r-new")]
+    store.save_scan("b", head, ("High", 12), None, "2026-01-02T00:00:00", "t2", [])
+
+    assert store.previous_scan("b")["scan_id"] == "a"
+    assert store.previous_scan("a") is None
+    diff = diff_indexes(store.finding_keys("a"), store.finding_keys("b"))
+    assert diff.counts() == {"new": 1, "resolved": 5, "unchanged": 1995}
+    assert [f["resource_id"] for f in store.findings_at("a", diff.resolved)] == [f"r{i}" for i in range(5)]
+    assert store.findings_at("b", diff.new)[0]["resource_id"] == "r-new"
+    assert store.labels_at("a", diff.resolved[:2]) == [("NET_PUBLIC_SSH", "Low"), ("S3_NO_ENCRYPTION", "High")]
+    assert len(store.findings_at("b", diff.unchanged)) == 1995
+
+    # Scans saved before the key column existed are hashed on read.
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute("UPDATE findings SET finding_key = NULL WHERE scan_id = 'a'")
+    assert diff_indexes(store.finding_keys("a"), store.finding_keys("b")).counts() == diff.counts()